@@ -0,0 +1,17 @@
+"""
+Benchmarks - run from the repository root, e.g. `python -m benchmarks.middleware`
+
+Mirrors tests/__init__.py: `src` is put on the path and the TESTING config is used unless
+ENVIRONMENT is already set.
+"""
+
+import os
+import sys
+import tempfile
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+os.environ.setdefault("ENVIRONMENT", "TESTING")
+os.environ.setdefault("LOG_DIRECTORY", tempfile.gettempdir())
@@ -0,0 +1,89 @@
+"""
+Simulated connection pool spike: latency per priority with and without admission control.
+
+A pool of --pool-size connections, each query holds its connection --hold-ms. --requests requests
+arrive at once (1/3 refresh = critical, 1/3 login = normal, 1/3 register / admin = low). "fifo" is the
+previous behaviour: one unbounded FIFO queue (max_waiting=0), every request waits its turn.
+"admission" queues through PriorityGate and sheds with AdmissionController's default budgets.
+Clients give up after --client-timeout seconds, a request served after that is wasted work.
+No database, asyncio.Semaphore / PriorityGate stand in for the pool.
+
+    python -m benchmarks.admission --requests 3000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from typing import Dict, List
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+from config import get_settings
+from app.core.admission import PRIORITIES, AdmissionController, PriorityGate
+
+NAMES = ("critical", "normal", "low")
+
+
+async def run(variant: str, requests: int, pool_size: int, hold: float, client_timeout: float) -> Dict[str, Dict[str, float]]:
+    settings = get_settings()
+    semaphore = asyncio.Semaphore(pool_size)
+    gate = PriorityGate(lambda: pool_size)
+    gate.record_hold(hold)
+    controller = AdmissionController(lambda: gate, budgets=settings.ADMISSION_WAIT_BUDGET_SECONDS, routes={})
+    latencies: Dict[str, List[float]] = {name: [] for name in NAMES}
+    shed = {name: 0 for name in NAMES}
+    wasted = {name: 0 for name in NAMES}
+
+    async def request(name: str) -> None:
+        start = time.perf_counter()
+        if variant == "fifo":
+            async with semaphore:
+                await asyncio.sleep(hold)
+        else:
+            priority = PRIORITIES[name]
+            if controller.check(priority):
+                shed[name] += 1
+                return
+            await gate.acquire(priority)
+            try:
+                await asyncio.sleep(hold)
+            finally:
+                gate.release()
+        elapsed = time.perf_counter() - start
+        if elapsed > client_timeout:
+            wasted[name] += 1
+        latencies[name].append(elapsed * 1000)
+
+    await asyncio.gather(*(request(NAMES[i % 3]) for i in range(requests)))
+    results = {}
+    for name in NAMES:
+        values = sorted(latencies[name]) or [0.0]
+        results[name] = {
+            "served": len(latencies[name]),
+            "shed": shed[name],
+            "wasted": wasted[name],
+            "p50": statistics.median(values),
+            "p99": values[min(len(values) - 1, int(len(values) * 0.99))],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--hold-ms", type=float, default=5)
+    parser.add_argument("--client-timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'variant':<10} {'priority':<9} {'served':>7} {'shed':>6} {'timed out':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for variant in ("fifo", "admission"):
+        results = asyncio.run(run(variant, args.requests, args.pool_size, args.hold_ms / 1000, args.client_timeout))
+        for name, r in results.items():
+            print(f"{variant:<10} {name:<9} {r['served']:>7} {r['shed']:>6} {r['wasted']:>10} {r['p50']:>9.1f} {r['p99']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Login latency while a lock blocks the user's row, with and without a request deadline.
+
+A side connection holds `SELECT ... FOR UPDATE` on a scratch user for --lock-seconds while
+--requests concurrent logins (auth/insert_refresh_token, which key-share locks the user row) run
+through AsyncDatabase. "none" is the previous behaviour: every login holds its pooled connection
+until the lock is released, the rest queue for the pool. "deadline" runs each login inside a
+--deadline second request deadline: lock_timeout / statement_timeout / the acquire timeout end
+the wait with DatabaseTimeoutError (504) and the connection goes back to the pool.
+
+Requires DATABASE_URL with the current schema (tests/sql_queries/setup_db.sql), the scratch user
+is deleted afterwards.
+
+    python -m benchmarks.deadlines --requests 50 --lock-seconds 5 --deadline 1
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from typing import Dict, Optional
+
+import psycopg
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+from app.core.db import AsyncDatabase, DatabaseTimeoutError
+from app.core.deadline import deadline
+from app.auth.repositories import AuthRepository
+
+
+async def run(url: str, requests: int, lock_seconds: float, seconds: Optional[float]) -> Dict[str, float]:
+    username = f"bench_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(url, autocommit=True) as setup:
+        user_id = setup.execute(
+            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, 'x') RETURNING id",
+            (username, f"{username}@bench.local"),
+        ).fetchone()[0]
+    database = AsyncDatabase()
+    await database.initialize()
+    repository = AuthRepository(database)
+    latencies, timeouts = [], 0
+    try:
+        async with await psycopg.AsyncConnection.connect(url) as blocker:
+            await blocker.execute("SELECT 1 FROM users WHERE id = %s FOR UPDATE", (user_id,))
+
+            async def login() -> None:
+                nonlocal timeouts
+                start = time.perf_counter()
+                try:
+                    with deadline(seconds):
+                        await repository.insert_refresh_token(username, uuid.uuid4().hex)
+                except DatabaseTimeoutError:
+                    timeouts += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            async def release() -> None:
+                await asyncio.sleep(lock_seconds)
+                await blocker.rollback()
+
+            await asyncio.gather(release(), *(login() for _ in range(requests)))
+    finally:
+        await database.close()
+        with psycopg.connect(url, autocommit=True) as cleanup:
+            cleanup.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "timeouts": timeouts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--lock-seconds", type=float, default=5)
+    parser.add_argument("--deadline", type=float, default=1)
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        raise SystemExit("DATABASE_URL is required")
+
+    print(f"{'variant':<10} {'p50 ms':>9} {'p99 ms':>9} {'timeouts':>9}")
+    for variant, seconds in (("none", None), ("deadline", args.deadline)):
+        result = asyncio.run(run(os.environ["DATABASE_URL"], args.requests, args.lock_seconds, seconds))
+        print(f"{variant:<10} {result['p50']:>9.1f} {result['p99']:>9.1f} {result['timeouts']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Per-request overhead of resolving the auth dependencies.
+
+Compares the previous chain (sync get_db / get_hasher / get_cache / get_activity, a UserService
+built per request, get_oauth2_scheme -> get_token_from_header -> get_permission_service) with
+the current one (async dependencies, the lifespan's UserService from app.state, the token read
+straight from oauth2_scheme). Both routes only decode the (cached) access token, requests are
+sent straight to the ASGI app and no database is touched.
+
+    python -m benchmarks.dependencies --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import Depends, FastAPI
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+from app.core.db import AsyncDatabase
+from app.core.dependancies import get_db
+from app.auth.dependancies import get_permission_service, oauth2_scheme
+from app.auth.service import PermissionService, UserService
+from app.auth.utils import TokenUtils
+
+
+def build_app(database: AsyncDatabase) -> FastAPI:
+    app = FastAPI()
+
+    # previous implementation, kept here as the comparison baseline
+    def previous_get_db():
+        return database
+
+    def previous_get_hasher():
+        return None
+
+    def previous_get_cache():
+        return None
+
+    def previous_get_activity():
+        return None
+
+    def previous_get_user_service(
+        db=Depends(previous_get_db),
+        hasher=Depends(previous_get_hasher),
+        user_cache=Depends(previous_get_cache),
+        activity=Depends(previous_get_activity),
+    ):
+        return UserService(db, hasher, user_cache, activity)
+
+    def previous_get_oauth2_scheme(auth_scheme=Depends(oauth2_scheme)):
+        return auth_scheme
+
+    def previous_get_token_from_header(token=Depends(previous_get_oauth2_scheme)):
+        return token
+
+    def previous_get_permission_service(token=Depends(previous_get_token_from_header), user_service=Depends(previous_get_user_service)):
+        return PermissionService(token, user_service)
+
+    @app.get("/previous")
+    async def previous(permission_service: PermissionService = Depends(previous_get_permission_service)):
+        return {"sub": permission_service.claims["sub"]}
+
+    @app.get("/current")
+    async def current(permission_service: PermissionService = Depends(get_permission_service)):
+        return {"sub": permission_service.claims["sub"]}
+
+    async def current_get_db():
+        return database
+
+    app.dependency_overrides[get_db] = current_get_db
+    app.state.user_service = UserService(database)
+    return app
+
+
+async def run(app: FastAPI, path: str, token: str, requests: int) -> float:
+    """Returns mean microseconds per request"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+        "app": app,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} returned {message['status']}")
+
+    # warm up
+    for _ in range(min(requests, 500)):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    app = build_app(AsyncDatabase())
+    token = TokenUtils.create_access_token(data={"sub": "benchmark_user", "roles": ["user"]})
+
+    results = {}
+    for name in ("previous", "current"):
+        results[name] = asyncio.run(run(app, f"/{name}", token, args.requests))
+
+    for name, us in results.items():
+        print(f"{name:<10} {us:8.1f} us/request   saved {results['previous'] - us:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
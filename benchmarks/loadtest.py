@@ -0,0 +1,284 @@
+"""
+End-to-end load test of the auth endpoints over HTTP against a local Postgres.
+
+Starts the app (uvicorn, or gunicorn with gunicorn.conf.py) unless --url is given, registers one
+account per virtual user and promotes them to admin, then each virtual user runs a weighted mix
+of scenarios back to back for --duration seconds:
+
+- register - POST /auth/register with a new username
+- login    - POST /auth/login
+- refresh  - POST /auth/refresh (refresh token from the virtual user's last login)
+- admin    - GET /admin/users?limit=50 and /admin/database/pool_stats, alternating
+
+Reports throughput and p50 / p95 / p99 latency per scenario. --save writes them as a JSON
+baseline, --baseline prints the change against one.
+
+Requires DATABASE_URL. Every request comes from one IP so the started app runs with
+LOGIN_RATE_LIMIT_ENABLED=false, set it yourself when using --url. --reset-db recreates the schema
+from tests/sql_queries/setup_db.sql - only use it against a scratch database.
+
+    python -m benchmarks.loadtest --concurrency 32 --duration 30 --mix login=4,refresh=4,admin=2,register=1
+    python -m benchmarks.loadtest --server gunicorn --workers 4 --save benchmarks/baselines/loadtest.json
+    python -m benchmarks.loadtest --baseline benchmarks/baselines/loadtest.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+import psycopg
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+REPO_DIR = Path(__file__).parent.parent
+SRC_DIR = REPO_DIR / "src"
+
+SCENARIOS = ("register", "login", "refresh", "admin")
+PASSWORD = "Loadtest-password1"
+
+
+class ScenarioStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: int = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rps": round(len(latencies) / duration, 1),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+        }
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ordered list of seconds, in milliseconds."""
+    if not ordered:
+        return None
+    return round(ordered[max(0, math.ceil(q * len(ordered)) - 1)] * 1000, 2)
+
+
+class VirtualUser:
+    """One simulated client with its own account, connection and tokens."""
+
+    def __init__(self, client: httpx.AsyncClient, username: str):
+        self.client = client
+        self.username = username
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self._admin_calls = 0
+
+    async def register(self) -> bool:
+        username = f"{self.username}_{uuid.uuid4().hex[:12]}"
+        user_data = {"username": username, "email": f"{username}@loadtest.local", "password": PASSWORD}
+        response = await self.client.post("/auth/register", json=user_data)
+        return response.status_code == 201
+
+    async def login(self) -> bool:
+        response = await self.client.post("/auth/login", data={"username": self.username, "password": PASSWORD})
+        if response.status_code != 200:
+            return False
+        self.access_token = response.json()["access_token"]
+        self.refresh_token = response.cookies.get("refresh_token")
+        return True
+
+    async def refresh(self) -> bool:
+        # the refresh token is sent as a header so secure-only cookies don't matter over plain http
+        response = await self.client.post("/auth/refresh", headers={"x_access_token": self.refresh_token or ""})
+        return response.status_code == 200
+
+    async def admin(self) -> bool:
+        self._admin_calls += 1
+        path = "/admin/users?limit=50" if self._admin_calls % 2 else "/admin/database/pool_stats"
+        response = await self.client.get(path, headers={"Authorization": f"bearer {self.access_token}"})
+        return response.status_code == 200
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario [{name}], choose from {SCENARIOS}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def start_app(server: str, workers: int) -> Iterator[str]:
+    """Run the app in a subprocess and yield its base url once it answers."""
+    port = free_port()
+    env = {
+        **os.environ,
+        "LOGIN_RATE_LIMIT_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "WEB_CONCURRENCY": str(workers),
+    }
+    if server == "gunicorn":
+        command = ["gunicorn", "main:app", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=SRC_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(url + "/", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit(f"{server} did not start (exit code {process.poll()})")
+            time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
+
+
+def prepare_database(prefix: str, reset: bool) -> None:
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+        if reset:
+            conn.execute((REPO_DIR / "tests" / "sql_queries" / "setup_db.sql").read_text())
+        conn.execute(
+            """
+            INSERT INTO user_roles (user_id, role_id)
+            SELECT u.id, r.id FROM users u CROSS JOIN roles r
+            WHERE u.username LIKE %(prefix)s AND r.role_name = 'admin'
+            ON CONFLICT DO NOTHING
+            """,
+            {"prefix": f"{prefix}%"},
+        )
+
+
+async def run(url: str, concurrency: int, duration: float, weights: Dict[str, float], reset_db: bool) -> Dict[str, Dict[str, float]]:
+    prefix = f"lt_{uuid.uuid4().hex[:8]}_"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        if reset_db:
+            prepare_database(prefix, reset=True)
+        users = [VirtualUser(client, f"{prefix}{i}") for i in range(concurrency)]
+        # setup is not measured: one account per virtual user, promoted to admin, logged in
+        for user in users:
+            user_data = {"username": user.username, "email": f"{user.username}@loadtest.local", "password": PASSWORD}
+            response = await client.post("/auth/register", json=user_data)
+            response.raise_for_status()
+        prepare_database(prefix, reset=False)
+        if not all(await asyncio.gather(*(user.login() for user in users))):
+            raise SystemExit("Virtual users could not login, is login throttling disabled?")
+
+        stats = {name: ScenarioStats() for name in weights}
+        names, scenario_weights = list(weights), list(weights.values())
+        deadline = time.perf_counter() + duration
+
+        async def virtual_user(user: VirtualUser, rng: random.Random) -> None:
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, scenario_weights)[0]
+                start = time.perf_counter()
+                try:
+                    ok = await getattr(user, name)()
+                except httpx.HTTPError:
+                    ok = False
+                stats[name].record(time.perf_counter() - start, ok)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(user, random.Random(i)) for i, user in enumerate(users)))
+        elapsed = time.perf_counter() - started
+    return {name: scenario.summary(elapsed) for name, scenario in stats.items()}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, float]], baseline: Optional[dict]) -> None:
+    print(f"{'scenario':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9} "
+            f"{result['p50_ms'] or '-':>9} {result['p95_ms'] or '-':>9} {result['p99_ms'] or '-':>9}"
+        )
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous:
+            changes = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if previous.get(key) and result.get(key) is not None:
+                    changes.append(f"{key} {(result[key] - previous[key]) / previous[key] * 100:+.1f}%")
+            print(f"{'':<10} vs baseline {baseline['meta'].get('git_commit')}: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running app instead of starting one")
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--mix", default="login=4,refresh=4,admin=2,register=1")
+    parser.add_argument("--reset-db", action="store_true", help="recreate the schema first (scratch databases only)")
+    parser.add_argument("--save", type=Path, help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", type=Path, help="compare against a saved baseline")
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        raise SystemExit("DATABASE_URL is required")
+    weights = parse_mix(args.mix)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    if args.url:
+        results = asyncio.run(run(args.url, args.concurrency, args.duration, weights, args.reset_db))
+    else:
+        with start_app(args.server, args.workers) as url:
+            results = asyncio.run(run(url, args.concurrency, args.duration, weights, args.reset_db))
+
+    print_results(results, baseline)
+    if args.save:
+        meta = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "server": "external" if args.url else args.server,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": weights,
+        }
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({"meta": meta, "scenarios": results}, indent=2) + "\n")
+        print(f"Saved baseline to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Microbenchmarks of the CPU hot paths, no database required.
+
+Measures ops/sec (best of --rounds, each round runs for about --round-seconds) and the peak
+memory allocated by a single call (tracemalloc) of:
+
+- TokenUtils - create_access_token, decode_token with and without the verified token cache
+- PasswordUtils - hash_password (default cost) and verify_password at bcrypt cost 4 / 10 / 12
+- RegisterRequest - validation of a valid and an invalid payload
+- UserResponse / User - construction from a database row, User JSON serialization
+
+Results are compared against a stored baseline, the exit code is 1 when a benchmark is slower
+(ops/sec) or allocates more than --threshold relative to it. Baselines are machine specific:
+record them with --save on the machine that runs the comparison. Token benchmarks are named
+after ALGORITHM, e.g. `ALGORITHM=EdDSA python -m benchmarks.micro` records separate entries.
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter token --threshold 0.1
+    python -m benchmarks.micro --save
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import bcrypt
+
+from pydantic import ValidationError
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+from config import get_settings
+from app.auth.models import RegisterRequest, User, UserResponse
+from app.auth.utils import PasswordUtils, TokenUtils
+
+settings = get_settings()
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+
+PASSWORD = "Benchmark-password1"
+USER_ROW = {
+    "id": 1,
+    "username": "benchmark_user",
+    "email": "benchmark_user@example.com",
+    "password_hash": "$2b$12$" + "a" * 53,
+    "user_roles": ["user", "admin"],
+    "is_active": True,
+    "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+}
+
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    """Benchmark name -> zero argument callable, fixtures are created once here."""
+    token = TokenUtils.create_access_token(data={"sub": USER_ROW["username"]})
+
+    def decode_uncached():
+        TokenUtils.cache.clear()
+        return TokenUtils.decode_token(token)
+
+    def register_invalid():
+        try:
+            RegisterRequest(username="benchmark_user", email="not-an-email", password="weakpassword")
+        except ValidationError:
+            pass
+
+    hashes = {cost: bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(cost)).decode("utf-8") for cost in (4, 10, 12)}
+    user = User(**USER_ROW)
+
+    algorithm = settings.ALGORITHM
+    return {
+        f"token.create_access_token[{algorithm}]": lambda: TokenUtils.create_access_token(data={"sub": USER_ROW["username"]}),
+        f"token.decode_token[{algorithm}]": decode_uncached,
+        f"token.decode_token_cached[{algorithm}]": lambda: TokenUtils.decode_token(token),
+        "password.hash_password": lambda: PasswordUtils.hash_password(PASSWORD),
+        **{f"password.verify_password[cost={cost}]": (lambda h=h: PasswordUtils.verify_password(PASSWORD, h)) for cost, h in hashes.items()},
+        "models.RegisterRequest[valid]": lambda: RegisterRequest(username="benchmark_user", email="Benchmark@Example.com", password=PASSWORD),
+        "models.RegisterRequest[invalid]": register_invalid,
+        "models.UserResponse[row]": lambda: UserResponse(**USER_ROW),
+        "models.User[row]": lambda: User(**USER_ROW),
+        "models.User.model_dump_json": user.model_dump_json,
+    }
+
+
+def measure_ops(func: Callable[[], object], rounds: int, round_seconds: float) -> float:
+    """Best ops/sec over `rounds`, the number of calls per round is calibrated to last about `round_seconds`."""
+    func()  # warm up (regex / validator / key caches)
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= round_seconds / 10:
+            break
+        calls *= 2
+    calls = max(1, int(calls * round_seconds / elapsed))
+
+    results = [calls / elapsed] if elapsed >= round_seconds else []
+    while len(results) < rounds:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        results.append(calls / (time.perf_counter() - start))
+    return max(results)
+
+
+def measure_alloc(func: Callable[[], object], calls: int = 5) -> int:
+    """Median peak bytes allocated by one call."""
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(calls):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return int(statistics.median(peaks))
+
+
+def compare(name: str, result: Dict[str, float], baseline: Optional[Dict[str, float]], threshold: float) -> str:
+    """Change against the baseline, prefixed with REGRESSION when beyond `threshold`."""
+    if not baseline:
+        return "no baseline"
+    ops_change = result["ops_per_sec"] / baseline["ops_per_sec"] - 1
+    alloc_change = result["alloc_bytes"] / baseline["alloc_bytes"] - 1 if baseline["alloc_bytes"] else 0.0
+    summary = f"ops/s {ops_change * 100:+.1f}%  alloc {alloc_change * 100:+.1f}%"
+    if ops_change < -threshold or alloc_change > threshold:
+        return f"REGRESSION {summary}"
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--round-seconds", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression, 0.25 = 25%%")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results to --baseline instead of failing on regressions")
+    args = parser.parse_args()
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"meta": {}, "benchmarks": {}}
+    results, regressions = {}, []
+    for name, func in build_benchmarks().items():
+        if args.filter not in name:
+            continue
+        results[name] = {
+            "ops_per_sec": round(measure_ops(func, args.rounds, args.round_seconds), 1),
+            "alloc_bytes": measure_alloc(func),
+        }
+        change = compare(name, results[name], stored["benchmarks"].get(name), args.threshold)
+        if change.startswith("REGRESSION"):
+            regressions.append(name)
+        print(f"{name:<45} {results[name]['ops_per_sec']:>12,.1f} ops/s {results[name]['alloc_bytes']:>9,} B   {change}")
+
+    if args.save:
+        stored["meta"] = {"timestamp": datetime.now(timezone.utc).isoformat(), "python": sys.version.split()[0]}
+        stored["benchmarks"].update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
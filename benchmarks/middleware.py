@@ -0,0 +1,92 @@
+"""
+Per-request overhead of the request logging middleware.
+
+Compares no middleware, the previous BaseHTTPMiddleware implementation and the pure ASGI
+LoggingMiddleware on a trivial endpoint. Requests are sent straight to the ASGI app (no
+sockets) so only framework / middleware cost is measured.
+
+    python -m benchmarks.middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+from app.core.utils import LoggingMiddleware
+
+
+class BaseHTTPLoggingMiddleware(BaseHTTPMiddleware):
+    """Previous implementation, kept here as the comparison baseline"""
+
+    async def dispatch(self, request, call_next):
+        start_time = time.perf_counter()
+        response = await call_next(request)
+        process_time = time.perf_counter() - start_time
+        response.headers["X-Process-Time"] = str(process_time)
+        return response
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ping": "pong"}
+
+    if middleware:
+        app.add_middleware(middleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int) -> float:
+    """Returns mean microseconds per request"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # warm up
+    for _ in range(min(requests, 500)):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, middleware in [("none", None), ("base_http", BaseHTTPLoggingMiddleware), ("pure_asgi", LoggingMiddleware)]:
+        results[name] = asyncio.run(run(build_app(middleware), args.requests))
+
+    for name, us in results.items():
+        print(f"{name:<10} {us:8.1f} us/request   overhead {us - results['none']:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
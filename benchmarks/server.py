@@ -0,0 +1,147 @@
+"""
+Throughput and memory per worker of gunicorn server profiles.
+
+Starts `gunicorn main:app -c gunicorn.conf.py` once per profile (SERVER_* settings overridden
+through the environment), sends keep-alive GET / requests from --connections concurrent
+connections for --duration seconds, then reads the memory of every worker from
+/proc/<pid>/smaps_rollup (Linux only):
+
+- rss - resident memory, pages shared copy-on-write with the master are counted in every worker
+- pss - shared pages divided between the processes sharing them
+- uss - memory private to the worker
+
+GET / does not touch the database, an unreachable DATABASE_URL only produces connection errors
+in the log. The load generator runs on the same machine, compare profiles rather than absolute
+numbers and leave it a core (--workers below the core count).
+
+    python -m benchmarks.server --workers 2 --duration 10
+    python -m benchmarks.server --profiles previous,tuned
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Dict, List
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+PROFILES: Dict[str, Dict[str, str]] = {
+    # gunicorn.conf.py before the SERVER_* settings: no preload / recycling, gunicorn's keep-alive, auto loop
+    "previous": {
+        "SERVER_PRELOAD": "false",
+        "SERVER_LOOP": "auto",
+        "SERVER_HTTP": "auto",
+        "SERVER_KEEPALIVE_SECONDS": "2",
+        "SERVER_MAX_REQUESTS": "0",
+        "SERVER_MAX_REQUESTS_JITTER": "0",
+    },
+    "asyncio_h11": {"SERVER_LOOP": "asyncio", "SERVER_HTTP": "h11"},
+    "tuned": {},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker_pids(master_pid: int) -> List[int]:
+    children = Path(f"/proc/{master_pid}/task/{master_pid}/children").read_text().split()
+    return [int(pid) for pid in children]
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0])
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+async def drive(port: int, connections: int, duration: float) -> int:
+    """Keep-alive GET / on every connection until `duration` is over, returns completed requests."""
+    request = b"GET / HTTP/1.1\r\nHost: bench\r\n\r\n"
+    deadline = time.perf_counter() + duration
+
+    async def connection() -> int:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        completed = 0
+        try:
+            while time.perf_counter() < deadline:
+                writer.write(request)
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = next(int(line.split(b":")[1]) for line in headers.split(b"\r\n") if line.lower().startswith(b"content-length"))
+                await reader.readexactly(length)
+                completed += 1
+        finally:
+            writer.close()
+        return completed
+
+    return sum(await asyncio.gather(*(connection() for _ in range(connections))))
+
+
+def run_profile(name: str, workers: int, connections: int, duration: float) -> Dict[str, float]:
+    port = free_port()
+    env = {
+        **os.environ,
+        **PROFILES[name],
+        "ENVIRONMENT": "production",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret-key"),
+        "DATABASE_URL": os.environ.get("DATABASE_URL", "postgresql://benchmark@127.0.0.1:1/benchmark"),
+        "LOG_DIRECTORY": os.environ.get("LOG_DIRECTORY", tempfile.gettempdir()),
+        "WEB_CONCURRENCY": str(workers),
+        "SERVER_BIND": f"127.0.0.1:{port}",
+    }
+    process = subprocess.Popen(["gunicorn", "main:app", "-c", "gunicorn.conf.py"], cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while len(worker_pids(process.pid)) < workers or not _responds(port):
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit(f"gunicorn did not start for profile [{name}]")
+            time.sleep(0.2)
+        asyncio.run(drive(port, connections, min(2.0, duration)))  # warm up
+        requests = asyncio.run(drive(port, connections, duration))
+        memory = [memory_kb(pid) for pid in worker_pids(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "rps": requests / duration,
+        **{f"{key}_mb": sum(m[key] for m in memory) / len(memory) / 1024 for key in ("rss", "pss", "uss")},
+    }
+
+
+def _responds(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+            sock.sendall(b"GET / HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n")
+            return sock.recv(12).startswith(b"HTTP/1.1 200")
+    except OSError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'req/s':>9} {'rss MB':>8} {'pss MB':>8} {'uss MB':>8}   (memory per worker)")
+    for name in args.profiles.split(","):
+        result = run_profile(name, args.workers, args.connections, args.duration)
+        print(f"{name:<12} {result['rps']:>9.0f} {result['rss_mb']:>8.1f} {result['pss_mb']:>8.1f} {result['uss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Login (insert_refresh_token) cost as a user's refresh session history grows.
+
+Compares the previous per-row trigger (COUNT(*) then delete the single oldest session, cap 2) with
+the set-based pruning in sql_queries/auth/insert_refresh_token.sql. For every --history size a
+user starts with that many sessions, then the first login and the mean of --logins further
+logins are timed.
+
+Requires DATABASE_URL with the current schema (tests/sql_queries/setup_db.sql). Every login
+commits, the scratch user (and its sessions) is deleted after each run, but the previous
+variant's trigger is installed on user_refresh_tokens while it runs - use a scratch database.
+
+    python -m benchmarks.sessions --history 10,1000,100000 --logins 200
+    python -m benchmarks.sessions --save benchmarks/baselines/sessions.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+from typing import Dict
+
+import psycopg
+
+import benchmarks  # noqa: F401 - sets up sys.path / environment
+
+from app.core.queries import sql_catalog
+
+PREVIOUS_TRIGGER = """
+CREATE FUNCTION bench_limit_user_refresh_tokens() RETURNS TRIGGER AS $$
+DECLARE
+    row_count INTEGER;
+    oldest_id INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO row_count FROM user_refresh_tokens WHERE user_id = NEW.user_id;
+    IF row_count > 2 THEN
+        SELECT id INTO oldest_id FROM user_refresh_tokens WHERE user_id = NEW.user_id ORDER BY created_at ASC LIMIT 1;
+        DELETE FROM user_refresh_tokens WHERE id = oldest_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_limit_user_refresh_tokens AFTER INSERT ON user_refresh_tokens
+    FOR EACH ROW EXECUTE FUNCTION bench_limit_user_refresh_tokens();
+"""
+
+PREVIOUS_INSERT = """
+WITH token_insert AS (
+    INSERT INTO user_refresh_tokens (user_id, refresh_token_hash)
+    SELECT u.id, %(refresh_token_hash)s FROM users u WHERE u.username = %(username)s
+    RETURNING user_id
+)
+UPDATE users SET last_login_at = NOW() AT TIME ZONE 'UTC' FROM token_insert WHERE users.id = token_insert.user_id
+"""
+
+
+def run(conn: psycopg.Connection, variant: str, history: int, logins: int) -> Dict[str, float]:
+    # every login commits like in the application: rows deleted by a rolled back / still open transaction stay
+    # in the index as dead entries every later scan has to step over
+    username = f"bench_{uuid.uuid4().hex[:12]}"
+    user_id = conn.execute(
+        "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, 'x') RETURNING id",
+        (username, f"{username}@bench.local"),
+    ).fetchone()[0]
+    try:
+        conn.execute(
+            """
+            INSERT INTO user_refresh_tokens (user_id, refresh_token_hash, created_at)
+            SELECT %s, sha256(convert_to(%s || i, 'UTF8')), NOW() - make_interval(secs => i)
+            FROM generate_series(1, %s) AS i
+            """,
+            (user_id, username, history),
+        )
+        conn.execute("ANALYZE user_refresh_tokens")
+        if variant == "previous":
+            conn.execute(PREVIOUS_TRIGGER)
+            query, extra = PREVIOUS_INSERT, {}
+        else:
+            query, extra = sql_catalog.get("auth/insert_refresh_token").text, {"session_cap": 2}
+
+        def login(i: int) -> float:
+            params = {"username": username, "refresh_token_hash": uuid.uuid4().bytes + bytes([i % 256]), **extra}
+            start = time.perf_counter()
+            conn.execute(query, params, prepare=True)
+            return (time.perf_counter() - start) * 1000
+
+        first = login(0)
+        # the set-based prune deletes the whole backlog past the cap on the first login, the trigger one row
+        first_deleted = history + 1 - conn.execute("SELECT COUNT(*) FROM user_refresh_tokens WHERE user_id = %s", (user_id,)).fetchone()[0]
+        steady = sum(login(i) for i in range(1, logins + 1)) / logins
+        sessions = conn.execute("SELECT COUNT(*) FROM user_refresh_tokens WHERE user_id = %s", (user_id,)).fetchone()[0]
+    finally:
+        conn.execute("DROP TRIGGER IF EXISTS trigger_limit_user_refresh_tokens ON user_refresh_tokens")
+        conn.execute("DROP FUNCTION IF EXISTS bench_limit_user_refresh_tokens()")
+        conn.execute("DELETE FROM users WHERE id = %s", (user_id,))
+    return {"first_ms": first, "first_deleted": first_deleted, "steady_ms": steady, "sessions_left": sessions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", default="10,1000,10000,100000", help="comma separated session counts")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--save", type=Path, help="also write the results and the server / client versions to this JSON file")
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        raise SystemExit("DATABASE_URL is required")
+
+    results = []
+    print(f"{'variant':<10} {'history':>8} {'first ms':>10} {'first deleted':>14} {'steady ms':>10} {'sessions left':>14}")
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as conn:
+        server = conn.execute("SELECT version()").fetchone()[0]
+        for history in (int(h) for h in args.history.split(",")):
+            for variant in ("previous", "set_based"):
+                result = run(conn, variant, history, args.logins)
+                results.append({"variant": variant, "history": history, **{k: round(v, 3) for k, v in result.items()}})
+                print(
+                    f"{variant:<10} {history:>8} {result['first_ms']:>10.3f} {result['first_deleted']:>14} "
+                    f"{result['steady_ms']:>10.3f} {result['sessions_left']:>14}"
+                )
+    print(server)
+
+    if args.save:
+        meta = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "psycopg": psycopg.__version__,
+            "server": server,
+            "command": f"python -m benchmarks.sessions --history {args.history} --logins {args.logins}",
+        }
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n")
+        print(f"Saved {len(results)} results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+-- DOWN Migration
+DROP TRIGGER IF EXISTS trigger_notify_users_updated ON users;
+
+DROP TRIGGER IF EXISTS trigger_notify_users_deleted ON users;
+
+DROP TRIGGER IF EXISTS trigger_notify_user_roles_inserted ON user_roles;
+
+DROP TRIGGER IF EXISTS trigger_notify_user_roles_updated ON user_roles;
+
+DROP TRIGGER IF EXISTS trigger_notify_user_roles_deleted ON user_roles;
+
+DROP TRIGGER IF EXISTS trigger_notify_roles_changed ON roles;
+
+DROP FUNCTION IF EXISTS notify_roles_changed();
+
+DROP FUNCTION IF EXISTS notify_user_roles_deleted();
+
+DROP FUNCTION IF EXISTS notify_user_roles_inserted();
+
+DROP FUNCTION IF EXISTS notify_users_deleted();
+
+DROP FUNCTION IF EXISTS notify_users_updated();
+
+DROP FUNCTION IF EXISTS notify_user_changes(TEXT[]);
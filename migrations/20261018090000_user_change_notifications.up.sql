@@ -0,0 +1,123 @@
+-- UP Migration
+-- Publish changed usernames on channel `auth_user_changes` so each API worker can invalidate its user cache
+
+
+-- Send one notification per username, or a single '*' (invalidate everything) for bulk changes
+CREATE OR REPLACE FUNCTION notify_user_changes(usernames TEXT[])
+RETURNS VOID AS $$
+DECLARE
+    changed_username TEXT;
+BEGIN
+    IF usernames IS NULL OR cardinality(usernames) = 0 THEN
+        RETURN;
+    END IF;
+
+    IF cardinality(usernames) > 500 THEN
+        PERFORM pg_notify('auth_user_changes', '*');
+        RETURN;
+    END IF;
+
+    FOREACH changed_username IN ARRAY usernames LOOP
+        PERFORM pg_notify('auth_user_changes', changed_username);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Only columns returned by get_user_by_username matter, so last_login_at updates do not invalidate anything
+CREATE OR REPLACE FUNCTION notify_users_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(
+        SELECT DISTINCT o.username
+        FROM old_users o
+        INNER JOIN new_users n ON o.id = n.id
+        WHERE (o.username, o.email, o.password_hash, o.verified, o.created_at)
+            IS DISTINCT FROM (n.username, n.email, n.password_hash, n.verified, n.created_at)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_users_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(SELECT DISTINCT username FROM old_users));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_user_roles_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(
+        SELECT DISTINCT u.username FROM new_user_roles nr INNER JOIN users u ON u.id = nr.user_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_user_roles_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(
+        SELECT DISTINCT u.username FROM old_user_roles o INNER JOIN users u ON u.id = o.user_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_roles_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('auth_user_changes', '*');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- SET Triggers - statement level so bulk changes cost one trigger call (transition tables allow a single event each)
+
+
+CREATE TRIGGER trigger_notify_users_updated
+    AFTER UPDATE ON users
+    REFERENCING OLD TABLE AS old_users NEW TABLE AS new_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_users_updated();
+
+
+CREATE TRIGGER trigger_notify_users_deleted
+    AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_users_deleted();
+
+
+CREATE TRIGGER trigger_notify_user_roles_inserted
+    AFTER INSERT ON user_roles
+    REFERENCING NEW TABLE AS new_user_roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_roles_inserted();
+
+
+CREATE TRIGGER trigger_notify_user_roles_updated
+    AFTER UPDATE ON user_roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_roles_changed();
+
+
+CREATE TRIGGER trigger_notify_user_roles_deleted
+    AFTER DELETE ON user_roles
+    REFERENCING OLD TABLE AS old_user_roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_roles_deleted();
+
+
+CREATE TRIGGER trigger_notify_roles_changed
+    AFTER UPDATE OR DELETE ON roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_roles_changed();
@@ -0,0 +1,12 @@
+-- DOWN Migration
+-- Token text cannot be recovered from its digest, every existing session is removed (users have to login again)
+
+DROP INDEX IF EXISTS idx_user_refresh_tokens_user_id;
+
+DROP INDEX IF EXISTS idx_user_refresh_tokens_hash;
+
+DELETE FROM user_refresh_tokens;
+
+ALTER TABLE user_refresh_tokens ADD COLUMN refresh_token TEXT NOT NULL;
+
+ALTER TABLE user_refresh_tokens DROP COLUMN refresh_token_hash;
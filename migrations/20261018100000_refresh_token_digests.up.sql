@@ -0,0 +1,20 @@
+-- UP Migration
+-- Store refresh tokens as fixed size sha256 digests with supporting indexes instead of the full JWT text
+
+ALTER TABLE user_refresh_tokens ADD COLUMN refresh_token_hash BYTEA;
+
+UPDATE user_refresh_tokens SET refresh_token_hash = sha256(convert_to(refresh_token, 'UTF8'));
+
+-- identical tokens (same user / roles / expiry second) could have been stored twice, keep the newest row
+DELETE FROM user_refresh_tokens t
+USING user_refresh_tokens newer
+WHERE t.refresh_token_hash = newer.refresh_token_hash
+    AND t.id < newer.id;
+
+ALTER TABLE user_refresh_tokens ALTER COLUMN refresh_token_hash SET NOT NULL;
+
+ALTER TABLE user_refresh_tokens DROP COLUMN refresh_token;
+
+CREATE UNIQUE INDEX idx_user_refresh_tokens_hash ON user_refresh_tokens (refresh_token_hash);
+
+CREATE INDEX idx_user_refresh_tokens_user_id ON user_refresh_tokens (user_id);
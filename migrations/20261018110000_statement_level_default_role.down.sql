@@ -0,0 +1,32 @@
+-- DOWN Migration
+
+DROP TRIGGER IF EXISTS trigger_create_default_user_roles ON users;
+
+DROP FUNCTION IF EXISTS create_default_user_roles();
+
+
+CREATE OR REPLACE FUNCTION create_default_user_role()
+RETURNS TRIGGER AS $$
+DECLARE
+    default_role_id INTEGER;
+BEGIN
+    -- Get the ID of the 'user' role
+    SELECT id INTO default_role_id 
+    FROM roles 
+    WHERE role_name = 'user';
+    
+    -- Insert the default role assignment
+    IF default_role_id IS NOT NULL THEN
+        INSERT INTO user_roles (user_id, role_id)
+        VALUES (NEW.id, default_role_id);
+    END IF;
+    
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER trigger_create_default_user_role
+    AFTER INSERT ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION create_default_user_role();
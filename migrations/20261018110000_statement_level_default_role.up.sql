@@ -0,0 +1,28 @@
+-- UP Migration
+-- Assign the default 'user' role once per INSERT statement instead of once per row, so bulk imports
+-- (INSERT ... SELECT from a staging table) assign every role in one set-based statement
+
+
+DROP TRIGGER IF EXISTS trigger_create_default_user_role ON users;
+
+DROP FUNCTION IF EXISTS create_default_user_role();
+
+
+CREATE OR REPLACE FUNCTION create_default_user_roles()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO user_roles (user_id, role_id)
+    SELECT n.id, r.id
+    FROM new_users n
+    CROSS JOIN roles r
+    WHERE r.role_name = 'user';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER trigger_create_default_user_roles
+    AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION create_default_user_roles();
@@ -0,0 +1,40 @@
+-- DOWN Migration
+
+CREATE INDEX IF NOT EXISTS idx_user_refresh_tokens_user_id ON user_refresh_tokens (user_id);
+
+DROP INDEX IF EXISTS idx_user_refresh_tokens_user_created;
+
+
+CREATE OR REPLACE FUNCTION limit_user_refresh_tokens()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_count INTEGER;
+    oldest_id INTEGER;
+BEGIN
+    -- Count existing rows for this user
+    SELECT COUNT(*) INTO row_count
+    FROM user_refresh_tokens 
+    WHERE user_id = NEW.user_id;
+    
+    -- If user now has more than 2 rows, delete the oldest one
+    IF row_count > 2 THEN
+        -- Find the oldest row for this user (assuming you have a timestamp or auto-increment id)
+        SELECT id INTO oldest_id
+        FROM user_refresh_tokens 
+        WHERE user_id = NEW.user_id
+        ORDER BY created_at ASC -- or ORDER BY id ASC if using auto-increment
+        LIMIT 1;
+        -- Delete the oldest row
+        DELETE FROM user_refresh_tokens 
+        WHERE id = oldest_id;
+    END IF;
+    
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER trigger_limit_user_refresh_tokens
+    AFTER INSERT ON user_refresh_tokens
+    FOR EACH ROW
+    EXECUTE FUNCTION limit_user_refresh_tokens();
@@ -0,0 +1,14 @@
+-- UP Migration
+-- Session capping moves into insert_refresh_token.sql (one set-based DELETE per login, cap from
+-- REFRESH_TOKEN_SESSION_CAP), the per-row trigger and its hardcoded cap of 2 are dropped.
+-- (user_id, created_at, id) serves the newest-first scan and the range delete, and replaces the user_id index.
+
+
+DROP TRIGGER IF EXISTS trigger_limit_user_refresh_tokens ON user_refresh_tokens;
+
+DROP FUNCTION IF EXISTS limit_user_refresh_tokens();
+
+
+CREATE INDEX IF NOT EXISTS idx_user_refresh_tokens_user_created ON user_refresh_tokens (user_id, created_at, id);
+
+DROP INDEX IF EXISTS idx_user_refresh_tokens_user_id;
@@ -0,0 +1,3 @@
+-- DOWN Migration
+
+DROP INDEX IF EXISTS idx_user_refresh_tokens_created;
@@ -0,0 +1,6 @@
+-- UP Migration
+-- RefreshTokenReaper deletes expired sessions oldest first in small batches, without this index every
+-- batch would scan the whole table
+
+
+CREATE INDEX IF NOT EXISTS idx_user_refresh_tokens_created ON user_refresh_tokens (created_at);
@@ -0,0 +1,20 @@
+from typing import Annotated, Optional
+
+from fastapi import Depends
+
+from app.core.db import AsyncDatabase
+from app.core.executor import HashingExecutor
+
+from app.core.dependancies import get_db, get_hasher
+from app.admin.service import UserImportService, UserListService
+
+
+async def get_import_service(
+    db: Annotated[AsyncDatabase, Depends(get_db)],
+    hasher: Annotated[Optional[HashingExecutor], Depends(get_hasher)],
+):
+    return UserImportService(db, hasher)
+
+
+async def get_user_list_service(db: Annotated[AsyncDatabase, Depends(get_db)]):
+    return UserListService(db)
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List
+
+from app.auth.models import RegisterRequest
+
+# bcrypt modular crypt format, e.g. hashes exported from another system
+BCRYPT_PATTERN = r"^\$2[aby]?\$\d{2}\$[./A-Za-z0-9]{53}$"
+
+
+class ImportUserRequest(RegisterRequest):
+    """
+    One row of a bulk user import, validated like a registration.
+
+    Rows carry either a plain text `password` (hashed during the import) or an existing bcrypt
+    `password_hash`, which skips hashing entirely.
+    """
+
+    password: Optional[str] = Field(None, min_length=8, max_length=128)
+    password_hash: Optional[str] = Field(None, pattern=BCRYPT_PATTERN)
+
+    @model_validator(mode="after")
+    def check_password(self) -> "ImportUserRequest":
+        if (self.password is None) == (self.password_hash is None):
+            raise ValueError("Provide exactly one of password or password_hash")
+        return self
+
+
+class ImportRowError(BaseModel):
+    line: int
+    username: Optional[str] = None
+    errors: List[str]
+
+
+class ImportResponse(BaseModel):
+    received: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+
+
+class UserListQuery(BaseModel):
+    """
+    Query parameters of the admin user listing.
+
+    Pages are keyset paginated: pass `next_after_id` of a page as `after_id` to get the next one.
+    `_from` bounds are inclusive, `_to` bounds exclusive. `/admin/users/export` takes the same
+    parameters and streams every matching user after `after_id` (`limit` is ignored).
+    """
+
+    after_id: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=1000)
+    role: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    last_login_from: Optional[datetime] = None
+    last_login_to: Optional[datetime] = None
+
+
+class AdminUser(BaseModel):
+    id: int
+    username: str
+    email: str
+    user_roles: List[str]
+    created_at: datetime
+    last_login_at: Optional[datetime] = None
+    verified: bool
+
+
+class UserPage(BaseModel):
+    users: List[AdminUser]
+    next_after_id: Optional[int] = None
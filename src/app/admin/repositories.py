@@ -0,0 +1,33 @@
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.core.db import AsyncDatabase
+from app.core.queries import sql_catalog
+
+
+class AdminRepository:
+    """Repository for admin only database operations, e.g. bulk user imports."""
+
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+
+    async def import_users(self, rows: Iterable[Tuple[int, str, str, str]]) -> List[dict]:
+        """
+        COPY (line, username, email, password_hash) rows into a staging table and insert them all at once.
+        Returns the rows skipped because their username or email is already registered.
+        """
+        return await self.db.copy_fetchall(
+            setup=sql_catalog.get("admin/create_user_import_staging"),
+            copy=sql_catalog.get("admin/copy_user_import_staging"),
+            rows=rows,
+            query=sql_catalog.get("admin/import_users"),
+        )
+
+    async def list_users(self, filters: Dict[str, Any], after_id: int, limit: Optional[int]) -> List[dict]:
+        """One keyset page of users ordered by id."""
+        params = {**filters, "after_id": after_id, "limit": limit}
+        return await self.db.fetchall(sql_catalog.get("admin/list_users"), params=params, intent="read")
+
+    def stream_users(self, filters: Dict[str, Any], after_id: int) -> AsyncIterator[dict]:
+        """Every matching user after `after_id`, streamed from a server-side cursor."""
+        params = {**filters, "after_id": after_id, "limit": None}
+        return self.db.stream(sql_catalog.get("admin/list_users"), params=params, intent="read")
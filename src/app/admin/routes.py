@@ -1,12 +1,25 @@
 import logging
 
-from fastapi import APIRouter, Depends
+from typing import Annotated, Optional
 
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.activity import ActivityBuffer
 from app.core.db import AsyncDatabase
+from app.core.cache import InvalidationCache
+from app.core.executor import HashingExecutor
+from app.core.ratelimit import RateLimiter
+from app.core.logging import get_log_queue_stats
+from app.core.queries import sql_catalog
 from app.core.utils import ErrorHandlerRoute
 
-from app.core.dependancies import get_db
+from app.core.dependancies import get_db, get_hasher, get_cache, get_limiter, get_activity
+from app.admin.dependancies import get_import_service, get_user_list_service
+from app.admin.models import ImportResponse, UserListQuery, UserPage
+from app.admin.service import UserImportService, UserListService
 from app.auth.dependancies import require_admin
+from app.auth.utils import TokenUtils
 
 log = logging.getLogger("admin.routes")
 
@@ -26,7 +39,61 @@ def pool_stats(database: AsyncDatabase = Depends(get_db)):
     return database.pool_stats
 
 
+@admin_router.get("/database/query_stats")
+def query_stats():
+    return sql_catalog.stats
+
+
 @admin_router.get("/database/health_check")
 async def health_check(database: AsyncDatabase = Depends(get_db)):
     log.info("[admin.health_check] Checking database status")
     await database.health_check()
+
+
+@admin_router.get("/hashing/stats")
+def hashing_stats(hasher: Optional[HashingExecutor] = Depends(get_hasher)):
+    return hasher.stats if hasher else {}
+
+
+@admin_router.get("/cache/stats")
+def cache_stats(user_cache: Optional[InvalidationCache] = Depends(get_cache)):
+    return {"user_cache": user_cache.stats if user_cache else {}, "token_cache": TokenUtils.cache.stats}
+
+
+@admin_router.get("/ratelimit/stats")
+def ratelimit_stats(limiter: Optional[RateLimiter] = Depends(get_limiter)):
+    return limiter.stats if limiter else {}
+
+
+@admin_router.get("/activity/stats")
+def activity_stats(activity: Optional[ActivityBuffer] = Depends(get_activity)):
+    return activity.stats if activity else {}
+
+
+@admin_router.get("/logging/stats")
+def logging_stats():
+    return get_log_queue_stats()
+
+
+@admin_router.get("/users", response_model=UserPage)
+async def list_users(query: Annotated[UserListQuery, Query()], list_service: UserListService = Depends(get_user_list_service)):
+    """Keyset paginated users (`after_id` / `next_after_id`)."""
+    return await list_service.list_users(query)
+
+
+@admin_router.get("/users/export")
+async def export_users(query: Annotated[UserListQuery, Query()], list_service: UserListService = Depends(get_user_list_service)):
+    """
+    Every matching user after `after_id` as NDJSON, streamed from a server-side cursor (`limit` is ignored).
+    Runs under its own deadline (REQUEST_DEADLINE_ROUTES), which bounds how long it holds a connection.
+    """
+    return StreamingResponse(list_service.export_users(query), media_type="application/x-ndjson")
+
+
+@admin_router.post("/users/bulk", response_model=ImportResponse)
+async def bulk_import_users(request: Request, import_service: UserImportService = Depends(get_import_service)):
+    """
+    Import users from a streamed CSV (header row: username,email,password or password_hash) or NDJSON body.
+    Valid rows are created with the default role, every other row is reported with its line number.
+    """
+    return await import_service.import_users(request.headers.get("content-type", ""), request.stream())
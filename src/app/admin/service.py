@@ -0,0 +1,184 @@
+import asyncio
+import codecs
+import csv
+import json
+import logging
+
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from config import get_settings
+
+from app.core.db import AsyncDatabase
+from app.core.executor import HashingExecutor
+from app.admin.repositories import AdminRepository
+from app.auth.utils import PasswordUtils
+
+import app.admin.models as models
+
+settings = get_settings()
+
+log = logging.getLogger("admin.service")
+
+# user listing filters passed straight through to `list_users.sql`
+USER_LIST_FILTERS = ("role", "created_from", "created_to", "last_login_from", "last_login_to")
+
+IMPORT_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+
+class UserImportService:
+    """
+    Bulk user import: rows are streamed, validated, hashed in parallel and loaded in batches.
+
+    Descirption:
+    - every batch is hashed on the hashing executor (at most BULK_IMPORT_HASH_CONCURRENCY jobs in
+      flight, half the workers by default, so interactive logins still get threads) and loaded with COPY + one INSERT in its own transaction
+    - rows that fail validation, repeat a username / email of an earlier row or are already
+      registered are skipped and reported with their line number
+    """
+
+    def __init__(self, database: AsyncDatabase, hash_executor: Optional[HashingExecutor] = None):
+        self.admin_repo = AdminRepository(database)
+        self.password_utils = PasswordUtils(hash_executor)
+        workers = hash_executor.max_workers if hash_executor else settings.HASH_WORKERS
+        self.hash_concurrency = min(workers, settings.BULK_IMPORT_HASH_CONCURRENCY or max(1, workers // 2))
+        self.batch_size = settings.BULK_IMPORT_BATCH_SIZE
+
+    async def import_users(self, content_type: str, body: AsyncIterator[bytes]) -> models.ImportResponse:
+        data_format = IMPORT_FORMATS.get(content_type.split(";")[0].strip().lower())
+        if data_format is None:
+            raise HTTPException(status_code=415, detail=f"Unsupported import format, use one of {sorted(IMPORT_FORMATS)}")
+
+        result = models.ImportResponse()
+        seen_usernames, seen_emails = set(), set()
+        batch: List[Tuple[int, models.ImportUserRequest]] = []
+        async for line_number, row in self._parse(data_format, body):
+            result.received += 1
+            user = self._validate(line_number, row, result)
+            if user is None:
+                continue
+            if user.username in seen_usernames or user.email in seen_emails:
+                self._add_error(result, line_number, user.username, ["Username or email repeated within the import"])
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            batch.append((line_number, user))
+            if len(batch) >= self.batch_size:
+                await self._load_batch(batch, result)
+                batch = []
+        if batch:
+            await self._load_batch(batch, result)
+
+        result.errors.sort(key=lambda error: error.line)
+        log.info(f"Imported {result.created} of {result.received} users ({result.failed} failed)")
+        return result
+
+    async def _load_batch(self, batch: List[Tuple[int, models.ImportUserRequest]], result: models.ImportResponse) -> None:
+        hashes = await self._hash_passwords([user.password for _, user in batch if user.password_hash is None])
+        rows = []
+        for line_number, user in batch:
+            password_hash = user.password_hash if user.password_hash is not None else next(hashes)
+            rows.append((line_number, user.username, user.email, password_hash))
+        skipped = await self.admin_repo.import_users(rows)
+        for row in skipped:
+            self._add_error(result, row["line"], row["username"], ["Username or email already registered"])
+        result.created += len(rows) - len(skipped)
+
+    async def _hash_passwords(self, passwords: List[str]):
+        """bcrypt every password on the hashing executor, returns an iterator in the same order."""
+        limit = asyncio.Semaphore(self.hash_concurrency)
+
+        async def hash_password(password: str) -> str:
+            async with limit:
+                while True:
+                    try:
+                        return await self.password_utils.hash_password_async(password)
+                    except HTTPException as e:
+                        # executor queue is full of interactive requests - back off rather than fail the import
+                        if e.status_code != 503:
+                            raise
+                        await asyncio.sleep(0.05)
+
+        return iter(await asyncio.gather(*(hash_password(password) for password in passwords)))
+
+    def _validate(self, line_number: int, row: Any, result: models.ImportResponse) -> Optional[models.ImportUserRequest]:
+        if not isinstance(row, dict):
+            self._add_error(result, line_number, None, [str(row) if isinstance(row, ValueError) else "Row must be an object"])
+            return None
+        # empty CSV cells / nulls mean "not provided"
+        row = {key: value for key, value in row.items() if value not in (None, "")}
+        try:
+            return models.ImportUserRequest.model_validate(row)
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(loc) for loc in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()]
+            username = row.get("username") if isinstance(row.get("username"), str) else None
+            self._add_error(result, line_number, username, errors)
+            return None
+
+    @staticmethod
+    def _add_error(result: models.ImportResponse, line_number: int, username: Optional[str], errors: List[str]) -> None:
+        result.failed += 1
+        result.errors.append(models.ImportRowError(line=line_number, username=username, errors=errors))
+
+    async def _parse(self, data_format: str, body: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+        """Yield (line number, row) without holding the whole upload in memory, blank lines are skipped."""
+        header: Optional[List[str]] = None
+        async for line_number, line in self._lines(body):
+            if not line.strip():
+                continue
+            if data_format == "ndjson":
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, ValueError(f"Invalid JSON: {e.msg}")
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                continue
+            yield line_number, dict(zip(header, values))
+
+    @staticmethod
+    async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        pending, line_number = "", 0
+        async for chunk in body:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                line_number += 1
+                yield line_number, line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield line_number + 1, pending.rstrip("\r")
+
+
+class UserListService:
+    """Admin user listing: keyset pages as JSON or a streamed NDJSON export of every matching user."""
+
+    def __init__(self, database: AsyncDatabase):
+        self.admin_repo = AdminRepository(database)
+
+    async def list_users(self, query: models.UserListQuery) -> models.UserPage:
+        rows = await self.admin_repo.list_users(self._filters(query), query.after_id, query.limit)
+        users = [models.AdminUser(**row) for row in rows]
+        # a full page means there may be more, the client passes the last id back as `after_id`
+        next_after_id = users[-1].id if len(users) == query.limit else None
+        return models.UserPage(users=users, next_after_id=next_after_id)
+
+    async def export_users(self, query: models.UserListQuery, chunk_rows: int = 1000) -> AsyncIterator[bytes]:
+        """NDJSON lines, grouped into chunks of `chunk_rows` users so the response isn't sent one row per write."""
+        lines: List[str] = []
+        async for row in self.admin_repo.stream_users(self._filters(query), query.after_id):
+            lines.append(models.AdminUser(**row).model_dump_json())
+            if len(lines) >= chunk_rows:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    @staticmethod
+    def _filters(query: models.UserListQuery) -> dict:
+        return {name: getattr(query, name) for name in USER_LIST_FILTERS}
@@ -1,16 +1,28 @@
+import math
+
 from typing import Annotated, Optional
 
-from fastapi import HTTPException, Depends, Header, Cookie
+from fastapi import HTTPException, Depends, Header, Cookie, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from config import get_settings
 
 from app.core.db import AsyncDatabase
+from app.core.ratelimit import RateLimit, RateLimiter
 
-from app.core.dependancies import get_db
+from app.core.dependancies import get_db, get_limiter
+from app.core.globals import get_activity_buffer, get_hash_executor, get_user_cache
 from app.auth.utils import OAuth2PasswordBearerWithCookie
 from app.auth.service import UserService, PermissionService
 
 
+settings = get_settings()
+
 oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="auth/login", refreshUrl="auth/refresh")
 
+login_ip_limit = RateLimit("login_ip", settings.LOGIN_IP_PER_MINUTE, settings.LOGIN_IP_BURST)
+login_user_limit = RateLimit("login_user", settings.LOGIN_USER_PER_MINUTE, settings.LOGIN_USER_BURST)
+
 
 def get_refresh_token(
     header_name: Optional[str] = "x_access_token",
@@ -22,7 +34,7 @@ def get_refresh_token(
     Header name and cookie name are optional -> can be used for other tokens / sessions.
     """
 
-    def _dependency(
+    async def _dependency(
         header_token: Optional[str] = Header(None, alias=header_name, include_in_schema=False),
         cookie_token: Optional[str] = Cookie(None, alias=cookie_name),
     ) -> str:
@@ -36,20 +48,22 @@ def get_refresh_token(
     return _dependency
 
 
-def get_oauth2_scheme(auth_scheme: OAuth2PasswordBearerWithCookie = Depends(oauth2_scheme)) -> OAuth2PasswordBearerWithCookie:
-    return auth_scheme
-
-
-def get_user_service(db: Annotated[AsyncDatabase, Depends(get_db)]):
-    return UserService(db)
-
-
-def get_token_from_header(token: Annotated[str, Depends(get_oauth2_scheme)]) -> str:
-    """Dependency to extract token from Authorization header"""
-    return token
+async def get_user_service(request: Request, db: Annotated[AsyncDatabase, Depends(get_db)]) -> UserService:
+    """
+    The UserService built once by the lifespan (`app.state.user_service`), it holds no per request state.
+    One is only built per request without it for this database: no lifespan or get_db overridden (tests).
+    """
+    user_service: Optional[UserService] = getattr(request.app.state, "user_service", None)
+    if user_service is None or user_service.database is not db:
+        user_service = UserService(db, get_hash_executor(), get_user_cache(), get_activity_buffer())
+    return user_service
 
 
-def get_permission_service(token: str = Depends(get_token_from_header), user_service: UserService = Depends(get_user_service)):
+async def get_permission_service(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    user_service: Annotated[UserService, Depends(get_user_service)],
+) -> PermissionService:
+    """Per request: holds the access token and its decoded claims, the user service is shared."""
     return PermissionService(token, user_service)
 
 
@@ -74,3 +88,21 @@ def require_role(role: str):
 
 async def require_admin(permission_service: PermissionService = Depends(get_permission_service)):
     return await permission_service.require_role("admin")
+
+
+async def throttle_login(
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    limiter: Annotated[Optional[RateLimiter], Depends(get_limiter)],
+):
+    """
+    Token buckets per client IP and per username, checked before the user lookup and bcrypt verify.
+    The IP is checked first so a throttled client does not drain the bucket of the username it targets.
+    Behind a proxy the IP is only the client's when the proxy is trusted (SERVER_FORWARDED_ALLOW_IPS).
+    """
+    if limiter is None:
+        return
+    client_ip = request.client.host if request.client else "unknown"
+    for limit, key in ((login_ip_limit, client_ip), (login_user_limit, form_data.username.lower())):
+        if retry_after := limiter.hit(limit, key):
+            raise HTTPException(status_code=429, detail="Too many login attempts", headers={"Retry-After": str(math.ceil(retry_after))})
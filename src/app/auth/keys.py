@@ -0,0 +1,194 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from config import get_settings
+
+settings = get_settings()
+
+log = logging.getLogger("auth.keys")
+
+
+class SigningKey:
+    """Private key of the ring, `kid` is the RFC 7638 thumbprint of its public JWK."""
+
+    def __init__(self, private_key: Any, algorithm: str, created_at: float):
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.algorithm = algorithm
+        self.created_at = created_at
+        jwk_algorithm = RSAAlgorithm if algorithm == "RS256" else OKPAlgorithm
+        self.jwk: Dict[str, str] = jwk_algorithm.to_jwk(self.public_key, as_dict=True)
+        self.kid: str = thumbprint(self.jwk)
+        self.jwk.update({"kid": self.kid, "alg": algorithm, "use": "sig"})
+
+
+def thumbprint(jwk: Dict[str, str]) -> str:
+    """RFC 7638 JWK thumbprint (sha256, base64url)."""
+    members = ("e", "kty", "n") if jwk["kty"] == "RSA" else ("crv", "kty", "x")
+    canonical = json.dumps({k: jwk[k] for k in members}, sort_keys=True, separators=(",", ":"))
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode("utf-8")).digest()).rstrip(b"=").decode("ascii")
+
+
+class KeyRing:
+    """
+    Asymmetric signing keys (RS256 / EdDSA) with scheduled rotation.
+
+    Keys are PEM files in `directory`, one per rotation period, shared by every gunicorn worker.
+    Whichever worker first notices a new period creates its key (exclusive create), every worker
+    then picks it up on the next `refresh`. Without a directory keys only live in memory, which
+    is only suitable for a single process (settings refuse it with WEB_CONCURRENCY > 1).
+
+    Descirption:
+    - rotation_seconds - how often a new signing key is created
+    - publish_seconds - a new key is only used for signing after it has been published in the
+      JWKS for this long, so downstream caches (max-age) already know it
+    - retention_seconds - how long a key stays in the ring for verification after it was created
+    """
+
+    ALGORITHMS = ("RS256", "EdDSA")
+
+    def __init__(
+        self,
+        algorithm: str,
+        directory: Optional[str],
+        rotation_seconds: float,
+        publish_seconds: float,
+        retention_seconds: float,
+    ):
+        self.algorithm = algorithm
+        self.directory: Optional[Path] = Path(directory) if directory else None
+        self.rotation_seconds = rotation_seconds
+        self.publish_seconds = publish_seconds
+        self.retention_seconds = retention_seconds
+        self._keys: Dict[str, SigningKey] = {}
+        self._jwks: Tuple[bytes, str] = self._build_jwks([])
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.algorithm in self.ALGORITHMS
+
+    @property
+    def signing_key(self) -> SigningKey:
+        """Newest key that has been published long enough, falls back to the oldest key on first start."""
+        if not self._keys:
+            self.refresh()
+        keys = sorted(self._keys.values(), key=lambda k: k.created_at, reverse=True)
+        now = time.time()
+        for key in keys:
+            if now - key.created_at >= self.publish_seconds:
+                return key
+        return keys[-1]
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        """
+        Verification key for `kid`. Never reloads: an unknown kid comes from the client, the request path
+        must not parse key files for it. A key created by another worker signs nothing before it has been
+        published for `publish_seconds`, the periodic `refresh` (JWT_KEY_REFRESH_SECONDS) loads it before then.
+        """
+        return self._keys.get(kid)
+
+    @property
+    def jwks(self) -> Tuple[bytes, str]:
+        """JWKS document body and its ETag."""
+        return self._jwks
+
+    def refresh(self) -> None:
+        """Create the key for the current rotation period if missing, drop retired keys and reload."""
+        with self._lock:
+            period = int(time.time() // self.rotation_seconds)
+            if self.directory:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._create_key_file(self.directory / f"{period}.pem")
+                self._prune_key_files()
+                self._reload()
+            elif not self._keys or max(k.created_at for k in self._keys.values()) < period * self.rotation_seconds:
+                key = SigningKey(self._generate(), self.algorithm, time.time())
+                self._keys[key.kid] = key
+                cutoff = time.time() - self.retention_seconds
+                self._set_keys([k for k in self._keys.values() if k.created_at >= cutoff or k is key])
+
+    def reload(self) -> None:
+        with self._lock:
+            self._reload()
+
+    def _reload(self) -> None:
+        keys = []
+        for path in self.directory.glob("*.pem"):
+            try:
+                private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+                keys.append(SigningKey(private_key, self.algorithm, path.stat().st_mtime))
+            except (OSError, ValueError) as e:
+                log.error(f"Unable to load signing key {path.name}: {type(e).__name__}({e})")
+        self._set_keys(keys)
+
+    def _set_keys(self, keys: List[SigningKey]) -> None:
+        self._keys = {key.kid: key for key in keys}
+        self._jwks = self._build_jwks(keys)
+
+    @staticmethod
+    def _build_jwks(keys: List[SigningKey]) -> Tuple[bytes, str]:
+        ordered = sorted(keys, key=lambda k: k.created_at, reverse=True)
+        body = json.dumps({"keys": [key.jwk for key in ordered]}, separators=(",", ":")).encode("utf-8")
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def _generate(self) -> Any:
+        if self.algorithm == "RS256":
+            return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return ed25519.Ed25519PrivateKey.generate()
+
+    def _create_key_file(self, path: Path) -> None:
+        if path.exists():
+            return
+        pem = self._generate().private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        # write to a temp file then hard link it into place - fails if another worker won the race
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pem)
+            os.link(tmp_path, path)
+            log.warning(f"Created signing key {path.name}")
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+
+    def _prune_key_files(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        paths = sorted(self.directory.glob("*.pem"), key=lambda p: p.stat().st_mtime)
+        # never remove the newest key
+        for path in paths[:-1]:
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    log.warning(f"Retired signing key {path.name}")
+            except FileNotFoundError:
+                pass
+
+
+key_ring = KeyRing(
+    algorithm=settings.ALGORITHM,
+    directory=settings.JWT_KEY_DIRECTORY,
+    rotation_seconds=settings.JWT_KEY_ROTATION_HOURS * 3600,
+    publish_seconds=settings.JWKS_MAX_AGE_SECONDS,
+    # keep keys until every token they signed has expired
+    retention_seconds=settings.JWT_KEY_ROTATION_HOURS * 3600
+    + max(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400),
+)
@@ -1,7 +1,16 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, Optional
 
-from app.core.db import AsyncDatabase
-from app.core.utils import load_sql_query
+from config import get_settings
+
+from app.core.db import AsyncDatabase, Intent
+from app.core.queries import sql_catalog
+from app.auth.utils import TokenUtils
+
+settings = get_settings()
+
+# pg_try_advisory_xact_lock key shared by every worker's RefreshTokenReaper, held for one batch
+REAPER_LOCK_KEY = 7_262_015_019
 
 
 class AuthRepository:
@@ -19,25 +28,52 @@ class AuthRepository:
     def __init__(self, db: AsyncDatabase):
         self.db = db
 
-    async def get_user_by_username(self, username: str) -> Optional[dict]:
-        query = load_sql_query("get_user_by_username", module="auth")
-        return await self.db.fetchone(query, {"username": username})
+    async def get_user_by_username(self, username: str, intent: Intent = "read") -> Optional[dict]:
+        query = sql_catalog.get("auth/get_user_by_username")
+        user = await self.db.fetchone(query, {"username": username}, intent=intent)
+        if user is None and intent == "read" and self.db.has_replicas:
+            # a user registered moments ago may not have reached the replica yet
+            user = await self.db.fetchone(query, {"username": username})
+        return user
 
-    async def insert_user(self, username: str, email: str, password_hash: str) -> None:
+    async def insert_user(self, username: str, email: str, password_hash: str) -> Optional[dict]:
+        """Insert and return the new user with its roles, None when the username or email is taken."""
         params = {"username": username, "email": email, "password_hash": password_hash}
-        query = load_sql_query("insert_user", module="auth")
-        await self.db.fetchone(query, params=params)
-        return
+        query = sql_catalog.get("auth/insert_user")
+        return await self.db.fetchone(query, params=params)
+
+    async def get_refresh_session(self, username: str, token: str) -> Optional[int]:
+        """Id of the user's session for this refresh token, None when it was revoked / pruned."""
+        query = sql_catalog.get("auth/verify_refresh_token")
+        params = {"username": username, "refresh_token_hash": TokenUtils.digest(token)}
+        result = await self.db.fetchone(query, params=params)
+        return result["session_id"] if result else None
 
     async def verify_refresh_token(self, username: str, token: str) -> bool:
-        query = load_sql_query("verify_refresh_token", module="auth")
-        result = await self.db.fetchone(query, params={"username": username, "refresh_token": token})
-        return result.get("valid", False)
+        return await self.get_refresh_session(username, token) is not None
+
+    async def insert_refresh_token(self, username: str, refresh_token: str, session_cap: int = settings.REFRESH_TOKEN_SESSION_CAP) -> Optional[dict]:
+        """Store a new session and return its user_id, the user's oldest sessions beyond `session_cap` are deleted by the same statement."""
+        params = {"username": username, "refresh_token_hash": TokenUtils.digest(refresh_token), "session_cap": session_cap}
+        return await self.db.fetchone(sql_catalog.get("auth/insert_refresh_token"), params=params)
+
+    async def record_activity(self, activity: Dict[str, Dict[int, datetime]]) -> dict:
+        """Write last_login_at ("login", by user id) and last_refresh_at ("refresh", by session id) in one statement."""
+        logins = sorted(activity.get("login", {}).items())
+        refreshes = sorted(activity.get("refresh", {}).items())
+        params = {
+            "user_ids": [user_id for user_id, _ in logins],
+            "login_times": [at for _, at in logins],
+            "session_ids": [session_id for session_id, _ in refreshes],
+            "refresh_times": [at for _, at in refreshes],
+        }
+        return await self.db.fetchone(sql_catalog.get("auth/flush_activity"), params=params)
 
-    async def insert_refresh_token(self, username: str, refresh_token: str) -> dict:
-        params = {"username": username, "refresh_token": refresh_token}
-        return await self.db.execute(load_sql_query("insert_refresh_token", module="auth"), params=params)
+    async def delete_expired_refresh_tokens(self, batch_size: int, expire_days: int = settings.REFRESH_TOKEN_EXPIRE_DAYS) -> dict:
+        """Delete up to `batch_size` expired sessions, `acquired` is False while another worker's batch runs."""
+        params = {"lock_key": REAPER_LOCK_KEY, "expire_days": expire_days, "batch_size": batch_size}
+        return await self.db.fetchone(sql_catalog.get("auth/delete_expired_refresh_tokens"), params=params)
 
     async def logout_user(self, username: str) -> None:
         """ """
-        return await self.db.execute(load_sql_query("logout_user", module="auth"), params={"username": username})
+        return await self.db.execute(sql_catalog.get("auth/logout_user"), params={"username": username})
@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import Response, APIRouter, HTTPException, Depends
+from fastapi import Request, Response, APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
 from config import get_settings
@@ -8,13 +8,17 @@ from config import get_settings
 import app.auth.models as models
 
 from app.core.utils import ErrorHandlerRoute
+from app.auth.keys import key_ring
 from app.auth.service import UserService
-from app.auth.dependancies import get_user_service, get_refresh_token, get_permission_service
+from app.auth.dependancies import get_user_service, get_refresh_token, get_permission_service, throttle_login
 
 settings = get_settings()
 
 auth_router = APIRouter(prefix="/auth", tags=["auth"], route_class=ErrorHandlerRoute)
 
+# public keys for downstream services to verify access tokens locally
+jwks_router = APIRouter(tags=["auth"], route_class=ErrorHandlerRoute)
+
 
 @auth_router.post("/register", status_code=201, response_model=models.UserResponse)
 async def register(user_data: models.RegisterRequest, user_service: UserService = Depends(get_user_service)):
@@ -27,7 +31,7 @@ async def register(user_data: models.RegisterRequest, user_service: UserService
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 
-@auth_router.post("/login", response_model=models.Token)
+@auth_router.post("/login", response_model=models.Token, dependencies=[Depends(throttle_login)])
 async def login(response: Response, form_data: Annotated[OAuth2PasswordRequestForm, Depends()], user_service: UserService = Depends(get_user_service)):
     try:
         tokens = await user_service.login_user(form_data.username, form_data.password)
@@ -59,3 +63,12 @@ async def logout(response: Response, refresh_token: str = Depends(get_refresh_to
 async def refresh(refresh_token_cookie: str = Depends(get_refresh_token()), user_service: UserService = Depends(get_user_service)):
     token = await user_service.verify_refresh_token(refresh_token_cookie)
     return {"access_token": token, "token_type": "bearer"}
+
+
+@jwks_router.get("/.well-known/jwks.json")
+def jwks(request: Request):
+    body, etag = key_ring.jwks
+    headers = {"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,44 +1,78 @@
+import asyncio
+import logging
+
+from functools import cached_property, partial
 from typing import Optional
 
 from fastapi import HTTPException
 
+from config import get_settings
+
+from app.core.activity import ActivityBuffer
+from app.core.admission import request_priority
 from app.core.db import AsyncDatabase
+from app.core.cache import InvalidationCache
+from app.core.executor import HashingExecutor
+from app.core.metrics import REFRESH_TOKENS_REAPED
 from app.auth.repositories import AuthRepository
 from app.auth.utils import PasswordUtils, TokenUtils
 
 import app.auth.models as models
 
+settings = get_settings()
+
+log = logging.getLogger("auth.service")
+
 
 class UserService:
-    def __init__(self, database: AsyncDatabase):
+    def __init__(
+        self,
+        database: AsyncDatabase,
+        hash_executor: Optional[HashingExecutor] = None,
+        user_cache: Optional[InvalidationCache] = None,
+        activity: Optional[ActivityBuffer] = None,
+    ):
+        self.database = database
         self.user_repo = AuthRepository(database)
-        self.password_utils = PasswordUtils()
+        self.user_cache = user_cache
+        self.activity = activity
+        self.password_utils = PasswordUtils(hash_executor)
         self.token_utils = TokenUtils()
 
     async def register_user(self, user_data: models.RegisterRequest) -> models.UserResponse:
-        """Register a new user with proper password hashing."""
-        existing_user = await self.user_repo.get_user_by_username(user_data.username)
-        if existing_user:
+        """
+        Register a new user with proper password hashing.
+
+        One round trip: the insert skips existing usernames / emails (ON CONFLICT) and returns the
+        created user with its roles, so there is no lookup before or after it.
+        """
+        password_hash = await self.password_utils.hash_password_async(user_data.password)
+        created_user = await self.user_repo.insert_user(user_data.username, user_data.email, password_hash)
+        if not created_user:
             raise HTTPException(status_code=400, detail="Username or email already registered")
-        password_hash = self.password_utils.hash_password(user_data.password)
-        await self.user_repo.insert_user(user_data.username, user_data.email, password_hash)
-        created_user = await self.user_repo.get_user_by_username(user_data.username)
         return models.UserResponse(**created_user)
 
     async def login_user(self, username: str, password: str) -> dict:
+        """
+        Two round trips: the user lookup has to complete before bcrypt can verify the password and
+        the refresh token can only be stored after it. Holding one connection across bcrypt to
+        pipeline them would pin a pooled connection for the whole hash.
+        """
         user = await self.authenticate_user(username, password)
         if not user:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         token_data = {"sub": user["username"], "roles": user["user_roles"]}
         refresh_token = self.token_utils.create_refresh_token(data=token_data)
         access_token = self.token_utils.create_access_token(data=token_data)
-        await self.user_repo.insert_refresh_token(username, refresh_token)
+        session = await self.user_repo.insert_refresh_token(username, refresh_token)
+        if session:
+            await self.record_activity("login", session["user_id"])
         return {"access_token": access_token, "refresh_token": refresh_token}
 
     async def authenticate_user(self, username: str, password: str) -> Optional[dict]:
         """Authenticate user with username/password."""
         user = await self.user_repo.get_user_by_username(username)
-        if not user or not self.password_utils.verify_password(password, user.get("password_hash", "")):
+        if not user or not await self.password_utils.verify_password_async(password, user.get("password_hash", "")):
             return None
         return user
 
@@ -51,17 +85,35 @@ class UserService:
         payload = self.token_utils.decode_token(token)
         if payload.get("type") != "refresh":
             raise HTTPException(status_code=401, detail="Invalid token type")
-        verified: bool = await self.user_repo.verify_refresh_token(payload.get("sub", ""), token)
-        if not verified:
+        session_id = await self.user_repo.get_refresh_session(payload.get("sub", ""), token)
+        if session_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
+        await self.record_activity("refresh", session_id)
         return self.token_utils.create_access_token(data=payload)
 
+    async def record_activity(self, kind: str, key: int) -> None:
+        """Buffer the last login / last refresh timestamp, written straight away without a buffer (disabled / no lifespan)."""
+        if self.activity:
+            self.activity.record(kind, key)
+        else:
+            await self.user_repo.record_activity({kind: {key: models.utc_now()}})
+
     async def get_current_user(self, token: str) -> models.User:
         """Extract current user from access token"""
-        payload = self.token_utils.decode_token(token)
+        return await self.get_user_from_claims(self.token_utils.decode_token(token))
+
+    async def get_user_from_claims(self, payload: dict) -> models.User:
+        """Load the user for already decoded access token claims"""
         if payload.get("type") != "access":
             raise HTTPException(status_code=401, detail="Invalid token type")
-        user = await self.user_repo.get_user_by_username(payload.get("sub", ""))
+        username = payload.get("sub", "")
+        # authorization checks are served ahead of the route's own queries (admission priorities)
+        with request_priority("critical"):
+            if self.user_cache:
+                # invalidations come from the primary, a lagging replica could put stale rows back in the cache
+                user = await self.user_cache.get_or_load(username, partial(self.user_repo.get_user_by_username, intent="write"))
+            else:
+                user = await self.user_repo.get_user_by_username(username)
         return models.User(**user)
 
 
@@ -70,8 +122,13 @@ class PermissionService:
         self.token = token
         self.user_service = userService
 
+    @cached_property
+    def claims(self) -> dict:
+        """Access token claims, decoded once per request"""
+        return self.user_service.token_utils.decode_token(self.token)
+
     async def get_current_user(self) -> models.User:
-        return await self.user_service.get_current_user(self.token)
+        return await self.user_service.get_user_from_claims(self.claims)
 
     async def require_role(self, role: str) -> models.User:
         """Dependency factory to require specific role"""
@@ -84,3 +141,47 @@ class PermissionService:
         """You need to be authenitcated to logout. This assures thay"""
         user: models.User = await self.get_current_user()
         await self.user_service.logout_user(user.id)
+
+
+class RefreshTokenReaper:
+    """
+    Deletes refresh sessions older than REFRESH_TOKEN_EXPIRE_DAYS, users that never log in or out again
+    would otherwise keep them forever. Run by a PeriodicTask in every worker: each batch takes a
+    transaction level advisory lock, a worker whose batch runs into another worker's batch skips the rest
+    of its run. The lock is released after every batch, so it serialises batches rather than whole runs
+    (no connection is held across the pauses), runs that start between batches interleave harmlessly.
+
+    Descirption:
+    - batch_size - sessions deleted per statement / transaction
+    - max_batches - batches per run, anything left is deleted by the next run
+    - pause - seconds between batches, keeps the reaper from competing with logins for the primary
+    """
+
+    def __init__(
+        self,
+        database: AsyncDatabase,
+        batch_size: int = settings.REFRESH_TOKEN_REAPER_BATCH_SIZE,
+        max_batches: int = settings.REFRESH_TOKEN_REAPER_MAX_BATCHES,
+        pause: float = settings.REFRESH_TOKEN_REAPER_PAUSE_SECONDS,
+    ):
+        self.user_repo = AuthRepository(database)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+
+    async def reap(self) -> int:
+        """Delete expired sessions batch by batch, returns the number deleted by this run."""
+        total = 0
+        for batch in range(self.max_batches):
+            if batch:
+                await asyncio.sleep(self.pause)
+            result = await self.user_repo.delete_expired_refresh_tokens(self.batch_size)
+            if not result["acquired"]:
+                break
+            total += result["reaped"]
+            REFRESH_TOKENS_REAPED.inc(result["reaped"])
+            if result["reaped"] < self.batch_size:
+                break
+        if total:
+            log.info(f"Reaped {total} expired refresh sessions")
+        return total
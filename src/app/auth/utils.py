@@ -1,5 +1,9 @@
+import asyncio
 import bcrypt
+import hashlib
 import jwt
+import secrets
+import time
 
 from typing import Optional
 
@@ -10,6 +14,11 @@ from datetime import datetime, timedelta, timezone
 
 from config import get_settings
 
+from app.core.cache import TTLCache
+from app.core.executor import HashingExecutor, ExecutorSaturatedError
+from app.core.metrics import JWT_DURATION, PASSWORD_HASH_DURATION
+from app.auth.keys import key_ring
+
 settings = get_settings()
 
 
@@ -40,35 +49,94 @@ oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="auth/login", refreshUrl
 
 
 class PasswordUtils:
+    """bcrypt helpers. The async variants run on the hashing executor so the event loop is never blocked."""
+
+    def __init__(self, executor: Optional[HashingExecutor] = None):
+        self.executor = executor
+
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt."""
-        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        with PASSWORD_HASH_DURATION.labels("hash").time():
+            return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+        with PASSWORD_HASH_DURATION.labels("verify").time():
+            return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password off the event loop."""
+        return await self._run(self.hash_password, password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash off the event loop."""
+        return await self._run(self.verify_password, plain_password, hashed_password)
+
+    async def _run(self, func, *args):
+        # without a started executor (e.g. service used outside of the lifespan) fall back to the default thread pool
+        if self.executor is None:
+            return await asyncio.to_thread(func, *args)
+        try:
+            return await self.executor.run(func, *args)
+        except ExecutorSaturatedError:
+            raise HTTPException(status_code=503, detail="Server busy, try again later", headers={"Retry-After": "1"})
 
 
 class TokenUtils:
+    # already verified tokens keyed by their sha256 digest, each entry expires at the token's own `exp`
+    cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=0)
+
     @staticmethod
     def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
         to_encode = data.copy()
         expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
         to_encode.update({"exp": expire, "type": "access"})
-        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return TokenUtils.encode_token(to_encode)
 
     @staticmethod
     def create_refresh_token(data: dict, expires_delta: timedelta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)):
         to_encode = data.copy()
         expire = datetime.now(timezone.utc) + expires_delta
-        to_encode.update({"exp": expire, "type": "refresh"})
-        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        # jti keeps every refresh token (and its stored digest) unique, even for logins within the same second
+        to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_urlsafe(16)})
+        return TokenUtils.encode_token(to_encode)
 
     @staticmethod
-    def decode_token(token: str):
-        try:
-            return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        except (jwt.ExpiredSignatureError, jwt.JWTError):
-            raise HTTPException(status_code=401, detail="Invalid token")
+    def encode_token(to_encode: dict) -> str:
+        """Sign with the shared secret (HS256) or the current key ring key, identified by `kid`"""
+        with JWT_DURATION.labels("encode").time():
+            if not key_ring.enabled:
+                return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+            signing_key = key_ring.signing_key
+            return jwt.encode(to_encode, signing_key.private_key, algorithm=settings.ALGORITHM, headers={"kid": signing_key.kid})
+
+    @staticmethod
+    def verification_key(token: str):
+        if not key_ring.enabled:
+            return settings.SECRET_KEY
+        verification_key = key_ring.get(jwt.get_unverified_header(token).get("kid"))
+        if verification_key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return verification_key.public_key
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """Fixed size sha256 digest, used as cache key and stored instead of refresh tokens"""
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    @staticmethod
+    def decode_token(token: str) -> dict:
+        key = TokenUtils.digest(token)
+        payload = TokenUtils.cache.get(key)
+        if payload is None:
+            try:
+                with JWT_DURATION.labels("decode").time():
+                    payload = jwt.decode(token, TokenUtils.verification_key(token), algorithms=[settings.ALGORITHM])
+            except jwt.InvalidTokenError:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            if "exp" in payload:
+                TokenUtils.cache.set(key, payload, ttl=payload["exp"] - time.time())
+        # callers may modify the claims (e.g. create_access_token(data=payload)), never hand out the cached dict
+        return dict(payload)
@@ -0,0 +1,76 @@
+import logging
+
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+log = logging.getLogger("core.activity")
+
+Activity = Dict[str, Dict[Hashable, datetime]]
+
+
+class ActivityBuffer:
+    """
+    Write-behind buffer for activity timestamps (e.g. last login / last refresh) of one worker.
+
+    Requests only record the latest timestamp per key in memory, `flush` hands everything
+    recorded since the previous flush to `writer` in one call (one batched statement). The
+    database is at most one flush interval behind, a worker killed without shutting down loses
+    its unflushed timestamps. When the writer fails or the flush is cancelled (shutdown, a timeout)
+    the entries are merged back for the next flush.
+
+    Descirption:
+    - writer - async callable receiving {kind: {key: timestamp}}
+    - kinds - the kinds of activity `record` accepts
+    """
+
+    def __init__(self, writer: Callable[[Activity], Awaitable[Any]], kinds: tuple):
+        self.writer = writer
+        self.kinds = kinds
+        self._pending: Activity = {kind: {} for kind in kinds}
+        self.flushed: int = 0
+        self.failures: int = 0
+        self.last_flush: Optional[datetime] = None
+
+    def record(self, kind: str, key: Hashable, at: Optional[datetime] = None) -> None:
+        self._pending[kind][key] = at or datetime.now(timezone.utc)
+
+    async def flush(self) -> int:
+        """Write the pending timestamps, returns how many were written."""
+        if not any(self._pending.values()):
+            return 0
+        pending, self._pending = self._pending, {kind: {} for kind in self.kinds}
+        try:
+            await self.writer(pending)
+        except BaseException as e:
+            # a cancelled write may have committed, writing the same timestamps again is harmless
+            if isinstance(e, Exception):
+                self.failures += 1
+            # keep whichever timestamp is newer, requests may have recorded again during the flush
+            for kind, entries in pending.items():
+                current = self._pending[kind]
+                for key, at in entries.items():
+                    if key not in current or current[key] < at:
+                        current[key] = at
+            raise
+        count = sum(len(entries) for entries in pending.values())
+        self.flushed += count
+        self.last_flush = datetime.now(timezone.utc)
+        log.debug(f"Flushed {count} activity timestamps")
+        return count
+
+    async def close(self) -> None:
+        """Final flush at shutdown, timestamps that can not be written are logged and dropped."""
+        try:
+            await self.flush()
+        except Exception as e:
+            pending = sum(len(entries) for entries in self._pending.values())
+            log.error(f"Dropped {pending} activity timestamps at shutdown: {type(e).__name__}({e})")
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": {kind: len(entries) for kind, entries in self._pending.items()},
+            "flushed": self.flushed,
+            "failures": self.failures,
+            "last_flush": self.last_flush,
+        }
@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.deadline import remaining
+from app.core.metrics import ADMISSION_REJECTED
+
+log = logging.getLogger("core.admission")
+
+# lower is served first
+PRIORITIES: Dict[str, int] = {"critical": 0, "normal": 1, "low": 2}
+
+# priority of the current request / task, set by AdmissionMiddleware and raised with `request_priority`
+_priority: ContextVar[int] = ContextVar("admission_priority", default=PRIORITIES["normal"])
+
+
+@contextmanager
+def request_priority(name: str):
+    """Run the block at priority `name`, e.g. the authorization lookup of a low priority route."""
+    token = _priority.set(PRIORITIES[name])
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class PriorityGate:
+    """
+    Hands out at most `capacity()` slots, waiters are served by priority then arrival (the pool's own queue is FIFO).
+
+    Holders report how long they kept their slot (`record_hold`), `estimate_wait` turns the moving
+    average into the expected queue wait of a new request: the waiters at the same or a higher
+    priority ahead of it, served `capacity()` at a time.
+
+    Like the pool's requests_* counters, `requests_num` / `requests_queued` / `requests_wait_ms` count
+    every slot handed out, those that had to wait and the total wait. The pool sees no queue while
+    the gate holds the waiters back, adaptive pool sizing reads these instead.
+
+    Descirption:
+    - capacity - callable returning the current number of slots (the pool's max_size, adaptive pools resize)
+    - alpha - weight of the newest hold time in the moving average
+    """
+
+    def __init__(self, capacity: Callable[[], int], alpha: float = 0.1):
+        self.capacity = capacity
+        self.alpha = alpha
+        self.in_use: int = 0
+        self.hold_seconds: float = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.requests_num: int = 0
+        self.requests_queued: int = 0
+        self.requests_wait_ms: float = 0.0
+
+    def waiting(self, priority: Optional[int] = None) -> int:
+        """Live waiters, only those served before `priority` when given."""
+        return sum(1 for p, _, future in self._waiters if not future.done() and (priority is None or p <= priority))
+
+    def estimate_wait(self, priority: int) -> float:
+        """Expected seconds until a request at `priority` gets a slot."""
+        capacity = max(1, self.capacity())
+        ahead = self.waiting(priority)
+        if ahead == 0 and self.in_use < capacity:
+            return 0.0
+        return (ahead + 1) * self.hold_seconds / capacity
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for a slot, `release` it when done."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.wake()
+        if future.done():
+            self.requests_num += 1
+            return
+        self.requests_queued += 1
+        start = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # granted just before the cancellation arrived, pass the slot on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self.requests_wait_ms += (time.perf_counter() - start) * 1000
+        self.requests_num += 1
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self.wake()
+
+    def record_hold(self, seconds: float) -> None:
+        self.hold_seconds = seconds if not self.hold_seconds else self.hold_seconds + self.alpha * (seconds - self.hold_seconds)
+
+    def wake(self) -> None:
+        """Grant free slots to the waiters first in line, call after the capacity grew."""
+        while self._waiters and self.in_use < self.capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            # cancelled waiters (timeouts / disconnected clients) are dropped here
+            if future.done():
+                continue
+            self.in_use += 1
+            future.set_result(None)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity(),
+            "in_use": self.in_use,
+            "waiting": {name: sum(1 for p, _, f in self._waiters if p == value and not f.done()) for name, value in PRIORITIES.items()},
+            "hold_ms": round(self.hold_seconds * 1000, 3),
+            "requests_num": self.requests_num,
+            "requests_queued": self.requests_queued,
+            "requests_wait_ms": round(self.requests_wait_ms),
+        }
+
+
+class AdmissionController:
+    """
+    Rejects a request before it does any work when its expected wait for a database connection
+    is past the wait budget of its priority.
+
+    Descirption:
+    - gate - returns the PriorityGate in front of the pool, None (admit everything) before the lifespan started
+    - budgets - {priority name: seconds}
+    - routes - {path prefix: priority name}, the longest matching prefix wins, other paths are "normal"
+    - exempt - path prefixes that never touch the database (probes, metrics, JWKS), always admitted
+    """
+
+    def __init__(
+        self,
+        gate: Callable[[], Optional[PriorityGate]],
+        budgets: Dict[str, float],
+        routes: Dict[str, str],
+        exempt: Sequence[str] = (),
+    ):
+        self.gate = gate
+        self.exempt: Tuple[str, ...] = tuple(exempt)
+        self.budgets: Dict[int, float] = {PRIORITIES[name]: budget for name, budget in budgets.items()}
+        self.routes: List[Tuple[str, int]] = sorted(((prefix, PRIORITIES[name]) for prefix, name in routes.items()), key=lambda r: -len(r[0]))
+        self.rejected: Dict[str, int] = {name: 0 for name in PRIORITIES}
+
+    def priority_for(self, path: str) -> Optional[int]:
+        """Priority of a request path, None when exempt."""
+        if path.startswith(self.exempt):
+            return None
+        for prefix, priority in self.routes:
+            if path.startswith(prefix):
+                return priority
+        return PRIORITIES["normal"]
+
+    def check(self, priority: Optional[int]) -> float:
+        """Returns 0 to admit, otherwise the seconds the client should wait before retrying."""
+        gate = self.gate()
+        budget = self.budgets.get(priority)
+        if priority is None or gate is None or budget is None:
+            return 0.0
+        # no point queueing past the request deadline either
+        left = remaining()
+        if left is not None:
+            budget = min(budget, left)
+        wait = gate.estimate_wait(priority)
+        if wait <= budget:
+            return 0.0
+        name = next(name for name, value in PRIORITIES.items() if value == priority)
+        self.rejected[name] += 1
+        ADMISSION_REJECTED.labels(name).inc()
+        return wait
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        gate = self.gate()
+        return {"rejected": self.rejected, "gate": gate.stats if gate else {}}
+
+
+# Documnentation: https://www.starlette.io/middleware/#pure-asgi-middleware
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware: sets the request priority from its path and sheds the request with
+    503 / Retry-After when `controller` expects it to wait past its budget for a connection.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.controller.priority_for(scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+        retry_after = self.controller.check(priority)
+        if retry_after:
+            log.warning(f"{scope['method']} {scope['path']} : shed, expected connection wait {retry_after * 1000:.0f} ms")
+            body = json.dumps({"detail": "Server busy, try again later"}).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        token = _priority.set(priority)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _priority.reset(token)
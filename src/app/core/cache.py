@@ -0,0 +1,112 @@
+import time
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Bounded LRU cache where every entry also has an expiry.
+
+    Descirption:
+    - maxsize - least recently used entries are evicted once the cache holds this many keys
+    - ttl - default lifetime (seconds) of an entry, `set` can override it per entry
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize: int = max(1, maxsize)
+        self.ttl: float = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class InvalidationCache(TTLCache):
+    """
+    TTL cache that is only trusted while something (a LISTEN connection) is delivering invalidations.
+
+    While disabled every lookup goes straight to the loader. `generation` is bumped on every
+    invalidation so a value loaded before an invalidation arrived is never stored afterwards.
+    """
+
+    # payload used to drop every entry, e.g. after bulk changes
+    INVALIDATE_ALL = "*"
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self.enabled: bool = False
+        self.generation: int = 0
+        self.invalidations: int = 0
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Anything cached before (re)connecting may have missed invalidations, so always start empty."""
+        self.enabled = enabled
+        self.invalidate(self.INVALIDATE_ALL)
+
+    def invalidate(self, key: str) -> None:
+        self.generation += 1
+        self.invalidations += 1
+        if key == self.INVALIDATE_ALL:
+            self.clear()
+        else:
+            self.pop(key)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await loader(key)
+        value = self.get(key)
+        if value is not None:
+            return value
+        generation = self.generation
+        value = await loader(key)
+        if value is not None and generation == self.generation:
+            self.set(key, value)
+        return value
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats, "enabled": self.enabled, "invalidations": self.invalidations}
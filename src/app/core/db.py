@@ -1,17 +1,129 @@
+import asyncio
+import itertools
 import logging
+import time
 
-from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional, Union
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Literal, Optional, Sequence, TypeVar, Union
 
-from psycopg_pool import AsyncConnectionPool
+from fastapi import HTTPException
+from psycopg import AsyncConnection, AsyncCursor, OperationalError, Pipeline
+from psycopg.errors import LockNotAvailable, QueryCanceled
+from psycopg.conninfo import conninfo_to_dict
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 from psycopg.rows import dict_row
 
 from config import get_settings
+from app.core.admission import PriorityGate, current_priority
+from app.core.deadline import remaining
+from app.core.metrics import DB_ACQUIRE_WAIT, DB_QUERY_DURATION, DB_TIMEOUTS
+from app.core.queries import SqlQuery, sql_catalog
 
 settings = get_settings()
 
 log = logging.getLogger("core.db")
 
+Query = Union[str, SqlQuery]
+Params = Optional[Union[Dict[str, Any], List[Any]]]
+# "read" may be served by a replica, "write" (and anything that must see the latest data) uses the primary
+Intent = Literal["read", "write"]
+
+T = TypeVar("T")
+
+# transaction scoped (SET LOCAL), reset when the pooled connection's transaction ends
+SET_TIMEOUTS = "SELECT set_config('statement_timeout', %(timeout)s, true), set_config('lock_timeout', %(timeout)s, true)"
+# the SET is sent in the same round trip as the statement when libpq supports pipeline mode
+PIPELINE = Pipeline.is_supported()
+
+# set once the current request / task has written, so its later reads see those writes (DB_READ_YOUR_WRITES)
+_read_primary: ContextVar[bool] = ContextVar("db_read_primary", default=False)
+
+
+def get_pool_limits() -> Dict[str, int]:
+    """
+    Pool bounds of one worker process from settings.
+
+    DB_MAX_CONNECTIONS is split evenly between the WEB_CONCURRENCY workers, less the connections
+    each worker holds outside the pool (the /readyz check, LISTEN for the user cache), and caps `max_size_limit`.
+    `max_size` is where the pool starts, adaptive mode can grow it up to `max_size_limit`.
+    """
+    max_size_limit = settings.DB_POOL_ADAPTIVE_MAX_SIZE if settings.DB_POOL_ADAPTIVE else settings.DB_POOL_MAX_SIZE
+    if settings.DB_MAX_CONNECTIONS:
+        workers = max(1, settings.WEB_CONCURRENCY)
+        share = settings.DB_MAX_CONNECTIONS // workers - 1 - (1 if settings.USER_CACHE_ENABLED else 0)
+        if share < 1:
+            raise ValueError(f"DB_MAX_CONNECTIONS={settings.DB_MAX_CONNECTIONS} is too small for {workers} workers")
+        max_size_limit = min(max_size_limit, share)
+    max_size = min(settings.DB_POOL_MAX_SIZE, max_size_limit)
+    return {
+        "min_size": max(1, min(settings.DB_POOL_SIZE, max_size)),
+        "max_size": max_size,
+        "max_size_limit": max_size_limit,
+    }
+
+
+# SQLSTATEs of a server going away (admin / crash shutdown, still starting up), class 08 is checked separately
+CONNECTION_SQLSTATES = ("57P01", "57P02", "57P03")
+
+
+def is_connection_failure(error: OperationalError) -> bool:
+    """
+    Pool timeouts and lost / refused connections, which say something about the server. Statement errors
+    (e.g. SerializationFailure, a hot standby cancelling a query in conflict with recovery) do not.
+    """
+    if isinstance(error, PoolTimeout):
+        return True
+    # client side connection errors carry no SQLSTATE
+    sqlstate = getattr(error, "sqlstate", None)
+    return sqlstate is None or sqlstate.startswith("08") or sqlstate in CONNECTION_SQLSTATES
+
+
+class DatabaseTimeoutError(HTTPException):
+    """
+    The request's deadline ran out waiting for a connection, a lock or a statement (504).
+
+    An HTTPException so routes that turn unexpected errors into 500s let it through.
+    """
+
+    def __init__(self, name: str, stage: str):
+        DB_TIMEOUTS.labels(name, stage).inc()
+        super().__init__(status_code=504, detail="Database timeout")
+        self.name = name
+        self.stage = stage
+
+    def __str__(self) -> str:
+        return f"{self.name} timed out ({self.stage})"
+
+
+class Replica:
+    """Read replica pool, taken out of rotation for DB_REPLICA_EJECT_SECONDS after a failure."""
+
+    def __init__(self, connection_string: str, pool: AsyncConnectionPool):
+        self.host: str = conninfo_to_dict(connection_string).get("host", "unknown")
+        self.pool = pool
+        self.ejected_until: float = 0
+        self.ejections: int = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def eject(self, error: Exception) -> None:
+        if self.healthy:
+            self.ejections += 1
+            log.error(f"Replica [{self.host}] ejected for {settings.DB_REPLICA_EJECT_SECONDS}s: {type(error).__name__}({error})")
+        self.ejected_until = time.monotonic() + settings.DB_REPLICA_EJECT_SECONDS
+
+    def readmit(self) -> None:
+        if not self.healthy:
+            log.warning(f"Replica [{self.host}] back in rotation")
+        self.ejected_until = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"host": self.host, "healthy": self.healthy, "ejections": self.ejections, "pool_stats": self.pool.get_stats()}
+
 
 class AsyncDatabase:
     """
@@ -19,21 +131,50 @@ class AsyncDatabase:
 
     Descirption:
     - min_size - pool maintains these connections at all times
-    - max_size - pool can grow up to 4 connections
+    - max_size - pool can grow up to this many connections
     - max_waiting - how many clients can queue for a connection until one frees up
     - max_lifetime - how long a connection can exist before being refreshed
     - max_idle - how long a connection exists until being closed
+    - max_size_limit - upper bound for `adapt_pool_size`, the worker's share of DB_MAX_CONNECTIONS
+
+    Sizes default to `get_pool_limits()` (DB_POOL_* settings).
+
+    Queries are either plain SQL strings or `SqlQuery` statements from the SQL catalog. Catalog
+    statements have their parameters checked and run as server-side prepared statements, plain
+    strings are prepared once psycopg has seen them DB_PREPARE_THRESHOLD times on a connection.
+
+    Read replicas (DATABASE_REPLICA_URLS) get a pool each with the same bounds. Queries run with
+    `intent="read"` go round-robin to healthy replicas, a read that fails is retried on the primary
+    and the replica ejected when its connection failed (not for statement errors such as a hot
+    standby's recovery conflicts). Reads use the primary when no replica is healthy, inside
+    `read_your_writes()` or after a write in the same request (DB_READ_YOUR_WRITES).
+
+    Inside a request deadline (app.core.deadline) the time left bounds the pool acquire timeout and
+    every statement runs with `statement_timeout` / `lock_timeout` set to it; running out raises
+    DatabaseTimeoutError. Background tasks have no deadline and keep the pool timeout.
+
+    Primary connections are handed out through `gate`, a PriorityGate sized to the pool's max_size:
+    waiters are served by request priority (see app.core.admission) instead of the pool's FIFO queue.
     """
 
     def __init__(
         self,
-        min_size: int = 2,
-        max_size: int = 4,
-        max_waiting: int = 0,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        max_waiting: Optional[int] = None,
         max_lifetime: float = 3600,
         max_idle: float = 600,
         reconnect_timeout: float = 30,
+        max_size_limit: Optional[int] = None,
     ):
+        limits = get_pool_limits()
+        min_size = limits["min_size"] if min_size is None else min_size
+        max_size = limits["max_size"] if max_size is None else max_size
+        max_waiting = settings.DB_POOL_MAX_WAITING if max_waiting is None else max_waiting
+        self.max_size_limit: int = max(max_size, limits["max_size_limit"] if max_size_limit is None else max_size_limit)
+        self._last_stats: Dict[str, int] = {}
+        self._last_gate_stats: Dict[str, float] = {}
+        self._quiet_intervals: int = 0
         self.connection_string: str = settings.DATABASE_URL
         self.queries = {}
         self.pool: Optional[AsyncConnectionPool] = None
@@ -45,9 +186,20 @@ class AsyncDatabase:
             "max_idle": max_idle,
             "reconnect_timeout": reconnect_timeout,
         }
-        self.pool = AsyncConnectionPool(self.connection_string, **self.pool_config, open=False)
+        self.pool = AsyncConnectionPool(self.connection_string, **self.pool_config, configure=self._configure_connection, open=False)
+        self.replicas: List[Replica] = [
+            Replica(url, AsyncConnectionPool(url, **self.pool_config, configure=self._configure_connection, open=False))
+            for url in settings.DATABASE_REPLICA_URLS
+        ]
+        self._replica_cycle = itertools.cycle(self.replicas)
+        self.gate = PriorityGate(lambda: self.pool.max_size)
         return
 
+    @staticmethod
+    async def _configure_connection(conn: AsyncConnection) -> None:
+        """Called by the pool for every new connection."""
+        conn.prepare_threshold = settings.DB_PREPARE_THRESHOLD
+
     async def initialize(self) -> None:
         """Initialize the connection pool. Call this during FastAPI startup."""
         try:
@@ -56,56 +208,327 @@ class AsyncDatabase:
         except Exception as e:
             log.error(f"Failed to initialize database pool: {type(e).__name__}({e})")
             raise
+        # replicas connect in the background, one being down must not stop start-up
+        for replica in self.replicas:
+            await replica.pool.open(wait=False)
+            log.info(f"Replica pool [{replica.host}] opened")
 
     async def close(self) -> None:
         """Close the connection pool. Call this during FastAPI shutdown."""
+        for replica in self.replicas:
+            await replica.pool.close()
         if self.pool:
             await self.pool.close()
             log.info("Database pool closed")
 
     @asynccontextmanager
-    async def get_connection(self):
-        """Get a connection from the pool with automatic cleanup."""
-        if not self.pool:
+    async def get_connection(self, name: str = "adhoc", pool: Optional[AsyncConnectionPool] = None, timeout: Optional[float] = None):
+        """
+        Get a connection from the pool (primary by default) with automatic cleanup, `name` labels the acquisition wait metric.
+
+        The acquire timeout is cut to the time left before the request deadline, running out of it raises DatabaseTimeoutError.
+        """
+        pool = pool or self.pool
+        if not pool:
             raise RuntimeError("Database pool not initialized")
-        async with self.pool.connection() as conn:
+        start_time = time.perf_counter()
+        timeout = pool.timeout if timeout is None else timeout
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DatabaseTimeoutError(name, "deadline")
+        # the deadline, not the pool timeout, ends the wait
+        deadline_bound = left is not None and left < timeout
+        if deadline_bound:
+            timeout = left
+        # only the primary pool is gated, replicas are sized for reads and fail over to the primary
+        gated = pool is self.pool
+        try:
+            if gated:
+                try:
+                    async with asyncio.timeout(timeout):
+                        await self.gate.acquire(current_priority())
+                except TimeoutError:
+                    raise PoolTimeout(f"couldn't get a connection after {timeout:.2f} sec (priority gate)")
+            try:
+                async with pool.connection(timeout=max(0.0, timeout - (time.perf_counter() - start_time))) as conn:
+                    DB_ACQUIRE_WAIT.labels(name).observe(time.perf_counter() - start_time)
+                    acquired = time.perf_counter()
+                    try:
+                        yield conn
+                    except DatabaseTimeoutError:
+                        raise
+                    except Exception as e:
+                        log.error(f"Database connection error: {e.__class__.__name__}({e})", exc_info=True)
+                        raise
+                    finally:
+                        if gated:
+                            self.gate.record_hold(time.perf_counter() - acquired)
+            finally:
+                if gated:
+                    self.gate.release()
+        except PoolTimeout:
+            if deadline_bound:
+                raise DatabaseTimeoutError(name, "acquire")
+            raise
+
+    async def _execute(self, conn: AsyncConnection, query: Query, params: Params, name: str) -> AsyncCursor:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DatabaseTimeoutError(name, "deadline")
+        try:
+            with DB_QUERY_DURATION.labels(name).time():
+                async with conn.pipeline() if PIPELINE and left is not None else nullcontext():
+                    if left is not None:
+                        # prepared like the catalog's statements, not at all behind pgbouncer (DB_PREPARE_THRESHOLD=None)
+                        await conn.execute(SET_TIMEOUTS, {"timeout": str(max(1, int(left * 1000)))}, prepare=sql_catalog.prepare)
+                    if isinstance(query, SqlQuery):
+                        cursor = await conn.execute(query.text, params=params, prepare=query.prepare)
+                        query.record_execution(conn.info.backend_pid)
+                    else:
+                        cursor = await conn.execute(query, params=params)
+                return cursor
+        except QueryCanceled:
+            raise DatabaseTimeoutError(name, "statement")
+        except LockNotAvailable:
+            raise DatabaseTimeoutError(name, "lock")
+
+    @staticmethod
+    def _query_name(query: Query, params: Params, name: str) -> str:
+        if isinstance(query, SqlQuery):
+            query.check_params(params)
+            return query.name
+        return name
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self.replicas)
+
+    @contextmanager
+    def read_your_writes(self):
+        """Send every read in the block to the primary, e.g. reading back rows written just before."""
+        token = _read_primary.set(True)
+        try:
+            yield
+        finally:
+            _read_primary.reset(token)
+
+    def _choose_replica(self, intent: Intent) -> Optional[Replica]:
+        if intent != "read" or not self.replicas or _read_primary.get():
+            return None
+        for _ in range(len(self.replicas)):
+            replica = next(self._replica_cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    @staticmethod
+    def _replica_failed(replica: Replica, name: str, error: OperationalError) -> None:
+        if is_connection_failure(error):
+            replica.eject(error)
+        else:
+            log.warning(f"Replica [{replica.host}] {name} failed, retrying on the primary: {type(error).__name__}({error})")
+
+    async def _run(self, name: str, intent: Intent, func: Callable[[AsyncConnection], Awaitable[T]]) -> T:
+        """Run `func` with a connection from a replica (reads) or the primary."""
+        if replica := self._choose_replica(intent):
             try:
-                yield conn
-            except Exception as e:
-                log.error(f"Database connection error: {e.__class__.__name__}({e})", exc_info=True)
-                raise
+                async with self.get_connection(name, replica.pool, timeout=settings.DB_REPLICA_TIMEOUT_SECONDS) as conn:
+                    return await func(conn)
+            except OperationalError as e:
+                # reads are safe to retry on the primary, only connection failures / pool timeouts eject the replica
+                self._replica_failed(replica, name, e)
+        async with self.get_connection(name) as conn:
+            result = await func(conn)
+        if intent == "write" and self.replicas and settings.DB_READ_YOUR_WRITES:
+            _read_primary.set(True)
+        return result
 
-    async def execute(self, query: str, params: Optional[Union[Dict[str, Any], List[Any]]] = None) -> None:
+    async def execute(self, query: Query, params: Params = None, name: str = "adhoc", intent: Intent = "write") -> None:
         """Execute query and fetch a single row."""
-        async with self.get_connection() as conn:
+        name = self._query_name(query, params, name)
+
+        async def run(conn: AsyncConnection) -> None:
             conn.row_factory = dict_row
-            await conn.execute(query, params=params)
-        return None
+            await self._execute(conn, query, params, name)
+
+        return await self._run(name, intent, run)
 
-    async def fetchone(self, query: str, params: Optional[Union[Dict[str, Any], List[Any]]] = None) -> Optional[Dict[str, Any]]:
+    async def fetchone(self, query: Query, params: Params = None, name: str = "adhoc", intent: Intent = "write") -> Optional[Dict[str, Any]]:
         """Execute query and fetch a single row."""
-        async with self.get_connection() as conn:
+        name = self._query_name(query, params, name)
+
+        async def run(conn: AsyncConnection) -> Optional[Dict[str, Any]]:
             conn.row_factory = dict_row
-            cursor = await conn.execute(query, params=params)
+            cursor = await self._execute(conn, query, params, name)
             row = await cursor.fetchone()
             return dict(row) if row else None
 
-    async def fetchall(self, query: str, params: Optional[Union[Dict[str, Any], List[Any]]] = None) -> List[Dict[str, Any]]:
+        return await self._run(name, intent, run)
+
+    async def fetchall(self, query: Query, params: Params = None, name: str = "adhoc", intent: Intent = "write") -> List[Dict[str, Any]]:
         """Execute query and fetch all rows."""
-        async with self.get_connection() as conn:
+        name = self._query_name(query, params, name)
+
+        async def run(conn: AsyncConnection) -> List[Dict[str, Any]]:
             conn.row_factory = dict_row
-            cursor = await conn.execute(query, params=params)
+            cursor = await self._execute(conn, query, params, name)
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+        return await self._run(name, intent, run)
+
+    async def stream(
+        self,
+        query: Query,
+        params: Params = None,
+        name: str = "adhoc",
+        intent: Intent = "read",
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield rows one at a time from a server-side cursor, fetching `batch_size` rows per round trip.
+
+        Memory stays constant however many rows the query returns. The connection (and on the
+        primary, the transaction snapshot and a PriorityGate slot) is held until the generator is
+        exhausted or closed, so long exports are best served by a replica. Inside a request deadline
+        the stream stops with DatabaseTimeoutError once it ran out. A failing replica is only swapped
+        for the primary before the first row was yielded.
+        """
+        name = self._query_name(query, params, name)
+        if replica := self._choose_replica(intent):
+            rows = 0
+            try:
+                async for row in self._stream(name, query, params, batch_size, replica.pool, settings.DB_REPLICA_TIMEOUT_SECONDS):
+                    rows += 1
+                    yield row
+                return
+            except OperationalError as e:
+                self._replica_failed(replica, name, e)
+                if rows:
+                    raise
+        async for row in self._stream(name, query, params, batch_size):
+            yield row
+
+    async def _stream(
+        self,
+        name: str,
+        query: Query,
+        params: Params,
+        batch_size: int,
+        pool: Optional[AsyncConnectionPool] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        async with self.get_connection(name, pool, timeout=timeout) as conn:
+            left = remaining()
+            try:
+                # the deadline bounds the whole stream (and how long it holds the connection), not only each FETCH
+                if left is not None:
+                    await conn.execute(SET_TIMEOUTS, {"timeout": str(max(1, int(left * 1000)))}, prepare=sql_catalog.prepare)
+                # server-side (named) cursors are DECLAREd, they can't use prepared statements
+                async with conn.cursor(name=f"stream_{name.replace('/', '_')}", row_factory=dict_row) as cursor:
+                    cursor.itersize = batch_size
+                    await cursor.execute(query.text if isinstance(query, SqlQuery) else query, params)
+                    async for row in cursor:
+                        if left is not None and remaining() <= 0:
+                            raise DatabaseTimeoutError(name, "deadline")
+                        yield dict(row)
+            except QueryCanceled:
+                raise DatabaseTimeoutError(name, "statement")
+
+    async def copy_fetchall(
+        self,
+        setup: Query,
+        copy: Query,
+        rows: Iterable[Sequence[Any]],
+        query: Query,
+        params: Params = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Bulk load `rows` with COPY then run `query`, on one connection and in one transaction.
+
+        `setup` prepares the COPY target (e.g. creates a temporary staging table) and `copy` is the
+        `COPY ... FROM STDIN` statement, `query` usually moves the staged rows into their tables.
+        """
+        name = self._query_name(query, params, "copy")
+        setup_name = self._query_name(setup, None, "copy_setup")
+        copy_name = copy.name if isinstance(copy, SqlQuery) else "copy"
+        async with self.get_connection(name) as conn:
+            conn.row_factory = dict_row
+            await self._execute(conn, setup, None, setup_name)
+            with DB_QUERY_DURATION.labels(copy_name).time():
+                async with conn.cursor().copy(copy.text if isinstance(copy, SqlQuery) else copy) as copy_in:
+                    for row in rows:
+                        await copy_in.write_row(row)
+            cursor = await self._execute(conn, query, params, name)
+            return [dict(row) for row in await cursor.fetchall()]
+
     async def health_check(self) -> bool:
         """Check if the database connection is healthy."""
-        await self.fetchone("SELECT 1")
+        await self.fetchone("SELECT 1", name="health_check")
         return True
 
+    async def check_replicas(self) -> None:
+        """Probe every replica, ejecting the failing ones and readmitting those that recovered."""
+        for replica in self.replicas:
+            try:
+                async with self.get_connection("replica_check", replica.pool, timeout=settings.DB_REPLICA_TIMEOUT_SECONDS) as conn:
+                    await conn.execute("SELECT 1")
+                replica.readmit()
+            except OperationalError as e:
+                replica.eject(e)
+
+    async def adapt_pool_size(self) -> None:
+        """
+        Grow or shrink max_size from the pool and gate counters since the previous call (DB_POOL_ADAPTIVE).
+
+        The gate queues primary requests before they reach the pool, its waiters and wait time count
+        alongside the pool's own. Grows by half when requests are waiting or the average wait is above
+        DB_POOL_TARGET_WAIT_MS, up to `max_size_limit`. Shrinks by one, down to min_size, after
+        DB_POOL_SHRINK_INTERVALS calls without a queued request. Connections above a lowered max_size close once idle (max_idle).
+        """
+        stats = self.pool.get_stats()
+        gate = {key: getattr(self.gate, key) for key in ("requests_num", "requests_queued", "requests_wait_ms")}
+        previous, self._last_stats = self._last_stats, stats
+        previous_gate, self._last_gate_stats = self._last_gate_stats, gate
+        # every gated request reaches the pool as well, count requests once
+        requests = stats.get("requests_num", 0) - previous.get("requests_num", 0)
+        queued = stats.get("requests_queued", 0) - previous.get("requests_queued", 0)
+        queued += gate["requests_queued"] - previous_gate.get("requests_queued", 0)
+        wait_ms = stats.get("requests_wait_ms", 0) - previous.get("requests_wait_ms", 0)
+        wait_ms += gate["requests_wait_ms"] - previous_gate.get("requests_wait_ms", 0)
+        avg_wait_ms = wait_ms / requests if requests > 0 else 0
+        waiting = stats.get("requests_waiting", 0) + self.gate.waiting()
+
+        min_size, max_size = self.pool.min_size, self.pool.max_size
+        new_max_size = max_size
+        if waiting or avg_wait_ms > settings.DB_POOL_TARGET_WAIT_MS:
+            self._quiet_intervals = 0
+            new_max_size = min(self.max_size_limit, max_size + max(1, max_size // 2))
+        elif queued <= 0:
+            self._quiet_intervals += 1
+            if self._quiet_intervals >= settings.DB_POOL_SHRINK_INTERVALS:
+                self._quiet_intervals = 0
+                new_max_size = max(min_size, max_size - 1)
+        else:
+            self._quiet_intervals = 0
+
+        if new_max_size != max_size:
+            await self.pool.resize(min_size, new_max_size)
+            self.pool_config["max_size"] = new_max_size
+            # waiters queued for the previous size
+            self.gate.wake()
+            log.info(f"Database pool max_size {max_size} -> {new_max_size} (avg wait {avg_wait_ms:.1f}ms, {queued} queued, {waiting} waiting)")
+
     @property
     def pool_stats(self) -> Dict[str, Any]:
         """Get connection pool statistics."""
         if not self.pool:
             return {}
-        return {"pool_stats": self.pool.get_stats(), "pool_config": self.pool_config}
+        stats = {
+            "pool_stats": self.pool.get_stats(),
+            "pool_config": {**self.pool_config, "max_size_limit": self.max_size_limit},
+            "gate_stats": self.gate.stats,
+        }
+        if self.replicas:
+            stats["replica_stats"] = [replica.stats for replica in self.replicas]
+        return stats
@@ -0,0 +1,61 @@
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# time.monotonic() by which the current request / task must be done, None without a deadline
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline (negative once passed), None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Run the block with a deadline `seconds` from now, an earlier deadline already set is kept."""
+    if not seconds:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+# Documnentation: https://www.starlette.io/middleware/#pure-asgi-middleware
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware giving every request a deadline, the database turns what is left of it into
+    pool acquire / statement / lock timeouts (see AsyncDatabase).
+
+    Descirption:
+    - seconds - deadline of every request, 0 disables
+    - routes - {path prefix: seconds} overrides, the longest matching prefix wins (0 = no deadline)
+    """
+
+    def __init__(self, app: ASGIApp, seconds: float, routes: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.seconds = seconds
+        self.routes: List[Tuple[str, float]] = sorted((routes or {}).items(), key=lambda r: -len(r[0]))
+
+    def seconds_for(self, path: str) -> float:
+        for prefix, seconds in self.routes:
+            if path.startswith(prefix):
+                return seconds
+        return self.seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.seconds_for(scope["path"])):
+            await self.app(scope, receive, send)
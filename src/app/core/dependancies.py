@@ -1,8 +1,36 @@
+from typing import Optional
+
+from .activity import ActivityBuffer
 from .db import AsyncDatabase
+from .cache import InvalidationCache
+from .executor import HashingExecutor
+from .ratelimit import RateLimiter
+
+from .globals import get_database, get_hash_executor, get_user_cache, get_rate_limiter, get_activity_buffer
 
-from .globals import get_database
+# async so FastAPI calls them on the event loop, a plain `def` dependency costs a threadpool round trip per request
 
 
-def get_db() -> AsyncDatabase:
+async def get_db() -> AsyncDatabase:
     """Dependency to get database instance."""
     return get_database()
+
+
+async def get_hasher() -> Optional[HashingExecutor]:
+    """Dependency to get the password hashing executor."""
+    return get_hash_executor()
+
+
+async def get_cache() -> Optional[InvalidationCache]:
+    """Dependency to get the user cache."""
+    return get_user_cache()
+
+
+async def get_limiter() -> Optional[RateLimiter]:
+    """Dependency to get the rate limiter."""
+    return get_rate_limiter()
+
+
+async def get_activity() -> Optional[ActivityBuffer]:
+    """Dependency to get the activity write-behind buffer."""
+    return get_activity_buffer()
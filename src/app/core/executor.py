@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+log = logging.getLogger("core.executor")
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when the executor wait queue is full and new work is rejected."""
+
+
+class HashingExecutor:
+    """
+    Bounded thread pool used to keep CPU heavy work (bcrypt) off the event loop.
+
+    bcrypt releases the GIL while hashing so a thread pool scales with cores without the
+    pickling / start-up cost of a process pool.
+
+    Descirption:
+    - max_workers - number of threads, also the number of jobs allowed to run at once
+    - max_queue - number of jobs allowed to wait for a free thread before new work is rejected
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers: int = max(1, max_workers)
+        self.max_queue: int = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._running: int = 0
+        self._waiting: int = 0
+        self._counters: Dict[str, float] = {
+            "jobs_submitted": 0,
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "jobs_rejected": 0,
+            "wait_ms": 0.0,
+            "run_ms": 0.0,
+        }
+
+    def start(self) -> None:
+        """Start the worker threads. Call this during FastAPI startup."""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hashing")
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        log.info(f"Hashing executor started with {self.max_workers} workers (max_queue={self.max_queue})")
+
+    def shutdown(self) -> None:
+        """Stop the worker threads. Call this during FastAPI shutdown."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            log.info("Hashing executor stopped")
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on a worker thread, waiting for a free slot if all workers are busy."""
+        if self._executor is None:
+            raise RuntimeError("Hashing executor not started")
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._counters["jobs_rejected"] += 1
+            raise ExecutorSaturatedError(f"Hashing queue full ({self._waiting} waiting)")
+
+        self._counters["jobs_submitted"] += 1
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        started_at = time.perf_counter()
+        self._counters["wait_ms"] += (started_at - queued_at) * 1000
+        self._running += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            self._counters["jobs_completed"] += 1
+            return result
+        except Exception:
+            self._counters["jobs_failed"] += 1
+            raise
+        finally:
+            self._running -= 1
+            self._counters["run_ms"] += (time.perf_counter() - started_at) * 1000
+            self._semaphore.release()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Get executor statistics."""
+        return {
+            "executor_stats": {**self._counters, "jobs_running": self._running, "jobs_waiting": self._waiting},
+            "executor_config": {"max_workers": self.max_workers, "max_queue": self.max_queue},
+        }
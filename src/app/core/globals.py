@@ -1,6 +1,29 @@
+from pathlib import Path
+from typing import Optional
+
+from config import get_settings
+
+from .activity import ActivityBuffer
+from .admission import PriorityGate
 from .db import AsyncDatabase
+from .cache import InvalidationCache
+from .executor import HashingExecutor
+from .health import DatabaseHealth
+from .notify import NotificationListener
+from .ratelimit import MemoryBucketStore, RateLimiter, SharedBucketStore
+
+settings = get_settings()
+
+# channel the `notify_user_changes` trigger function publishes changed usernames on
+USER_CHANGES_CHANNEL = "auth_user_changes"
 
 _db: AsyncDatabase = None
+_hash_executor: HashingExecutor = None
+_user_cache: InvalidationCache = None
+_user_listener: NotificationListener = None
+_rate_limiter: RateLimiter = None
+_activity_buffer: ActivityBuffer = None
+_database_health: DatabaseHealth = None
 
 
 async def initialize_database():
@@ -18,8 +41,131 @@ async def close_database():
         _db = None
 
 
+def get_database_gate() -> Optional[PriorityGate]:
+    """Get the priority gate in front of the database pool, None before the application lifespan started."""
+    return _db.gate if _db else None
+
+
 def get_database() -> AsyncDatabase:
     """Get the database instance."""
     if _db is None:
         raise RuntimeError("Database not initialized")
     return _db
+
+
+def initialize_hash_executor():
+    """Start the password hashing executor."""
+    global _hash_executor
+    _hash_executor = HashingExecutor(max_workers=settings.HASH_WORKERS, max_queue=settings.HASH_MAX_QUEUE)
+    _hash_executor.start()
+
+
+def close_hash_executor():
+    """Stop the password hashing executor."""
+    global _hash_executor
+    if _hash_executor:
+        _hash_executor.shutdown()
+        _hash_executor = None
+
+
+def get_hash_executor() -> Optional[HashingExecutor]:
+    """Get the hashing executor, None when the application lifespan has not started it."""
+    return _hash_executor
+
+
+async def initialize_user_cache():
+    """Create the user cache and start the listener that keeps it consistent with the database."""
+    global _user_cache, _user_listener
+    if not settings.USER_CACHE_ENABLED:
+        return
+    _user_cache = InvalidationCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+    _user_listener = NotificationListener(
+        settings.DATABASE_URL,
+        USER_CHANGES_CHANNEL,
+        on_notify=_user_cache.invalidate,
+        on_status=_user_cache.set_enabled,
+    )
+    _user_listener.start()
+
+
+async def close_user_cache():
+    """Stop the user cache listener."""
+    global _user_cache, _user_listener
+    if _user_listener:
+        await _user_listener.stop()
+        _user_listener = None
+    _user_cache = None
+
+
+def get_user_cache() -> Optional[InvalidationCache]:
+    """Get the user cache, None when disabled or the application lifespan has not started it."""
+    return _user_cache
+
+
+def initialize_rate_limiter():
+    """Create the rate limiter, buckets are shared between workers when RATE_LIMIT_DIRECTORY is set."""
+    global _rate_limiter
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return
+    if settings.RATE_LIMIT_DIRECTORY:
+        store = SharedBucketStore(Path(settings.RATE_LIMIT_DIRECTORY) / "buckets", settings.RATE_LIMIT_SLOTS)
+    else:
+        store = MemoryBucketStore(settings.RATE_LIMIT_SLOTS)
+    _rate_limiter = RateLimiter(store)
+
+
+def close_rate_limiter():
+    """Release the shared bucket file."""
+    global _rate_limiter
+    if _rate_limiter:
+        _rate_limiter.close()
+        _rate_limiter = None
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Get the rate limiter, None when disabled or the application lifespan has not started it."""
+    return _rate_limiter
+
+
+def initialize_activity_buffer():
+    """Create the write-behind buffer for last login / last refresh timestamps."""
+    global _activity_buffer
+    if not settings.ACTIVITY_WRITE_BEHIND:
+        return
+    # imported here, the auth package depends on app.core
+    from app.auth.repositories import AuthRepository
+
+    _activity_buffer = ActivityBuffer(AuthRepository(get_database()).record_activity, kinds=("login", "refresh"))
+
+
+async def close_activity_buffer():
+    """Write the buffered timestamps, call before the database is closed."""
+    global _activity_buffer
+    if _activity_buffer:
+        await _activity_buffer.close()
+        _activity_buffer = None
+
+
+def get_activity_buffer() -> Optional[ActivityBuffer]:
+    """Get the activity buffer, None when disabled or the application lifespan has not started it."""
+    return _activity_buffer
+
+
+def initialize_database_health():
+    """Create the database status read by /readyz, refreshed by the `database_health` task."""
+    global _database_health
+    _database_health = DatabaseHealth(
+        get_database(), timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS, stale_after=settings.HEALTH_STALE_SECONDS
+    )
+
+
+async def close_database_health():
+    global _database_health
+    if _database_health:
+        await _database_health.close()
+    _database_health = None
+
+
+def get_database_health() -> Optional[DatabaseHealth]:
+    """Get the database status, None when the application lifespan has not started it."""
+    return _database_health
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from psycopg import AsyncConnection
+
+from app.core.db import AsyncDatabase
+
+log = logging.getLogger("core.health")
+
+
+class DatabaseHealth:
+    """
+    Database status of one worker, refreshed by a background task instead of by the probes.
+
+    `check` runs `SELECT 1` on a dedicated (non pooled) connection, reconnecting after a failure, and
+    records the outcome and its latency. It never queues behind requests in the priority gate or the
+    pool: an exhausted pool is reported as saturation, it does not make the worker not ready (taking
+    busy workers out of rotation would only push their load onto the others). `/readyz` only reads
+    the recorded status and the pool counters, so probes never hold or wait for a connection.
+
+    Descirption:
+    - database - the worker's AsyncDatabase, its connection string and pool / gate counters
+    - timeout - a check slower than this (connecting included) counts as failed
+    - stale_after - seconds a successful check counts towards readiness (the checker stopped / hangs)
+    """
+
+    def __init__(self, database: AsyncDatabase, timeout: float, stale_after: float):
+        self.database = database
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.ok: bool = False
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checks: int = 0
+        self.consecutive_failures: int = 0
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic: Optional[float] = None
+        self._conn: Optional[AsyncConnection] = None
+
+    async def check(self) -> bool:
+        """Probe the database once and record the result."""
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                if self._conn is None or self._conn.closed:
+                    self._conn = await AsyncConnection.connect(self.database.connection_string, autocommit=True)
+                await self._conn.execute("SELECT 1")
+        except Exception as e:
+            ok, error = False, (f"{type(e).__name__}({e})" if str(e) else type(e).__name__)
+            # a timed out query leaves the connection mid statement, start over on the next check
+            await self.close()
+        else:
+            ok, error = True, None
+        self.latency_ms = (time.perf_counter() - start) * 1000
+        # log transitions only, the checker runs every few seconds
+        if not ok and (self.ok or not self.checks):
+            log.error(f"Database check failed: {error}")
+        elif ok and not self.ok and self.checks:
+            log.warning(f"Database reachable again after {self.consecutive_failures} failed checks")
+        self.ok, self.error = ok, error
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        self.checks += 1
+        self.checked_at = datetime.now(timezone.utc)
+        self._checked_monotonic = time.monotonic()
+        return ok
+
+    async def close(self) -> None:
+        """Close the check's connection, the next check reconnects."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception as e:
+                log.debug(f"Closing the health check connection failed: {type(e).__name__}({e})")
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the last check, None before the first."""
+        if self._checked_monotonic is None:
+            return None
+        return time.monotonic() - self._checked_monotonic
+
+    @property
+    def ready(self) -> bool:
+        age = self.age_seconds
+        return self.ok and age is not None and age <= self.stale_after
+
+    @property
+    def pool_saturation(self) -> Dict[str, Any]:
+        """Connections in use against the pool's max_size, read from the pool counters (no connection taken).
+
+        Primary requests queue in the priority gate, not in the pool, `waiting` counts the gate's waiters.
+        """
+        pool = self.database.pool
+        # a closed pool still counts the connections it would open
+        stats = {} if pool.closed else pool.get_stats()
+        size = stats.get("pool_size", 0)
+        in_use = max(0, size - stats.get("pool_available", 0))
+        return {
+            "size": size,
+            "max_size": pool.max_size,
+            "in_use": in_use,
+            "waiting": stats.get("requests_waiting", 0) + sum(self.database.gate.stats["waiting"].values()),
+            "saturation": round(in_use / pool.max_size, 3) if pool.max_size else 0,
+        }
+
+    @property
+    def status(self) -> Dict[str, Any]:
+        age = self.age_seconds
+        status = {
+            "ready": self.ready,
+            "database": {
+                "ok": self.ok,
+                "latency_ms": None if self.latency_ms is None else round(self.latency_ms, 2),
+                "checked_at": self.checked_at,
+                "age_seconds": None if age is None else round(age, 3),
+                "consecutive_failures": self.consecutive_failures,
+                "error": self.error,
+            },
+            "pool": self.pool_saturation,
+        }
+        if self.database.has_replicas:
+            status["replicas"] = {replica.host: replica.healthy for replica in self.database.replicas}
+        return status
@@ -1,11 +1,86 @@
 """ """
 
+import logging
+import logging.config
+import logging.handlers
+import queue
+
 from typing import Dict, Any
 
 from config import get_settings
 
 settings = get_settings()
 
+# application loggers routed through the log queue when LOG_QUEUE_ENABLED is set
+QUEUE_LOGGER_PREFIXES = ("core.", "admin.", "auth.")
+QUEUE_HANDLERS = {"queue": ["console", "file_watcher"], "web_queue": ["web_console", "web_file_watcher"]}
+
+# set once get_logging_config() is applied, inherited by forked gunicorn workers
+_configured: bool = False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller (the event loop).
+
+    Records are handed to a QueueListener thread which formats and writes them. When the
+    bounded queue is full the record is dropped and counted instead of waiting.
+    """
+
+    dropped: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the queue is in-process so the record can be passed as is, formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def configure_logging() -> None:
+    """
+    Apply get_logging_config() once per process tree.
+
+    gunicorn configures logging in the master (on_starting) and its forked workers inherit it,
+    the lifespan then only configures processes started without gunicorn (uvicorn, scripts).
+    """
+    global _configured
+    if not _configured:
+        logging.config.dictConfig(get_logging_config())
+        _configured = True
+
+
+def _queue_handlers():
+    for name in QUEUE_HANDLERS:
+        handler = logging.getHandlerByName(name)
+        if isinstance(handler, DroppingQueueHandler) and handler.listener:
+            yield handler
+
+
+def start_log_listeners() -> None:
+    """Start the background writer threads, call after logging.config.dictConfig in the process that logs."""
+    for handler in _queue_handlers():
+        if handler.listener._thread is None:
+            handler.listener.start()
+
+
+def stop_log_listeners() -> None:
+    """Stop the background writer threads, every queued record is written before this returns."""
+    for handler in _queue_handlers():
+        if handler.listener._thread is not None:
+            handler.listener.stop()
+
+
+def get_log_queue_stats() -> Dict[str, Any]:
+    return {
+        "enabled": settings.LOG_QUEUE_ENABLED,
+        "dropped": DroppingQueueHandler.dropped,
+        "queued": {handler.name: handler.queue.qsize() for handler in _queue_handlers()},
+    }
+
 
 def get_optional_loggers() -> dict:
     return {
@@ -25,10 +100,21 @@ def get_base_loggers(log_level: str = "INFO") -> dict:
         "fastapi": {"level": "WARNING", "handlers": ["console", "file_watcher"], "propagate": False},
         # Core Application Loggers
         "admin.routes": {"level": "INFO", "handlers": ["web_console", "web_file_watcher"], "propagate": False},
+        "admin.service": {"level": "INFO", "handlers": ["web_console", "web_file_watcher"], "propagate": False},
         "core.startup": {"level": "INFO", "handlers": ["console", "file_watcher"], "propagate": False},
+        "core.tasks": {"level": "INFO", "handlers": ["console", "file_watcher"], "propagate": False},
+        "auth.keys": {"level": "INFO", "handlers": ["console", "file_watcher"], "propagate": False},
+        "auth.service": {"level": "INFO", "handlers": ["console", "file_watcher"], "propagate": False},
         # Application loggers
         "core.utils": {"level": log_level, "handlers": ["web_console", "web_file_watcher"], "propagate": False},
         "core.db": {"level": log_level, "handlers": ["web_console", "web_file_watcher"], "propagate": False},
+        "core.queries": {"level": log_level, "handlers": ["console", "file_watcher"], "propagate": False},
+        "core.executor": {"level": log_level, "handlers": ["web_console", "web_file_watcher"], "propagate": False},
+        "core.ratelimit": {"level": log_level, "handlers": ["console", "file_watcher"], "propagate": False},
+        "core.notify": {"level": log_level, "handlers": ["console", "file_watcher"], "propagate": False},
+        "core.activity": {"level": log_level, "handlers": ["console", "file_watcher"], "propagate": False},
+        "core.admission": {"level": log_level, "handlers": ["web_console", "web_file_watcher"], "propagate": False},
+        "core.health": {"level": log_level, "handlers": ["console", "file_watcher"], "propagate": False},
     }
 
 
@@ -48,6 +134,37 @@ def get_logging_config() -> Dict[str, Any]:
     if settings.LOG_INCLUDE_OPTIONAL:
         loggers.update(get_optional_loggers())
 
+    handlers = {
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": "default",
+            "stream": "ext://sys.stdout",
+        },
+        "web_console": {
+            "class": "logging.StreamHandler",
+            "formatter": "requests",
+            "filters": ["correlation_id"],
+            "stream": "ext://sys.stdout",
+        },
+        "file_watcher": {
+            "class": "logging.handlers.WatchedFileHandler",
+            "formatter": "default",
+            "filename": filename,
+            "encoding": "utf8",
+        },
+        "web_file_watcher": {
+            "class": "logging.handlers.WatchedFileHandler",
+            "formatter": "requests",
+            "filename": filename,
+            "filters": ["correlation_id"],
+            "encoding": "utf8",
+            "mode": "a",
+        },
+    }
+
+    if settings.LOG_QUEUE_ENABLED:
+        add_queue_handlers(handlers, loggers)
+
     config = {
         "version": 1,
         "disable_existing_loggers": False,
@@ -62,35 +179,33 @@ def get_logging_config() -> Dict[str, Any]:
             "default": {"format": default_fmt, "datefmt": "%Y-%m-%d %H:%M:%S"},
             "requests": {"format": web_req_fmt, "datefmt": "%Y-%m-%d %H:%M:%S"},
         },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "formatter": "default",
-                "stream": "ext://sys.stdout",
-            },
-            "web_console": {
-                "class": "logging.StreamHandler",
-                "formatter": "requests",
-                "filters": ["correlation_id"],
-                "stream": "ext://sys.stdout",
-            },
-            "file_watcher": {
-                "class": "logging.handlers.WatchedFileHandler",
-                "formatter": "default",
-                "filename": filename,
-                "encoding": "utf8",
-            },
-            "web_file_watcher": {
-                "class": "logging.handlers.WatchedFileHandler",
-                "formatter": "requests",
-                "filename": filename,
-                "filters": ["correlation_id"],
-                "encoding": "utf8",
-                "mode": "a",
-            },
-        },
+        "handlers": handlers,
         "root": {"level": "ERROR", "handlers": ["console", "file_watcher"]},
         "loggers": loggers,
     }
 
     return config
+
+
+def add_queue_handlers(handlers: dict, loggers: dict) -> None:
+    """
+    Route application loggers through bounded queues, written by QueueListener threads.
+
+    The correlation id is a contextvar so its filter has to run on the queue handler (event loop thread),
+    the listener thread would only see the default value.
+    """
+    for queue_name, targets in QUEUE_HANDLERS.items():
+        filters = []
+        for target in targets:
+            filters = handlers[target].pop("filters", filters)
+        handlers[queue_name] = {
+            "class": "app.core.logging.DroppingQueueHandler",
+            "handlers": targets,
+            "queue": {"()": "queue.Queue", "maxsize": settings.LOG_QUEUE_SIZE},
+            "filters": filters,
+        }
+    for name, logger in loggers.items():
+        if name.startswith(QUEUE_LOGGER_PREFIXES):
+            for queue_name, targets in QUEUE_HANDLERS.items():
+                if logger["handlers"] == targets:
+                    logger["handlers"] = [queue_name]
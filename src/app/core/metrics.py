@@ -0,0 +1,81 @@
+"""
+Prometheus metrics shared by the application.
+
+Under gunicorn every worker has its own process, set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py)
+so each worker writes its samples to that directory and `/metrics` aggregates all workers.
+"""
+
+import os
+
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+# sub-millisecond buckets for pure CPU work such as JWT encode / decode
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status class",
+    ["method", "route", "status_class"],
+)
+
+DB_ACQUIRE_WAIT = Histogram(
+    "db_connection_acquire_seconds",
+    "Time waiting for a pooled connection by query name",
+    ["query"],
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Query execution time (excluding connection acquisition) by query name",
+    ["query"],
+)
+
+DB_TIMEOUTS = Counter(
+    "db_timeouts_total",
+    "Queries that ran out of their request deadline by query name and stage (deadline / acquire / statement / lock)",
+    ["query", "stage"],
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash / verify time",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5),
+)
+
+JWT_DURATION = Histogram(
+    "jwt_duration_seconds",
+    "JWT encode / decode (signature verification) time, decode cache hits are not included",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests rejected by a rate limit",
+    ["limit"],
+)
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed with 503 because their expected connection wait was past the budget of their priority",
+    ["priority"],
+)
+
+REFRESH_TOKENS_REAPED = Counter(
+    "refresh_tokens_reaped_total",
+    "Expired refresh sessions deleted by the background reaper",
+)
+
+
+def generate_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition of this process, or of every worker when running multiprocess."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from typing import Callable, Optional
+
+from psycopg import AsyncConnection, sql
+
+log = logging.getLogger("core.notify")
+
+
+class NotificationListener:
+    """
+    Background consumer for Postgres LISTEN/NOTIFY on a dedicated (non pooled) connection.
+
+    Descirption:
+    - on_notify - called with the payload of every notification received on `channel`
+    - on_status - called with True once LISTEN is active and False when the connection is lost,
+      notifications sent while disconnected are lost so consumers should stop trusting cached state
+    - reconnect_delay - seconds to wait before reconnecting after a failure
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        channel: str,
+        on_notify: Callable[[str], None],
+        on_status: Callable[[bool], None],
+        reconnect_delay: float = 5,
+    ):
+        self.connection_string = connection_string
+        self.channel = channel
+        self.on_notify = on_notify
+        self.on_status = on_status
+        self.reconnect_delay = reconnect_delay
+        self.connected: bool = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start listening in a background task. Call this during FastAPI startup."""
+        self._task = asyncio.create_task(self._run(), name=f"listen:{self.channel}")
+
+    async def stop(self) -> None:
+        """Stop listening. Call this during FastAPI shutdown."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with await AsyncConnection.connect(self.connection_string, autocommit=True) as conn:
+                    await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    self._set_status(True)
+                    log.info(f"Listening for notifications on [{self.channel}]")
+                    async for notify in conn.notifies():
+                        self.on_notify(notify.payload)
+            except asyncio.CancelledError:
+                self._set_status(False)
+                raise
+            except Exception as e:
+                log.error(f"Notification listener [{self.channel}] failed: {type(e).__name__}({e})")
+            self._set_status(False)
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _set_status(self, connected: bool) -> None:
+        if self.connected != connected:
+            self.connected = connected
+            self.on_status(connected)
@@ -0,0 +1,147 @@
+import json
+import logging
+import re
+
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Optional, Set
+
+from config import get_settings
+
+settings = get_settings()
+
+log = logging.getLogger("core.queries")
+
+NAMED_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+# escaped `%%` and named placeholders, any `%` left over once these are removed is invalid
+VALID_PERCENT = re.compile(r"%%|%\(\w+\)s")
+# statements EXPLAIN accepts, anything else (DDL, COPY) has no plan to estimate
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES|MERGE)\b", re.IGNORECASE)
+
+
+class SqlQuery:
+    """
+    A statement from the SQL catalog.
+
+    Descirption:
+    - name - path relative to `sql_queries` without the extension, e.g. `auth/get_user_by_username`
+    - params - named placeholders the statement expects, checked before every execution
+    - prepare - run as a server-side prepared statement on every pooled connection
+    """
+
+    def __init__(self, name: str, text: str, prepare: bool):
+        self.name = name
+        self.text = text
+        self.prepare = prepare
+        self.params: FrozenSet[str] = frozenset(NAMED_PLACEHOLDER.findall(self._strip_comments(text)))
+        # estimated by `SqlCatalog.estimate_planning`, None until measured
+        self.planning_ms: Optional[float] = None
+        self.executions: int = 0
+        self._backends: Set[int] = set()
+        self._validate()
+
+    def check_params(self, params: Optional[Dict[str, Any]]) -> None:
+        """Fail before the round trip when parameters do not match the placeholders."""
+        keys = set(params or {})
+        if missing := self.params - keys:
+            raise KeyError(f"SQL query [{self.name}] missing parameters: {sorted(missing)}")
+        if unexpected := keys - self.params:
+            raise KeyError(f"SQL query [{self.name}] unexpected parameters: {sorted(unexpected)}")
+
+    def record_execution(self, backend_pid: int) -> None:
+        self.executions += 1
+        self._backends.add(backend_pid)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        # the first execution on each connection parses / plans (PREPARE), later executions reuse it
+        reused = max(0, self.executions - len(self._backends)) if self.prepare else 0
+        return {
+            "prepared": self.prepare,
+            "executions": self.executions,
+            "connections": len(self._backends),
+            "planning_ms": self.planning_ms,
+            "planning_ms_saved": round(reused * self.planning_ms, 3) if self.planning_ms is not None else None,
+        }
+
+    @property
+    def explainable(self) -> bool:
+        return EXPLAINABLE.match(self._strip_comments(self.text)) is not None
+
+    @property
+    def generic_text(self) -> str:
+        """Statement with numbered parameters ($1, $2...), as used by EXPLAIN (GENERIC_PLAN)."""
+        numbers = {param: i for i, param in enumerate(sorted(self.params), start=1)}
+        return VALID_PERCENT.sub(lambda m: "%" if m.group() == "%%" else f"${numbers[m.group()[2:-2]]}", self.text)
+
+    def _validate(self) -> None:
+        if "%" in VALID_PERCENT.sub("", self._strip_comments(self.text)):
+            raise ValueError(f"SQL query [{self.name}] must only use named placeholders %(name)s (escape literal % as %%)")
+
+    @staticmethod
+    def _strip_comments(text: str) -> str:
+        text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+        return re.sub(r"--[^\n]*", "", text)
+
+
+class SqlCatalog:
+    """
+    Every statement under `sql_queries`, loaded and validated once at startup.
+
+    Statements are executed as prepared statements (psycopg prepares them on first use per
+    connection) unless DB_PREPARE_THRESHOLD is None, e.g. behind a transaction pooling pgbouncer.
+    """
+
+    def __init__(self, base_path: Path, prepare: bool):
+        self.base_path = base_path
+        self.prepare = prepare
+        self.queries: Dict[str, SqlQuery] = {}
+
+    def load(self) -> None:
+        queries = {}
+        for path in sorted(self.base_path.rglob("*.sql")):
+            name = path.relative_to(self.base_path).with_suffix("").as_posix()
+            queries[name] = SqlQuery(name, path.read_text(encoding="utf-8").strip(), self.prepare)
+        self.queries = queries
+        log.info(f"Loaded {len(queries)} SQL queries from {self.base_path}")
+
+    def get(self, name: str) -> SqlQuery:
+        if not self.queries:
+            self.load()
+        try:
+            return self.queries[name]
+        except KeyError:
+            raise KeyError(f"SQL query not found in catalog: {name}")
+
+    async def estimate_planning(self, db) -> None:
+        """
+        Measure planning time of each statement with EXPLAIN (statements are not executed).
+        Used to report the planning time saved by prepared statements.
+
+        Uses GENERIC_PLAN (Postgres 16+) so parameters stay unknown like in a prepared statement,
+        older servers fall back to binding every parameter as NULL.
+        """
+        for query in self.queries.values():
+            if not query.explainable:
+                continue
+            try:
+                try:
+                    row = await db.fetchone(f"EXPLAIN (GENERIC_PLAN, SUMMARY ON, FORMAT JSON) {query.generic_text.rstrip(';')}", name="explain")
+                except Exception:
+                    row = await db.fetchone(
+                        f"EXPLAIN (SUMMARY ON, FORMAT JSON) {query.text.rstrip(';')}",
+                        params={param: None for param in query.params},
+                        name="explain",
+                    )
+                plan = row["QUERY PLAN"]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                query.planning_ms = plan[0]["Planning Time"]
+            except Exception as e:
+                # e.g. statements on temporary tables that only exist inside their own transaction
+                log.info(f"Unable to estimate planning time of [{query.name}]: {type(e).__name__}({e})")
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {name: query.stats for name, query in self.queries.items()}
+
+
+sql_catalog = SqlCatalog(settings.CODE_DIR / "sql_queries", prepare=settings.DB_PREPARE_THRESHOLD is not None)
@@ -0,0 +1,160 @@
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+from app.core.metrics import RATE_LIMITED
+
+log = logging.getLogger("core.ratelimit")
+
+
+class RateLimit:
+    """
+    Token bucket definition: up to `burst` hits at once, refilled at `per_minute` hits a minute.
+
+    Descirption:
+    - name - prefixes every bucket key and labels the `rate_limited_total` metric
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int):
+        self.name = name
+        self.rate: float = per_minute / 60
+        self.burst: int = max(1, burst)
+
+
+def _take(tokens: float, updated: float, now: float, rate: float, burst: int) -> Tuple[float, float]:
+    """Refill a bucket up to `now` and take one token, returns (tokens left, seconds to wait - 0 when allowed)."""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Buckets in this process only (single worker / dev / tests), least recently used keys are evicted past `max_keys`."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys: int = max(1, max_keys)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens, retry_after = _take(tokens, updated, now, rate, burst)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "keys": len(self._buckets), "max_keys": self.max_keys}
+
+
+class SharedBucketStore:
+    """
+    Buckets in a memory mapped file so every gunicorn worker on the host shares them.
+
+    The file is a fixed size open addressing table of `slots` buckets (key hash, tokens, last
+    update, time it is full again), every `take` holds an exclusive flock for a few microseconds.
+    A bucket that has refilled is the same as a missing one, so its slot is reused. When all
+    `PROBES` candidate slots are busy the one refilling soonest is overwritten.
+    """
+
+    SLOT = struct.Struct("<Qddd")
+    PROBES = 8
+
+    def __init__(self, path: Union[str, Path], slots: int):
+        self.path = Path(path)
+        self.slots: int = max(self.PROBES, slots)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = self.slots * self.SLOT.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self.evictions: int = 0
+        log.info(f"Rate limit buckets shared via {self.path} ({self.slots} slots)")
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+        start = key_hash % self.slots
+        with self._locked():
+            offset, free_offset, soonest_offset, soonest_full_at = None, None, None, float("inf")
+            for probe in range(self.PROBES):
+                slot_offset = ((start + probe) % self.slots) * self.SLOT.size
+                slot_key, tokens, updated, full_at = self.SLOT.unpack_from(self._mmap, slot_offset)
+                if slot_key == key_hash:
+                    offset = slot_offset
+                    break
+                if free_offset is None and (slot_key == 0 or full_at <= now):
+                    free_offset = slot_offset
+                if full_at < soonest_full_at:
+                    soonest_offset, soonest_full_at = slot_offset, full_at
+
+            if offset is None:
+                if free_offset is None:
+                    self.evictions += 1
+                offset = free_offset if free_offset is not None else soonest_offset
+                tokens, updated = burst, now
+            tokens, retry_after = _take(tokens, updated, now, rate, burst)
+            self.SLOT.pack_into(self._mmap, offset, key_hash, tokens, now, now + (burst - tokens) / rate)
+        return retry_after
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+    def _locked(self):
+        return _FileLock(self._fd)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "shared", "path": str(self.path), "slots": self.slots, "evictions": self.evictions}
+
+
+class _FileLock:
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def __enter__(self):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """Checks `RateLimit`s against a bucket store, `MemoryBucketStore` or `SharedBucketStore`."""
+
+    def __init__(self, store: Union[MemoryBucketStore, SharedBucketStore]):
+        self.store = store
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def hit(self, limit: RateLimit, key: str) -> float:
+        """Take a token for `key`, returns 0 when allowed otherwise the seconds until the next token."""
+        retry_after = self.store.take(f"{limit.name}:{key}", limit.rate, limit.burst, time.monotonic())
+        counters = self._counters.setdefault(limit.name, {"allowed": 0, "limited": 0})
+        if retry_after:
+            counters["limited"] += 1
+            RATE_LIMITED.labels(limit.name).inc()
+        else:
+            counters["allowed"] += 1
+        return retry_after
+
+    def close(self) -> None:
+        if isinstance(self.store, SharedBucketStore):
+            self.store.close()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Counters are per worker, the buckets themselves may be shared."""
+        return {"store": self.store.stats, "limits": self._counters}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.globals import get_database_health
+from app.core.metrics import generate_metrics
+
+# unauthenticated operational endpoints (scraped / probed by infrastructure, not users)
+core_router = APIRouter(tags=["core"])
+
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+@core_router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = generate_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@core_router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the worker's event loop answers. Does not depend on the database."""
+    return JSONResponse({"status": "ok"}, headers=NO_STORE)
+
+
+@core_router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: the database status recorded by the background check, 503 when not ready."""
+    health = get_database_health()
+    if health is None:
+        return JSONResponse({"ready": False, "database": None}, status_code=503, headers=NO_STORE)
+    status = health.status
+    return JSONResponse(jsonable_encoder(status), status_code=200 if status["ready"] else 503, headers=NO_STORE)
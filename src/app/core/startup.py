@@ -1,11 +1,37 @@
+import asyncio
 import logging
-import logging.config
 
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
-from app.core.globals import initialize_database, close_database
-from app.core.logging import get_logging_config
+from config import get_settings
+
+from app.core.globals import (
+    get_database,
+    initialize_database,
+    close_database,
+    initialize_hash_executor,
+    close_hash_executor,
+    get_hash_executor,
+    initialize_user_cache,
+    close_user_cache,
+    initialize_rate_limiter,
+    close_rate_limiter,
+    initialize_activity_buffer,
+    close_activity_buffer,
+    get_activity_buffer,
+    get_user_cache,
+    initialize_database_health,
+    close_database_health,
+    get_database_health,
+)
+from app.core.logging import configure_logging, start_log_listeners, stop_log_listeners
+from app.core.queries import sql_catalog
+from app.core.tasks import PeriodicTask
+from app.auth.keys import key_ring
+from app.auth.service import RefreshTokenReaper, UserService
+
+settings = get_settings()
 
 log = logging.getLogger("core.startup")
 
@@ -14,9 +40,63 @@ log = logging.getLogger("core.startup")
 async def lifespan(app: FastAPI):
     """FastAPI lifespan context manager for API start-up functionality."""
     log.info("lifespan called - initialising application")
-    config = get_logging_config()
-    logging.config.dictConfig(config)
+    configure_logging()
+    start_log_listeners()
+    # load + validate every statement once, fails start-up on a broken query file
+    sql_catalog.load()
     await initialize_database()
+    # planning time estimates only feed the query stats, don't hold up start-up for them
+    planning = asyncio.create_task(sql_catalog.estimate_planning(get_database()))
+    # grow / shrink the pool's max_size from its wait statistics
+    pool_sizing = PeriodicTask("db_pool_sizing", settings.DB_POOL_ADAPT_INTERVAL_SECONDS, get_database().adapt_pool_size)
+    if settings.DB_POOL_ADAPTIVE:
+        pool_sizing.start()
+    # eject / readmit read replicas from a background probe
+    replica_check = PeriodicTask("db_replica_check", settings.DB_REPLICA_CHECK_SECONDS, get_database().check_replicas)
+    if get_database().has_replicas:
+        replica_check.start()
+    # database status for /readyz, checked in the background instead of by every probe
+    initialize_database_health()
+    first_health_check = asyncio.create_task(get_database_health().check())
+    database_health = PeriodicTask("database_health", settings.HEALTH_CHECK_INTERVAL_SECONDS, get_database_health().check)
+    database_health.start()
+    initialize_hash_executor()
+    initialize_rate_limiter()
+    await initialize_user_cache()
+    # last login / last refresh timestamps are written behind in batches
+    initialize_activity_buffer()
+    activity_flush = PeriodicTask("activity_flush", settings.ACTIVITY_FLUSH_SECONDS, lambda: get_activity_buffer().flush())
+    if get_activity_buffer():
+        activity_flush.start()
+    # app-scoped services, shared by every request (see get_user_service)
+    app.state.user_service = UserService(get_database(), get_hash_executor(), get_user_cache(), get_activity_buffer())
+    # delete expired refresh sessions in small batches, one worker at a time (advisory lock)
+    session_reaper = PeriodicTask("refresh_token_reaper", settings.REFRESH_TOKEN_REAPER_INTERVAL_SECONDS, RefreshTokenReaper(get_database()).reap)
+    if settings.REFRESH_TOKEN_REAPER_ENABLED:
+        session_reaper.start()
+    # asymmetric signing keys - create / rotate / reload from the shared key directory
+    key_rotation = PeriodicTask("jwt_key_rotation", settings.JWT_KEY_REFRESH_SECONDS, lambda: asyncio.to_thread(key_ring.refresh))
+    if key_ring.enabled:
+        key_ring.refresh()
+        key_rotation.start()
     yield
     log.warning("lifespan ending - application terminating")
+    app.state.user_service = None
+    await key_rotation.stop()
+    await session_reaper.stop()
+    await activity_flush.stop()
+    await pool_sizing.stop()
+    await replica_check.stop()
+    await database_health.stop()
+    first_health_check.cancel()
+    planning.cancel()
+    # wait for them to unwind before their connections are closed below
+    await asyncio.gather(first_health_check, planning, return_exceptions=True)
+    await close_user_cache()
+    close_rate_limiter()
+    close_hash_executor()
+    await close_activity_buffer()
+    await close_database_health()
     await close_database()
+    # flush queued log records last
+    stop_log_listeners()
@@ -0,0 +1,48 @@
+import asyncio
+import inspect
+import logging
+
+from typing import Any, Callable, Optional
+
+log = logging.getLogger("core.tasks")
+
+
+class PeriodicTask:
+    """
+    Runs `func` every `interval` seconds in a background asyncio task.
+
+    `func` can be sync or async, blocking work should be wrapped with `asyncio.to_thread`.
+    Exceptions are logged and the task keeps running.
+    """
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Any]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the task. Call this during FastAPI startup."""
+        self._task = asyncio.create_task(self._run(), name=self.name)
+        log.info(f"Periodic task [{self.name}] started, interval {self.interval}s")
+
+    async def stop(self) -> None:
+        """Cancel the task. Call this during FastAPI shutdown."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            log.info(f"Periodic task [{self.name}] stopped")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = self.func()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                log.error(f"Periodic task [{self.name}] failed: {type(e).__name__}({e})")
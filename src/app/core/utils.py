@@ -7,26 +7,56 @@ from typing import Callable
 
 from fastapi import Request, Response, HTTPException
 from fastapi.routing import APIRoute
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from config import get_settings
+from app.core.metrics import REQUEST_LATENCY
 
 log = logging.getLogger("core.utils")
 
 settings = get_settings()
 
 
-# Documnentation: https://www.starlette.io/middleware/#basehttpmiddleware
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Simple middleware to log incoming requests and add process time to header"""
+# Documnentation: https://www.starlette.io/middleware/#pure-asgi-middleware
+class LoggingMiddleware:
+    """
+    Pure ASGI middleware to log incoming requests and add process time (ms) to the response headers.
+
+    Wraps `send` instead of subclassing BaseHTTPMiddleware, so there is no extra task / stream
+    per request and streaming responses pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request, call_next):
         start_time = time.perf_counter()
-        response = await call_next(request)
-        process_time = time.perf_counter() - start_time
-        log.info(f"{request.method.upper()} {request.url.path} : {response.status_code} : {process_time:.2f} ms")
-        response.headers["X-Process-Time"] = str(process_time)
-        return response
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # time until the response starts, streaming bodies are still being produced
+                process_time = (time.perf_counter() - start_time) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", f"{process_time:.2f}")
+                headers.append("Server-Timing", f"app;dur={process_time:.2f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            process_time = time.perf_counter() - start_time
+            # route template (set by the router once matched) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route, f"{status_code // 100}xx").observe(process_time)
+            log.info(f"{scope['method']} {scope['path']} : {status_code} : {process_time * 1000:.2f} ms")
 
 
 class ErrorHandlerRoute(APIRoute):
@@ -0,0 +1,30 @@
+import logging
+
+from uvicorn.workers import UvicornWorker
+
+from config import get_settings
+
+settings = get_settings()
+
+UVICORN_LOGGERS = ("uvicorn.error", "uvicorn.access")
+
+
+class AppUvicornWorker(UvicornWorker):
+    """
+    gunicorn worker class used by gunicorn.conf.py.
+
+    The event loop and HTTP parser come from SERVER_LOOP / SERVER_HTTP so production always runs
+    uvloop + httptools (and fails to start without them) instead of silently falling back.
+    Keep-alive, backlog and max_requests (with jitter) are passed on from the gunicorn config.
+    """
+
+    CONFIG_KWARGS = {"loop": settings.SERVER_LOOP, "http": settings.SERVER_HTTP}
+
+    def __init__(self, *args, **kwargs):
+        # UvicornWorker points uvicorn's loggers at gunicorn's handlers, keep the application's logging config
+        saved = {name: logging.getLogger(name) for name in UVICORN_LOGGERS}
+        state = {name: (logger.handlers, logger.level, logger.propagate) for name, logger in saved.items()}
+        super().__init__(*args, **kwargs)
+        for name, logger in saved.items():
+            logger.handlers, level, logger.propagate = state[name]
+            logger.setLevel(level)
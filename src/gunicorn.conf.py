@@ -1,22 +1,65 @@
-import logging.config
-from app.core.logging import get_logging_config
+import os
+import shutil
+import tempfile
+import logging
 
+# Prometheus multiprocess mode - workers write samples here and /metrics aggregates them.
+# Must be set before any worker imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "fastapi_auth_metrics"))
 
-# Configure logging before workers start
+# Login rate limit buckets shared by every worker (memory mapped file), read by config.py
+os.environ.setdefault("RATE_LIMIT_DIRECTORY", os.path.join(tempfile.gettempdir(), "fastapi_auth_ratelimit"))
+
+from prometheus_client import multiprocess  # noqa: E402
+
+from config import get_settings  # noqa: E402
+from app.core.logging import configure_logging  # noqa: E402
+
+settings = get_settings()
+
+
+# Configure logging before workers start, forked workers inherit it
 def on_starting(server):
     """Called just before the master process is initialized."""
-    config = get_logging_config()
-    logging.config.dictConfig(config)
+    configure_logging()
+    # samples from a previous run must not be aggregated
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    # start with empty rate limit buckets (the table size may have changed)
+    shutil.rmtree(os.environ["RATE_LIMIT_DIRECTORY"], ignore_errors=True)
+
+
+def when_ready(server):
+    """Called just after the server is started, database pools are sized from WEB_CONCURRENCY."""
+    if server.cfg.workers != settings.WEB_CONCURRENCY:
+        logging.getLogger("gunicorn").warning(
+            f"Running {server.cfg.workers} workers but WEB_CONCURRENCY={settings.WEB_CONCURRENCY}, "
+            "set WEB_CONCURRENCY instead of --workers so DB_MAX_CONNECTIONS is split correctly"
+        )
 
 
-def worker_process_init(worker):
-    """Called just after a worker has been forked."""
-    # Re-configure logging for each worker if needed
-    config = get_logging_config()
-    logging.config.dictConfig(config)
+def child_exit(server, worker):
+    """Called in the master after a worker exits, drops its live (gauge) metric files."""
+    multiprocess.mark_process_dead(worker.pid)
 
 
-# Standard gunicorn settings
-bind = "0.0.0.0:8000"
-workers = 2
-worker_class = "uvicorn.workers.UvicornWorker"
+# Server profile, see the SERVER_* settings in config.py
+bind = settings.SERVER_BIND
+workers = settings.WEB_CONCURRENCY
+worker_class = "app.core.workers.AppUvicornWorker"
+# import the app in the master, workers share the loaded code / settings copy-on-write.
+# Connections, threads and files are only opened in the lifespan, i.e. in each worker after the fork.
+preload_app = settings.SERVER_PRELOAD
+keepalive = settings.SERVER_KEEPALIVE_SECONDS
+backlog = settings.SERVER_BACKLOG
+# uvicorn takes the client address from X-Forwarded-For only for these peers (login throttling keys on it)
+forwarded_allow_ips = settings.SERVER_FORWARDED_ALLOW_IPS
+timeout = settings.SERVER_TIMEOUT_SECONDS
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT_SECONDS
+# recycle workers so slow growth (fragmentation, caches) is bounded, jitter avoids restarting all at once
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+# worker heartbeat files on tmpfs, a slow or full disk must not get workers killed
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
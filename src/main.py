@@ -5,9 +5,13 @@ from asgi_correlation_id import CorrelationIdMiddleware
 
 from config import get_settings
 
+from app.core.admission import AdmissionController, AdmissionMiddleware
+from app.core.deadline import DeadlineMiddleware
+from app.core.globals import get_database_gate
 from app.core.startup import lifespan
 from app.core.utils import LoggingMiddleware
-from app.auth.routes import auth_router
+from app.core.routes import core_router
+from app.auth.routes import auth_router, jwks_router
 from app.admin.routes import admin_router
 
 settings = get_settings()
@@ -17,11 +21,26 @@ app = FastAPI(
     openapi_url="/openapi.json" if settings.SHOW_DOCS else None,
 )
 
+app.include_router(core_router)
 app.include_router(auth_router)
+app.include_router(jwks_router)
 app.include_router(admin_router)
 
 
 # https://fastapi.tiangolo.com/tutorial/middleware/#multiple-middleware-execution-order
+# innermost: sheds requests after they were logged / timed, before any route work
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            get_database_gate,
+            budgets=settings.ADMISSION_WAIT_BUDGET_SECONDS,
+            routes=settings.ADMISSION_ROUTE_PRIORITIES,
+            exempt=settings.ADMISSION_EXEMPT_PATHS,
+        ),
+    )
+# the deadline starts before admission / routing, its remainder bounds every database wait of the request
+app.add_middleware(DeadlineMiddleware, seconds=settings.REQUEST_DEADLINE_SECONDS, routes=settings.REQUEST_DEADLINE_ROUTES)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(CorrelationIdMiddleware)
 
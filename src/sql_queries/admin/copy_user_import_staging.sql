@@ -0,0 +1 @@
+COPY user_import_staging (line, username, email, password_hash) FROM STDIN
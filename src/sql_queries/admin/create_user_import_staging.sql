@@ -0,0 +1,7 @@
+-- Per connection staging table for bulk user imports, emptied when the import transaction ends
+CREATE TEMPORARY TABLE IF NOT EXISTS user_import_staging (
+    line INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL
+) ON COMMIT DELETE ROWS;
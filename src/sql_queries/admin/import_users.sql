@@ -0,0 +1,17 @@
+/*
+Insert every staged user in one statement, trigger_create_default_user_roles then assigns the
+default role to all of them at once. Returns the staged rows that were skipped because the
+username or email is already registered.
+*/
+WITH inserted AS (
+    INSERT INTO users (username, email, password_hash)
+    SELECT s.username, s.email, s.password_hash
+    FROM user_import_staging s
+    ORDER BY s.line
+    ON CONFLICT DO NOTHING
+    RETURNING username
+)
+SELECT s.line, s.username
+FROM user_import_staging s
+WHERE NOT EXISTS (SELECT 1 FROM inserted i WHERE i.username = s.username)
+ORDER BY s.line;
@@ -0,0 +1,33 @@
+/*
+Keyset page of users ordered by id: pass the last id of the previous page as `after_id`.
+Filters are optional (NULL = not filtered), `_from` bounds are inclusive and `_to` bounds exclusive.
+`limit` NULL returns every remaining row (streamed exports).
+*/
+SELECT
+    u.id,
+    u.username,
+    u.email,
+    u.created_at,
+    u.last_login_at,
+    u.verified,
+    ARRAY(
+        SELECT r.role_name
+        FROM user_roles ur
+        INNER JOIN roles r ON ur.role_id = r.id
+        WHERE ur.user_id = u.id
+        ORDER BY r.role_name
+    ) as user_roles
+FROM users u
+WHERE u.id > %(after_id)s
+    AND (%(role)s::text IS NULL OR EXISTS (
+        SELECT 1
+        FROM user_roles ur
+        INNER JOIN roles r ON ur.role_id = r.id
+        WHERE ur.user_id = u.id AND r.role_name = %(role)s::text
+    ))
+    AND (%(created_from)s::timestamptz IS NULL OR u.created_at >= %(created_from)s::timestamptz)
+    AND (%(created_to)s::timestamptz IS NULL OR u.created_at < %(created_to)s::timestamptz)
+    AND (%(last_login_from)s::timestamptz IS NULL OR u.last_login_at >= %(last_login_from)s::timestamptz)
+    AND (%(last_login_to)s::timestamptz IS NULL OR u.last_login_at < %(last_login_to)s::timestamptz)
+ORDER BY u.id
+LIMIT %(limit)s;
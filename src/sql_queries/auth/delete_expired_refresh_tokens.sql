@@ -0,0 +1,29 @@
+/*
+Deletes one batch of refresh sessions created more than expire_days ago, used by RefreshTokenReaper
+
+The transaction level advisory lock is released at the end of every batch: it serialises batches, not runs.
+A worker whose batch finds it taken gets acquired = false and skips the rest of its run, batches of two runs
+can still interleave during the pauses (SKIP LOCKED keeps them from deleting the same rows). SKIP LOCKED
+never waits on sessions a login or refresh is updating either
+*/
+WITH reaper_lock AS (
+    SELECT pg_try_advisory_xact_lock(%(lock_key)s) AS acquired
+),
+expired AS (
+    SELECT t.id
+    FROM user_refresh_tokens t, reaper_lock
+    WHERE reaper_lock.acquired
+        AND t.created_at < NOW() - make_interval(days => %(expire_days)s)
+    ORDER BY t.created_at
+    LIMIT %(batch_size)s
+    FOR UPDATE OF t SKIP LOCKED
+),
+reaped AS (
+    DELETE FROM user_refresh_tokens t
+    USING expired
+    WHERE t.id = expired.id
+    RETURNING t.id
+)
+SELECT
+    (SELECT acquired FROM reaper_lock) AS acquired,
+    (SELECT COUNT(*) FROM reaped) AS reaped
@@ -0,0 +1,25 @@
+/*
+Write-behind flush of the ActivityBuffer: latest login per user and latest refresh per session in one statement
+
+Ids are sorted so concurrent flushes from several workers lock rows in the same order, and a timestamp never
+moves backwards (another worker may already have written a later one)
+*/
+WITH logins AS (
+    UPDATE users u
+    SET last_login_at = v.at
+    FROM unnest(%(user_ids)s::INTEGER[], %(login_times)s::TIMESTAMPTZ[]) AS v(id, at)
+    WHERE u.id = v.id
+        AND (u.last_login_at IS NULL OR u.last_login_at < v.at)
+    RETURNING u.id
+),
+refreshes AS (
+    UPDATE user_refresh_tokens t
+    SET last_refresh_at = v.at
+    FROM unnest(%(session_ids)s::INTEGER[], %(refresh_times)s::TIMESTAMPTZ[]) AS v(id, at)
+    WHERE t.id = v.id
+        AND t.last_refresh_at < v.at
+    RETURNING t.id
+)
+SELECT
+    (SELECT COUNT(*) FROM logins) AS logins,
+    (SELECT COUNT(*) FROM refreshes) AS refreshes
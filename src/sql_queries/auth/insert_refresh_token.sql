@@ -1,14 +1,35 @@
 /*
-CTE that inserts token into `refresh_tokens` and then also updates user's last_login_at
+CTE that inserts the token digest into `user_refresh_tokens`, prunes the user's older sessions so at most
+session_cap remain (the new one included) and returns the user id, last_login_at is written behind by the
+ActivityBuffer (flush_activity.sql)
+
+Every CTE sees the same snapshot (not the new row), so the newest session_cap - 1 existing sessions are kept and
+everything older is deleted in one range scan of idx_user_refresh_tokens_user_created
 */
-WITH token_insert AS (
-    INSERT INTO user_refresh_tokens (user_id, refresh_token)
-    SELECT u.id, %(refresh_token)s
+WITH target_user AS (
+    SELECT u.id
     FROM users u
     WHERE u.username = %(username)s
+),
+token_insert AS (
+    INSERT INTO user_refresh_tokens (user_id, refresh_token_hash)
+    SELECT id, %(refresh_token_hash)s
+    FROM target_user
     RETURNING user_id
+),
+oldest_kept AS (
+    SELECT t.user_id, t.created_at, t.id
+    FROM user_refresh_tokens t
+    INNER JOIN target_user ON t.user_id = target_user.id
+    ORDER BY t.created_at DESC, t.id DESC
+    OFFSET %(session_cap)s - 1
+    LIMIT 1
+),
+pruned AS (
+    DELETE FROM user_refresh_tokens t
+    USING oldest_kept k
+    WHERE t.user_id = k.user_id
+        AND (t.created_at, t.id) <= (k.created_at, k.id)
 )
-UPDATE users 
-SET last_login_at = NOW() AT TIME ZONE 'UTC'
+SELECT user_id
 FROM token_insert
-WHERE users.id = token_insert.user_id
\ No newline at end of file
@@ -1,4 +1,22 @@
--- Insert a new user and return their username and email
-INSERT INTO users (username, email, password_hash)
-VALUES (%(username)s, %(email)s, %(password_hash)s)
-RETURNING username, email;
\ No newline at end of file
+/*
+Insert a new user and return it as `get_user_by_username` would, in a single round trip.
+Returns no row when the username or email is already registered.
+
+`user_roles` rows written by trigger_create_default_user_roles are not visible to this statement's
+snapshot, so the roles are read from the same default the trigger assigns ('user').
+*/
+WITH new_user AS (
+    INSERT INTO users (username, email, password_hash)
+    VALUES (%(username)s, %(email)s, %(password_hash)s)
+    ON CONFLICT DO NOTHING
+    RETURNING id, username, email, password_hash, created_at, verified
+)
+SELECT
+    nu.id,
+    nu.username,
+    nu.email,
+    nu.password_hash,
+    nu.created_at,
+    nu.verified,
+    ARRAY(SELECT r.role_name FROM roles r WHERE r.role_name = 'user') as user_roles
+FROM new_user nu;
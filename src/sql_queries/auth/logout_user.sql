@@ -1,4 +1,4 @@
--- easier than trying to grab the refresh_token, just logout the user from all instances (currently max of two)
+-- easier than trying to grab the refresh_token, just logout the user from all instances (at most REFRESH_TOKEN_SESSION_CAP)
 DELETE FROM user_refresh_tokens 
 WHERE user_id = (
     SELECT id 
@@ -1,15 +1,9 @@
-WITH token_check AS (
-    UPDATE user_refresh_tokens 
-    SET last_refresh_at = NOW() AT TIME ZONE 'UTC'
-    FROM users u
-    WHERE user_refresh_tokens.user_id = u.id
-        AND u.username = %(username)s
-        AND user_refresh_tokens.refresh_token = %(refresh_token)s
-    RETURNING user_refresh_tokens.user_id
-)
-SELECT 
-    CASE 
-        WHEN COUNT(*) > 0 THEN true 
-        ELSE false 
-    END as valid
-FROM token_check;
\ No newline at end of file
+/*
+Session of the refresh token (idx_user_refresh_tokens_hash), a pure read - last_refresh_at is written behind by
+the ActivityBuffer (flush_activity.sql)
+*/
+SELECT t.id AS session_id
+FROM user_refresh_tokens t
+INNER JOIN users u ON u.id = t.user_id
+WHERE t.refresh_token_hash = %(refresh_token_hash)s
+    AND u.username = %(username)s
@@ -1,5 +1,11 @@
+import json
+import bcrypt
+
 import pytest
 
+from app.admin.service import UserImportService
+from app.core.executor import HashingExecutor
+
 
 @pytest.mark.admin
 def test_admin_pool_stats(client, add_admin_user):
@@ -13,7 +19,7 @@ def test_admin_pool_stats(client, add_admin_user):
     headers = {"Authorization": f"bearer {token}"}
     stats = client.get("/admin/database/pool_stats", headers=headers)
     assert stats.status_code == 200
-    assert set(stats.json().keys()) == set(["pool_stats", "pool_config"])
+    assert set(stats.json().keys()) == set(["pool_stats", "pool_config", "gate_stats"])
 
 
 @pytest.mark.admin
@@ -29,3 +35,86 @@ def test_user_pool_stats(client, add_user):
     stats = client.get("/admin/database/pool_stats", headers=headers)
     assert stats.status_code == 401
     assert stats.json() == {"detail": "User [admin_user] Missing required role"}
+
+
+@pytest.mark.admin
+def test_admin_hashing_stats(client, add_admin_user):
+    """Test hashing executor stats endpoint"""
+    username, password = add_admin_user
+    login_data = {"username": username, "password": password}
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    response = client.post("/auth/login", data=login_data, headers=headers)
+    assert response.status_code == 200
+    token = response.json().get("access_token")
+    headers = {"Authorization": f"bearer {token}"}
+    stats = client.get("/admin/hashing/stats", headers=headers)
+    assert stats.status_code == 200
+
+
+@pytest.mark.admin
+def test_admin_bulk_import_users(client, add_admin_user):
+    """Test bulk user import with a per row error report"""
+    username, password = add_admin_user
+    login_data = {"username": username, "password": password}
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    response = client.post("/auth/login", data=login_data, headers=headers)
+    token = response.json().get("access_token")
+    password_hash = bcrypt.hashpw(b"Importpassword1", bcrypt.gensalt(rounds=4)).decode("utf-8")
+    body = "\n".join(
+        [
+            "username,email,password,password_hash",
+            "import_one,one@example.com,Importpassword1,",
+            f"import_two,two@example.com,,{password_hash}",
+            "import_bad,not-an-email,Importpassword1,",
+            "import_one,three@example.com,Importpassword1,",
+            "admin_user,four@example.com,Importpassword1,",
+        ]
+    )
+    headers = {"Authorization": f"bearer {token}", "Content-Type": "text/csv"}
+    response = client.post("/admin/users/bulk", content=body, headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["received"], result["created"], result["failed"]) == (5, 2, 3)
+    assert [error["line"] for error in result["errors"]] == [4, 5, 6]
+    # imported users get the default role and can login with their password
+    login_data = {"username": "import_two", "password": "Importpassword1"}
+    response = client.post("/auth/login", data=login_data, headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    unsupported = client.post("/admin/users/bulk", content=body, headers={"Authorization": f"bearer {token}", "Content-Type": "text/plain"})
+    assert unsupported.status_code == 415
+
+
+@pytest.mark.admin
+def test_admin_list_users(client, add_admin_user):
+    """Test keyset pagination, role filter and NDJSON export of users"""
+    username, password = add_admin_user
+    login_data = {"username": username, "password": password}
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    response = client.post("/auth/login", data=login_data, headers=headers)
+    token = response.json().get("access_token")
+    headers = {"Authorization": f"bearer {token}"}
+    for i in range(3):
+        register_data = {"email": f"list{i}@example.com", "username": f"list_user_{i}", "password": "Listpassword1"}
+        client.post("/auth/register", json=register_data)
+
+    # Unknown User + admin_user + 3 registered users
+    page = client.get("/admin/users", params={"limit": 3}, headers=headers).json()
+    assert [user["id"] for user in page["users"]] == [1, 2, 3]
+    assert page["next_after_id"] == 3
+    page = client.get("/admin/users", params={"limit": 3, "after_id": page["next_after_id"]}, headers=headers).json()
+    assert [user["username"] for user in page["users"]] == ["list_user_1", "list_user_2"]
+    assert page["next_after_id"] is None
+
+    admins = client.get("/admin/users", params={"role": "admin"}, headers=headers).json()
+    assert [user["username"] for user in admins["users"]] == ["admin_user"]
+
+    export = client.get("/admin/users/export", params={"after_id": 1}, headers=headers)
+    assert export.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["username"] for line in export.text.splitlines()] == ["admin_user", "list_user_0", "list_user_1", "list_user_2"]
+
+
+@pytest.mark.admin
+def test_bulk_import_leaves_hashing_workers_for_logins():
+    """Test that an import keeps at most half the hashing workers busy"""
+    assert UserImportService(None, HashingExecutor(max_workers=4, max_queue=4)).hash_concurrency == 2
+    assert UserImportService(None, HashingExecutor(max_workers=1, max_queue=4)).hash_concurrency == 1
@@ -0,0 +1,77 @@
+import json
+
+import jwt
+import pytest
+
+from pydantic import ValidationError
+
+import app.auth.utils as auth_utils
+
+from app.auth.keys import KeyRing
+from app.auth.utils import TokenUtils
+from config import TestingConfig
+
+
+def make_ring(directory, algorithm="RS256", publish_seconds=0):
+    return KeyRing(algorithm, directory, rotation_seconds=3600, publish_seconds=publish_seconds, retention_seconds=7200)
+
+
+@pytest.mark.auth
+@pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+def test_key_ring_shared_directory(tmp_path, algorithm):
+    """Test that two workers sharing a key directory use the same key"""
+    first, second = make_ring(tmp_path, algorithm), make_ring(tmp_path, algorithm)
+    first.refresh()
+    second.refresh()
+    assert len(list(tmp_path.glob("*.pem"))) == 1
+    assert first.signing_key.kid == second.signing_key.kid
+    token = jwt.encode({"sub": "user"}, first.signing_key.private_key, algorithm=algorithm, headers={"kid": first.signing_key.kid})
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert jwt.decode(token, second.get(kid).public_key, algorithms=[algorithm])["sub"] == "user"
+
+
+@pytest.mark.auth
+def test_key_ring_publishes_before_signing(tmp_path):
+    """Test that a new key is in the JWKS but not used for signing until it has been published long enough"""
+    ring = make_ring(tmp_path, publish_seconds=60)
+    ring.refresh()
+    first_kid = ring.signing_key.kid
+    # simulate the next rotation period
+    ring.rotation_seconds = 1800
+    ring.refresh()
+    body, etag = ring.jwks
+    assert len(json.loads(body)["keys"]) == 2
+    assert ring.signing_key.kid == first_kid
+
+
+@pytest.mark.auth
+def test_token_utils_with_key_ring(tmp_path, monkeypatch):
+    """Test that TokenUtils signs with a kid and verifies through the key ring"""
+    ring = make_ring(tmp_path)
+    monkeypatch.setattr(auth_utils, "key_ring", ring)
+    monkeypatch.setattr(auth_utils.settings, "ALGORITHM", "RS256")
+    token = TokenUtils.create_access_token(data={"sub": "ringuser"})
+    assert jwt.get_unverified_header(token)["kid"] == ring.signing_key.kid
+    assert TokenUtils.decode_token(token)["sub"] == "ringuser"
+
+
+@pytest.mark.auth
+def test_key_ring_get_does_not_reload(tmp_path):
+    """Test that an unknown kid is not looked up on disk in the request path, only by `refresh`"""
+    ring, other = make_ring(tmp_path), make_ring(tmp_path)
+    ring.refresh()
+    # another worker creates the key of the next rotation period
+    other.rotation_seconds = 1800
+    other.refresh()
+    new_kid = next(kid for kid in other._keys if kid != ring.signing_key.kid)
+    assert ring.get(new_kid) is None
+    ring.refresh()
+    assert ring.get(new_kid) is not None
+
+
+@pytest.mark.auth
+def test_asymmetric_algorithm_requires_key_directory_with_workers():
+    """Test that every worker generating its own key is refused"""
+    with pytest.raises(ValidationError):
+        TestingConfig(ALGORITHM="RS256", WEB_CONCURRENCY=2, JWT_KEY_DIRECTORY=None)
+    assert TestingConfig(ALGORITHM="RS256", WEB_CONCURRENCY=1, JWT_KEY_DIRECTORY=None).WEB_CONCURRENCY == 1
@@ -1,6 +1,11 @@
+import hashlib
+
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
-from app.auth.repositories import AuthRepository
+from app.auth.repositories import REAPER_LOCK_KEY, AuthRepository
+from app.auth.service import RefreshTokenReaper
 
 
 @pytest.mark.auth
@@ -43,3 +48,82 @@ async def test_logout_user(get_test_db):
     assert await repo.verify_refresh_token("testuser", "token1")
     await repo.logout_user("testuser")
     assert False == await repo.verify_refresh_token("testuser", "token1")
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_refresh_token_stored_as_digest(get_test_db):
+    repo = AuthRepository(get_test_db)
+    await repo.insert_user("testuser", "test@example.com", "hashed_password")
+    await repo.insert_refresh_token("testuser", "token1")
+    row: dict = await get_test_db.fetchone("SELECT refresh_token_hash FROM user_refresh_tokens")
+    assert bytes(row["refresh_token_hash"]) == hashlib.sha256(b"token1").digest()
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_refresh_session_cap_prunes_history(get_test_db):
+    repo = AuthRepository(get_test_db)
+    await repo.insert_user("testuser", "test@example.com", "hashed_password")
+    for i in range(5):
+        await repo.insert_refresh_token("testuser", f"token{i}", session_cap=5)
+    # a lower cap removes every session beyond it in one statement, not one per login
+    await repo.insert_refresh_token("testuser", "token5", session_cap=2)
+    row: dict = await get_test_db.fetchone("SELECT COUNT(*) AS sessions FROM user_refresh_tokens")
+    assert row["sessions"] == 2
+    assert await repo.verify_refresh_token("testuser", "token4")
+    assert await repo.verify_refresh_token("testuser", "token5")
+    assert False == await repo.verify_refresh_token("testuser", "token3")
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_reaper_deletes_expired_sessions(get_test_db):
+    repo = AuthRepository(get_test_db)
+    await repo.insert_user("testuser", "test@example.com", "hashed_password")
+    await repo.insert_user("otheruser", "other@example.com", "hashed_password")
+    await repo.insert_refresh_token("testuser", "token1")
+    await repo.insert_refresh_token("testuser", "token2")
+    await repo.insert_refresh_token("otheruser", "token3")
+    await get_test_db.execute(
+        "UPDATE user_refresh_tokens SET created_at = NOW() - INTERVAL '30 days' WHERE refresh_token_hash <> %(current)s",
+        params={"current": hashlib.sha256(b"token2").digest()},
+    )
+    reaper = RefreshTokenReaper(get_test_db, batch_size=1, max_batches=10, pause=0)
+    assert await reaper.reap() == 2
+    assert await repo.verify_refresh_token("testuser", "token2")
+    assert False == await repo.verify_refresh_token("otheruser", "token3")
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_reaper_skips_batch_while_lock_is_held(get_test_db):
+    repo = AuthRepository(get_test_db)
+    await repo.insert_user("testuser", "test@example.com", "hashed_password")
+    await repo.insert_refresh_token("testuser", "token1")
+    await get_test_db.execute("UPDATE user_refresh_tokens SET created_at = NOW() - INTERVAL '30 days'")
+    reaper = RefreshTokenReaper(get_test_db, batch_size=10, max_batches=10, pause=0)
+    # another worker's batch in flight
+    async with get_test_db.get_connection("other_reaper") as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(%s)", (REAPER_LOCK_KEY,))
+            assert await reaper.reap() == 0
+    # released with that batch's transaction, the next run reaps
+    assert await reaper.reap() == 1
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_record_activity_batches_timestamps(get_test_db):
+    repo = AuthRepository(get_test_db)
+    user = await repo.insert_user("testuser", "test@example.com", "hashed_password")
+    session = await repo.insert_refresh_token("testuser", "token1")
+    session_id = await repo.get_refresh_session("testuser", "token1")
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    result = await repo.record_activity({"login": {session["user_id"]: later}, "refresh": {session_id: later}})
+    assert result == {"logins": 1, "refreshes": 1}
+    row = await get_test_db.fetchone("SELECT last_login_at FROM users WHERE id = %(id)s", params={"id": user["id"]})
+    assert row["last_login_at"] == later
+    # an older timestamp (e.g. flushed late by another worker) never moves it back
+    result = await repo.record_activity({"login": {session["user_id"]: later - timedelta(days=1)}})
+    assert result == {"logins": 0, "refreshes": 0}
@@ -2,6 +2,11 @@ import pytest
 
 from fastapi.exceptions import HTTPException
 
+from main import app
+from app.core.dependancies import get_limiter
+from app.core.ratelimit import MemoryBucketStore, RateLimiter
+from app.auth.dependancies import login_user_limit
+
 
 @pytest.mark.auth
 def test_register_user(client):
@@ -74,3 +79,33 @@ def test_logout_and_refresh_request(client):
     assert verify_response.status_code == 401
     # error from auth/dependancies
     assert verify_response.json().get("detail") == "Authentication token missing"
+
+
+@pytest.mark.auth
+def test_jwks(client):
+    """Test the JWKS document is cacheable and supports conditional requests"""
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "keys" in response.json()
+    assert "max-age" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+    response = client.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.auth
+def test_login_throttled(client):
+    """Test that login attempts beyond the username bucket are rejected before any credential check"""
+    limiter = RateLimiter(MemoryBucketStore(max_keys=100))
+    app.dependency_overrides[get_limiter] = lambda: limiter
+    try:
+        login_data = {"username": "throttled", "password": "Wrongpassword1"}
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        for _ in range(login_user_limit.burst):
+            assert client.post("/auth/login", data=login_data, headers=headers).status_code == 401
+        response = client.post("/auth/login", data=login_data, headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert limiter.stats["limits"]["login_user"]["limited"] == 1
+    finally:
+        app.dependency_overrides.pop(get_limiter)
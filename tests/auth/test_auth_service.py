@@ -19,6 +19,18 @@ async def test_register_user(get_test_db):
     assert user_response.user_roles == ["user"]
 
 
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_register_user_conflict(get_test_db):
+    """Duplicate username or email is rejected by the insert itself"""
+    service = UserService(get_test_db)
+    await service.register_user(RegisterRequest(username="testuser", email="testuser@dummy.com", password="DummyPass1"))
+    for username, email in (("testuser", "other@dummy.com"), ("otheruser", "testuser@dummy.com")):
+        with pytest.raises(HTTPException) as excinfo:
+            await service.register_user(RegisterRequest(username=username, email=email, password="DummyPass1"))
+        assert excinfo.value.status_code == 400
+
+
 @pytest.mark.auth
 @pytest.mark.asyncio
 async def test_login_user_tokens(get_test_db):
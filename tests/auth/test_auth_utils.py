@@ -0,0 +1,42 @@
+import pytest
+
+from datetime import timedelta
+
+from fastapi import HTTPException
+
+from app.auth.utils import TokenUtils
+
+
+@pytest.mark.auth
+def test_decode_token_is_cached():
+    """Test that a repeated token is served from the verified token cache"""
+    token = TokenUtils.create_access_token(data={"sub": "cacheduser", "roles": ["user"]})
+    hits = TokenUtils.cache.hits
+    first = TokenUtils.decode_token(token)
+    second = TokenUtils.decode_token(token)
+    assert first == second
+    assert first["sub"] == "cacheduser"
+    assert TokenUtils.cache.hits == hits + 1
+    # returned claims are copies, modifying them must not poison the cache
+    second["sub"] = "changed"
+    assert TokenUtils.decode_token(token)["sub"] == "cacheduser"
+
+
+@pytest.mark.auth
+def test_decode_token_invalid_and_expired():
+    """Test that invalid or expired tokens are rejected and never cached"""
+    with pytest.raises(HTTPException) as excinfo:
+        TokenUtils.decode_token("not-a-token")
+    assert excinfo.value.status_code == 401
+    expired = TokenUtils.create_access_token(data={"sub": "expireduser"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(HTTPException):
+        TokenUtils.decode_token(expired)
+    with pytest.raises(HTTPException):
+        TokenUtils.decode_token(expired)
+
+
+@pytest.mark.auth
+def test_refresh_tokens_are_unique():
+    """Test that refresh tokens created within the same second differ (stored digests are unique)"""
+    data = {"sub": "sameuser", "roles": ["user"]}
+    assert TokenUtils.create_refresh_token(data=data) != TokenUtils.create_refresh_token(data=data)
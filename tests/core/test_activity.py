@@ -0,0 +1,60 @@
+import asyncio
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.activity import ActivityBuffer
+
+
+@pytest.mark.asyncio
+async def test_activity_buffer_flushes_latest_timestamps():
+    written = []
+
+    async def writer(activity):
+        written.append(activity)
+
+    buffer = ActivityBuffer(writer, kinds=("login", "refresh"))
+    earlier = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    buffer.record("login", 1, earlier)
+    buffer.record("login", 1, earlier + timedelta(minutes=1))
+    buffer.record("refresh", 7, earlier)
+    assert await buffer.flush() == 2
+    assert written == [{"login": {1: earlier + timedelta(minutes=1)}, "refresh": {7: earlier}}]
+    # nothing pending, no round trip
+    assert await buffer.flush() == 0
+    assert len(written) == 1
+
+
+@pytest.mark.asyncio
+async def test_activity_buffer_keeps_entries_when_flush_fails():
+    async def writer(activity):
+        raise ConnectionError("database unavailable")
+
+    buffer = ActivityBuffer(writer, kinds=("login",))
+    buffer.record("login", 1)
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    assert buffer.stats["pending"] == {"login": 1}
+    assert buffer.stats["failures"] == 1
+    # shutdown logs and drops what can not be written
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_activity_buffer_keeps_entries_when_flush_is_cancelled():
+    started, blocked = asyncio.Event(), asyncio.Event()
+
+    async def writer(activity):
+        started.set()
+        await blocked.wait()
+
+    buffer = ActivityBuffer(writer, kinds=("login",))
+    buffer.record("login", 1)
+    flush = asyncio.create_task(buffer.flush())
+    await started.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    assert buffer.stats["pending"] == {"login": 1}
+    assert buffer.stats["failures"] == 0
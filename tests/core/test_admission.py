@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import PRIORITIES, AdmissionController, AdmissionMiddleware, PriorityGate, current_priority
+
+
+@pytest.mark.asyncio
+async def test_priority_gate_serves_by_priority():
+    gate = PriorityGate(lambda: 1)
+    await gate.acquire(PRIORITIES["normal"])
+    served = []
+
+    async def waiter(name):
+        await gate.acquire(PRIORITIES[name])
+        served.append(name)
+        gate.release()
+
+    tasks = [asyncio.create_task(waiter(name)) for name in ("low", "normal", "critical")]
+    await asyncio.sleep(0)
+    assert gate.waiting() == 3
+    gate.release()
+    await asyncio.gather(*tasks)
+    assert served == ["critical", "normal", "low"]
+    assert gate.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_priority_gate_drops_cancelled_waiters():
+    gate = PriorityGate(lambda: 1)
+    await gate.acquire(PRIORITIES["normal"])
+    with pytest.raises(TimeoutError):
+        async with asyncio.timeout(0.01):
+            await gate.acquire(PRIORITIES["normal"])
+    assert gate.waiting() == 0
+    gate.release()
+    assert gate.in_use == 0
+
+
+def test_priority_gate_estimates_wait_of_waiters_ahead():
+    gate = PriorityGate(lambda: 2)
+    assert gate.estimate_wait(PRIORITIES["low"]) == 0
+    gate.in_use = 2
+    gate.record_hold(0.1)
+    assert gate.estimate_wait(PRIORITIES["low"]) == pytest.approx(0.05)
+
+
+def build_client(gate: PriorityGate) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/{path:path}")
+    def priority():
+        return {"priority": current_priority()}
+
+    controller = AdmissionController(
+        lambda: gate,
+        budgets={"critical": 2.0, "normal": 0.5, "low": 0.2},
+        routes={"/auth/refresh": "critical", "/admin": "low"},
+        exempt=["/healthz"],
+    )
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return TestClient(app)
+
+
+def test_admission_sheds_low_priority_first():
+    gate = PriorityGate(lambda: 1)
+    gate.in_use = 1
+    gate.record_hold(0.3)
+    client = build_client(gate)
+
+    response = client.get("/admin/users")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/auth/refresh").json() == {"priority": PRIORITIES["critical"]}
+    assert client.get("/auth/login").json() == {"priority": PRIORITIES["normal"]}
+    # exempt paths are never shed
+    gate.record_hold(100)
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/auth/login").status_code == 503
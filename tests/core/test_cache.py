@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import pytest
+
+from config import get_settings
+from app.core.cache import TTLCache, InvalidationCache
+from app.core.globals import USER_CHANGES_CHANNEL
+from app.core.notify import NotificationListener
+from app.auth.repositories import AuthRepository
+
+settings = get_settings()
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") is None
+    cache.set("b", 2, ttl=0.01)
+    assert cache.get("b") == 2
+    time.sleep(0.02)
+    assert cache.get("b") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_cache_only_caches_when_enabled():
+    calls = []
+
+    async def loader(key):
+        calls.append(key)
+        return {"username": key}
+
+    cache = InvalidationCache(maxsize=10, ttl=60)
+    await cache.get_or_load("user", loader)
+    await cache.get_or_load("user", loader)
+    assert len(calls) == 2
+    cache.set_enabled(True)
+    await cache.get_or_load("user", loader)
+    await cache.get_or_load("user", loader)
+    assert len(calls) == 3
+    cache.invalidate("user")
+    await cache.get_or_load("user", loader)
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_invalidation_cache_drops_value_loaded_during_invalidation():
+    cache = InvalidationCache(maxsize=10, ttl=60)
+    cache.set_enabled(True)
+
+    async def loader(key):
+        cache.invalidate(key)
+        return {"username": key}
+
+    await cache.get_or_load("user", loader)
+    assert cache.get("user") is None
+
+
+@pytest.mark.asyncio
+async def test_user_changes_are_notified(get_test_db):
+    repo = AuthRepository(get_test_db)
+    await repo.insert_user("testuser", "test@example.com", "hashed_password")
+    received = []
+    listener = NotificationListener(settings.DATABASE_URL, USER_CHANGES_CHANNEL, on_notify=received.append, on_status=lambda _: None)
+    listener.start()
+    try:
+        for _ in range(50):
+            if listener.connected:
+                break
+            await asyncio.sleep(0.1)
+        # last_login_at is not part of the cached record so it must not notify
+        await get_test_db.execute("UPDATE users SET last_login_at = NOW() WHERE username = 'testuser'")
+        await get_test_db.execute("UPDATE users SET verified = TRUE WHERE username = 'testuser'")
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.1)
+        assert received == ["testuser"]
+    finally:
+        await listener.stop()
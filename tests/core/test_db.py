@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from psycopg import OperationalError, errors
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from app.core import db as core_db
+from app.core.db import AsyncDatabase, DatabaseTimeoutError, Replica, get_pool_limits, is_connection_failure
+from app.core.deadline import deadline
+
+
+def test_pool_limits_split_connection_budget(monkeypatch):
+    """Test that DB_MAX_CONNECTIONS is shared between workers, less each worker's health check and LISTEN connections."""
+    monkeypatch.setattr(core_db.settings, "WEB_CONCURRENCY", 4)
+    monkeypatch.setattr(core_db.settings, "DB_MAX_CONNECTIONS", 40)
+    monkeypatch.setattr(core_db.settings, "USER_CACHE_ENABLED", True)
+    monkeypatch.setattr(core_db.settings, "DB_POOL_ADAPTIVE", True)
+    monkeypatch.setattr(core_db.settings, "DB_POOL_ADAPTIVE_MAX_SIZE", 16)
+    assert get_pool_limits() == {"min_size": 2, "max_size": 4, "max_size_limit": 8}
+    monkeypatch.setattr(core_db.settings, "DB_MAX_CONNECTIONS", 4)
+    with pytest.raises(ValueError):
+        get_pool_limits()
+
+
+@pytest.mark.asyncio
+async def test_adapt_pool_size(monkeypatch):
+    """Test that max_size grows while requests wait and shrinks back after quiet intervals."""
+    monkeypatch.setattr(core_db.settings, "DB_POOL_SHRINK_INTERVALS", 2)
+    database = AsyncDatabase(min_size=1, max_size=2, max_size_limit=3)
+    stats = {"requests_num": 10, "requests_waiting": 3, "requests_wait_ms": 200}
+    monkeypatch.setattr(database.pool, "get_stats", lambda: stats)
+
+    async def resize(min_size, max_size):
+        # pool is never opened here, only record the new bounds
+        database.pool._min_size, database.pool._max_size = min_size, max_size
+
+    monkeypatch.setattr(database.pool, "resize", resize)
+    await database.adapt_pool_size()
+    assert database.pool.max_size == 3
+    await database.adapt_pool_size()
+    assert database.pool.max_size == 3
+    stats = {"requests_num": 20, "requests_wait_ms": 200}
+    await database.adapt_pool_size()
+    await database.adapt_pool_size()
+    assert database.pool.max_size == 2
+    assert database.pool_stats["pool_config"]["max_size"] == 2
+
+
+@pytest.mark.asyncio
+async def test_adapt_pool_size_counts_gate_waiters(monkeypatch):
+    """Test that requests queued in the priority gate grow max_size, the pool itself sees no queue."""
+    database = AsyncDatabase(min_size=1, max_size=1, max_size_limit=3)
+    monkeypatch.setattr(database.pool, "get_stats", lambda: {"requests_num": 1})
+
+    async def resize(min_size, max_size):
+        database.pool._min_size, database.pool._max_size = min_size, max_size
+
+    monkeypatch.setattr(database.pool, "resize", resize)
+    await database.gate.acquire(0)
+    waiter = asyncio.create_task(database.gate.acquire(0))
+    await asyncio.sleep(0)
+    assert database.gate.waiting() == 1
+    await database.adapt_pool_size()
+    assert database.pool.max_size == 2
+    # the resize handed the waiter a slot
+    await waiter
+    assert database.gate.stats["requests_queued"] == 1
+    database.gate.release()
+    database.gate.release()
+
+
+def test_only_connection_failures_eject_replicas():
+    """Test that a statement cancelled by a hot standby (conflict with recovery) is retried without ejecting the replica."""
+    assert is_connection_failure(PoolTimeout("timeout"))
+    assert is_connection_failure(OperationalError("server closed the connection unexpectedly"))
+    assert is_connection_failure(errors.ConnectionFailure("connection failure"))
+    assert is_connection_failure(errors.AdminShutdown("terminating connection"))
+    assert not is_connection_failure(errors.SerializationFailure("canceling statement due to conflict with recovery"))
+
+    replica = Replica("postgresql://replica@127.0.0.1:1/replica", AsyncConnectionPool("postgresql://replica@127.0.0.1:1/replica", open=False))
+    AsyncDatabase._replica_failed(replica, "read", errors.SerializationFailure("conflict with recovery"))
+    assert replica.healthy and replica.ejections == 0
+    AsyncDatabase._replica_failed(replica, "read", PoolTimeout("timeout"))
+    assert not replica.healthy and replica.ejections == 1
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_ejection_and_read_your_writes(monkeypatch):
+    """Test that reads are balanced over healthy replicas, failing ones are ejected and writes pin reads to the primary."""
+    unreachable = "postgresql://replica@127.0.0.1:1/replica?connect_timeout=1"
+    monkeypatch.setattr(core_db.settings, "DATABASE_REPLICA_URLS", [core_db.settings.DATABASE_URL, unreachable])
+    database = AsyncDatabase(min_size=1, max_size=1)
+    await database.initialize()
+    try:
+        healthy, broken = database.replicas
+        for _ in range(4):
+            assert await database.fetchone("SELECT 1 AS one", intent="read") == {"one": 1}
+        assert not broken.healthy and broken.ejections == 1
+        replica_reads = healthy.pool.get_stats().get("requests_num", 0)
+        assert replica_reads >= 3
+
+        async def write_then_read():
+            await database.execute("SELECT 1")
+            await database.fetchone("SELECT 1 AS one", intent="read")
+
+        await asyncio.create_task(write_then_read())
+        assert healthy.pool.get_stats().get("requests_num", 0) == replica_reads
+        with database.read_your_writes():
+            await database.fetchone("SELECT 1 AS one", intent="read")
+        assert healthy.pool.get_stats().get("requests_num", 0) == replica_reads
+        assert set(database.pool_stats.keys()) == {"pool_stats", "pool_config", "gate_stats", "replica_stats"}
+    finally:
+        await database.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_rows(get_test_db):
+    """Test that rows are streamed from a server-side cursor in batches."""
+    rows = [row async for row in get_test_db.stream("SELECT generate_series(1, 2500) AS n", batch_size=1000)]
+    assert len(rows) == 2500
+    assert rows[0] == {"n": 1} and rows[-1] == {"n": 2500}
+
+
+@pytest.mark.asyncio
+async def test_stream_stops_at_the_deadline(get_test_db):
+    """Test that a stream inside a request deadline gives its connection back once the deadline ran out."""
+    rows = 0
+    with deadline(0.2):
+        with pytest.raises(DatabaseTimeoutError):
+            async for _ in get_test_db.stream("SELECT n, pg_sleep(0.01) FROM generate_series(1, 1000) AS n", batch_size=10):
+                rows += 1
+    assert 0 < rows < 1000
+    assert get_test_db.gate.in_use == 0
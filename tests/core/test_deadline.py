@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import db as core_db
+from app.core.db import AsyncDatabase, DatabaseTimeoutError
+from app.core.queries import sql_catalog
+from app.core.deadline import DeadlineMiddleware, deadline, remaining
+
+
+def test_deadline_keeps_the_earlier_one():
+    assert remaining() is None
+    with deadline(10):
+        with deadline(60):
+            assert remaining() <= 10
+        with deadline(1):
+            assert remaining() <= 1
+        # 0 / None leave the current deadline
+        with deadline(0):
+            assert 1 < remaining() <= 10
+    assert remaining() is None
+
+
+def test_deadline_middleware_route_overrides():
+    app = FastAPI()
+
+    @app.get("/{path:path}")
+    def left():
+        return {"remaining": remaining()}
+
+    app.add_middleware(DeadlineMiddleware, seconds=5, routes={"/admin/users/bulk": 0, "/admin": 30})
+    client = TestClient(app)
+    assert 0 < client.get("/auth/login").json()["remaining"] <= 5
+    assert 5 < client.get("/admin/users").json()["remaining"] <= 30
+    assert client.get("/admin/users/bulk").json()["remaining"] is None
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_skips_the_pool():
+    database = AsyncDatabase()
+    with deadline(0.001):
+        await asyncio.sleep(0.01)
+        with pytest.raises(DatabaseTimeoutError) as error:
+            await database.fetchone("SELECT 1", name="expired")
+    assert error.value.status_code == 504
+    assert error.value.stage == "deadline"
+    assert database.gate.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_the_acquire_wait():
+    database = AsyncDatabase(min_size=1, max_size=1)
+    # the only slot is taken, the request gives up at its deadline instead of the pool timeout
+    await database.gate.acquire(0)
+    with deadline(0.05):
+        with pytest.raises(DatabaseTimeoutError) as error:
+            await database.fetchone("SELECT 1", name="busy")
+    assert error.value.stage == "acquire"
+    database.gate.release()
+    assert database.gate.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_timeouts_are_not_prepared_without_threshold(monkeypatch):
+    """Test that DB_PREPARE_THRESHOLD=None (pgbouncer transaction mode) keeps the deadline's set_config unprepared."""
+    monkeypatch.setattr(core_db.settings, "DB_PREPARE_THRESHOLD", None)
+    monkeypatch.setattr(sql_catalog, "prepare", False)
+    # one connection, pg_prepared_statements only lists the current session's statements
+    database = AsyncDatabase(min_size=1, max_size=1)
+    await database.initialize()
+    try:
+        with deadline(5):
+            for _ in range(3):
+                assert await database.fetchone("SELECT 1 AS one", name="bounded") == {"one": 1}
+        row = await database.fetchone("SELECT COUNT(*) AS prepared FROM pg_prepared_statements")
+        assert row["prepared"] == 0
+    finally:
+        await database.close()
@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.executor import HashingExecutor, ExecutorSaturatedError
+
+
+@pytest.mark.asyncio
+async def test_executor_runs_off_event_loop():
+    """Test that work is run on a worker thread and the result is returned."""
+    executor = HashingExecutor(max_workers=2, max_queue=4)
+    executor.start()
+    try:
+        thread_name = await executor.run(lambda: threading.current_thread().name)
+        assert thread_name.startswith("hashing")
+        stats = executor.stats["executor_stats"]
+        assert stats["jobs_submitted"] == 1
+        assert stats["jobs_completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_queue_full():
+    """Test that jobs beyond max_workers + max_queue are rejected."""
+    executor = HashingExecutor(max_workers=1, max_queue=1)
+    executor.start()
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(executor.run(release.wait))
+        waiting = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(running, waiting)
+        assert executor.stats["executor_stats"]["jobs_rejected"] == 1
+    finally:
+        release.set()
+        executor.shutdown()
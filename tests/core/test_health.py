@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.db import AsyncDatabase
+from app.core.health import DatabaseHealth
+from app.core.routes import core_router
+
+UNREACHABLE = "postgresql://postgres@127.0.0.1:1/postgres"
+
+
+@pytest.mark.asyncio
+async def test_database_health_records_failed_check():
+    """A database that can not be reached makes the worker not ready"""
+    database = AsyncDatabase()
+    database.connection_string = UNREACHABLE
+    health = DatabaseHealth(database, timeout=0.5, stale_after=30)
+    assert not health.ready
+    assert health.status["database"]["checked_at"] is None
+
+    assert await health.check() is False
+    status = health.status
+    assert status["ready"] is False
+    assert status["database"]["consecutive_failures"] == 1
+    assert status["database"]["error"]
+    assert status["database"]["latency_ms"] >= 0
+    assert status["pool"]["in_use"] == 0
+    assert status["pool"]["saturation"] == 0
+
+
+@pytest.mark.asyncio
+async def test_database_health_goes_stale():
+    database = AsyncDatabase()
+    database.connection_string = UNREACHABLE
+    health = DatabaseHealth(database, timeout=0.5, stale_after=0)
+    await health.check()
+    # a successful check only counts for `stale_after` seconds
+    health.ok = True
+    assert not health.ready
+
+
+@pytest.mark.asyncio
+async def test_database_health_ignores_exhausted_pool(get_test_db):
+    """Every slot taken and requests queued: reported as saturation, the worker stays ready"""
+    gate = get_test_db.gate
+    held = gate.capacity() - gate.in_use
+    for _ in range(held):
+        await gate.acquire(0)
+    waiter = asyncio.create_task(gate.acquire(0))
+    health = DatabaseHealth(get_test_db, timeout=0.5, stale_after=30)
+    try:
+        await asyncio.sleep(0)
+        assert await health.check() is True
+        status = health.status
+        assert status["ready"] is True
+        assert status["pool"]["waiting"] == 1
+    finally:
+        await health.close()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        for _ in range(held):
+            gate.release()
+
+
+def test_probe_endpoints_without_lifespan():
+    app = FastAPI()
+    app.include_router(core_router)
+    client = TestClient(app)
+
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
@@ -1,8 +1,9 @@
 import pytest
+import queue
 import logging
 import logging.config
 
-from app.core.logging import get_logging_config
+from app.core.logging import get_logging_config, DroppingQueueHandler, settings
 
 
 def test_get_logging_config_returns_dict():
@@ -27,3 +28,24 @@ def test_logger_initialization_with_config():
     # Get a logger and verify it works
     logger = logging.getLogger("core.utils")
     assert len(logger.handlers) > 0
+
+
+def test_queue_logging_config(monkeypatch):
+    """Test that application loggers are routed through the log queue and keep the correlation id filter."""
+    monkeypatch.setattr(settings, "LOG_QUEUE_ENABLED", True)
+    config = get_logging_config()
+    assert config["loggers"]["core.utils"]["handlers"] == ["web_queue"]
+    assert config["loggers"]["core.startup"]["handlers"] == ["queue"]
+    assert config["loggers"]["gunicorn"]["handlers"] == ["console", "file_watcher"]
+    assert config["handlers"]["web_queue"]["filters"] == ["correlation_id"]
+    assert "filters" not in config["handlers"]["web_file_watcher"]
+
+
+def test_queue_handler_drops_when_full():
+    """Test that a full queue drops (and counts) records instead of blocking."""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    dropped = DroppingQueueHandler.dropped
+    record = logging.makeLogRecord({"msg": "message"})
+    handler.handle(record)
+    handler.handle(record)
+    assert DroppingQueueHandler.dropped == dropped + 1
@@ -0,0 +1,23 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from app.auth.utils import PasswordUtils, TokenUtils
+
+
+def test_metrics_endpoint_records_requests():
+    """Test that request latency is recorded per route template and exposed in Prometheus format."""
+    client = TestClient(app)
+    client.get("/.well-known/jwks.json")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/.well-known/jwks.json",status_class="2xx"}' in response.text
+
+
+def test_metrics_hashing_and_jwt_timings():
+    """Test that bcrypt and JWT timings are recorded."""
+    PasswordUtils.verify_password("password", PasswordUtils.hash_password("password"))
+    TokenUtils.decode_token(TokenUtils.create_access_token(data={"sub": "metricsuser"}))
+    text = TestClient(app).get("/metrics").text
+    assert 'password_hash_duration_seconds_count{operation="verify"}' in text
+    assert 'jwt_duration_seconds_count{operation="decode"}' in text
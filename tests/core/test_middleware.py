@@ -0,0 +1,35 @@
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.utils import LoggingMiddleware
+
+
+def build_client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ping": "pong"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"{i}\n" for i in range(3)), media_type="text/plain")
+
+    app.add_middleware(LoggingMiddleware)
+    return TestClient(app)
+
+
+def test_logging_middleware_timing_headers():
+    """Test that process time (ms) is added as X-Process-Time and Server-Timing"""
+    response = build_client().get("/ping")
+    assert response.status_code == 200
+    assert float(response.headers["x-process-time"]) >= 0
+    assert response.headers["server-timing"].startswith("app;dur=")
+
+
+def test_logging_middleware_streaming():
+    """Test that streaming responses pass through unchanged"""
+    response = build_client().get("/stream")
+    assert response.status_code == 200
+    assert response.text == "0\n1\n2\n"
@@ -0,0 +1,49 @@
+import pytest
+
+from app.core.db import AsyncDatabase
+from app.core.queries import SqlCatalog, SqlQuery, sql_catalog
+
+
+def test_catalog_loads_all_queries():
+    """Test that every file under sql_queries is loaded and its placeholders parsed."""
+    sql_catalog.load()
+    query = sql_catalog.get("auth/get_user_by_username")
+    assert query.params == frozenset(["username"])
+    assert "auth/insert_refresh_token" in sql_catalog.queries
+
+
+def test_catalog_rejects_positional_placeholders(tmp_path):
+    """Test that statements mixing in positional / bare % placeholders fail at load time."""
+    (tmp_path / "bad.sql").write_text("SELECT * FROM users WHERE username = %s")
+    catalog = SqlCatalog(tmp_path, prepare=True)
+    with pytest.raises(ValueError):
+        catalog.load()
+
+
+def test_query_checks_params():
+    """Test that missing / unexpected parameters are rejected before execution."""
+    query = SqlQuery("test", "SELECT %(a)s, %(b)s, 'literal %%' -- %(comment)s", prepare=True)
+    assert query.params == frozenset(["a", "b"])
+    query.check_params({"a": 1, "b": 2})
+    with pytest.raises(KeyError):
+        query.check_params({"a": 1})
+    with pytest.raises(KeyError):
+        query.check_params({"a": 1, "b": 2, "c": 3})
+
+
+@pytest.mark.asyncio
+async def test_catalog_queries_are_prepared():
+    """Test that catalog statements are prepared on the connection and reported in the stats."""
+    # one connection, pg_prepared_statements only lists the current session's statements
+    database = AsyncDatabase(min_size=1, max_size=1)
+    await database.initialize()
+    try:
+        query = sql_catalog.get("auth/get_user_by_username")
+        executions = query.executions
+        await database.fetchone(query, {"username": "Unknown User"})
+        await database.fetchone(query, {"username": "Unknown User"})
+        assert query.executions == executions + 2
+        row = await database.fetchone("SELECT COUNT(*) AS prepared FROM pg_prepared_statements")
+        assert row["prepared"] >= 1
+    finally:
+        await database.close()
@@ -0,0 +1,54 @@
+import pytest
+
+from pydantic import ValidationError
+
+from config import TestingConfig
+from app.core.ratelimit import MemoryBucketStore, RateLimit, RateLimiter, SharedBucketStore
+
+
+def test_memory_bucket_allows_burst_then_refills():
+    store = MemoryBucketStore(max_keys=10)
+    # burst of 3, one token a second
+    assert [store.take("key", 1, 3, now=100) for _ in range(3)] == [0, 0, 0]
+    assert store.take("key", 1, 3, now=100) == pytest.approx(1)
+    assert store.take("key", 1, 3, now=101) == 0
+    assert store.take("other", 1, 3, now=101) == 0
+
+
+def test_shared_buckets_are_shared_between_processes(tmp_path):
+    """Two stores on the same file behave like two gunicorn workers."""
+    worker_1 = SharedBucketStore(tmp_path / "buckets", slots=64)
+    worker_2 = SharedBucketStore(tmp_path / "buckets", slots=64)
+    try:
+        assert worker_1.take("key", 0.5, 2, now=100) == 0
+        assert worker_2.take("key", 0.5, 2, now=100) == 0
+        assert worker_1.take("key", 0.5, 2, now=100) == pytest.approx(2)
+        assert worker_2.take("key", 0.5, 2, now=102) == 0
+    finally:
+        worker_1.close()
+        worker_2.close()
+
+
+def test_shared_buckets_reuse_refilled_slots(tmp_path):
+    store = SharedBucketStore(tmp_path / "buckets", slots=SharedBucketStore.PROBES)
+    try:
+        for i in range(SharedBucketStore.PROBES * 4):
+            assert store.take(f"key-{i}", 1, 1, now=100 + i * 2) == 0
+        assert store.stats["evictions"] == 0
+    finally:
+        store.close()
+
+
+def test_rate_limiter_counts_hits():
+    limiter = RateLimiter(MemoryBucketStore(max_keys=10))
+    limit = RateLimit("login_user", per_minute=60, burst=1)
+    assert limiter.hit(limit, "alice") == 0
+    assert limiter.hit(limit, "alice") > 0
+    assert limiter.stats["limits"] == {"login_user": {"allowed": 1, "limited": 1}}
+
+
+@pytest.mark.parametrize("setting", ["LOGIN_IP_PER_MINUTE", "LOGIN_USER_PER_MINUTE"])
+def test_zero_login_rate_is_rejected(setting):
+    """A rate of 0 would divide by zero computing Retry-After, disable the limit with LOGIN_RATE_LIMIT_ENABLED instead."""
+    with pytest.raises(ValidationError):
+        TestingConfig(**{setting: 0})
@@ -2,8 +2,9 @@
 Combination of all schema migrations, maybe this should be combined into one file?
 */
 
-DROP TRIGGER IF EXISTS trigger_create_default_user_role ON users CASCADE;
+DROP TRIGGER IF EXISTS trigger_create_default_user_roles ON users CASCADE;
 DROP TRIGGER IF EXISTS trigger_limit_user_refresh_tokens ON user_refresh_tokens CASCADE;
+DROP FUNCTION IF EXISTS limit_user_refresh_tokens();
 DROP TABLE IF EXISTS user_refresh_tokens;
 DROP TABLE IF EXISTS user_roles;
 DROP TABLE IF EXISTS users;
@@ -46,64 +47,33 @@ CREATE TABLE user_roles (
 CREATE TABLE user_refresh_tokens (
     id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     user_id INTEGER NOT NULL,
-    refresh_token TEXT NOT NULL,
+    refresh_token_hash BYTEA NOT NULL, -- sha256 digest of the refresh token
     created_at TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
     last_refresh_at TIMESTAMPTZ NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
     -- Constraints
     CONSTRAINT fk_refresh_tokens_user_id FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+CREATE UNIQUE INDEX idx_user_refresh_tokens_hash ON user_refresh_tokens (refresh_token_hash);
 
--- Function to automatically create a default 'user' role when a new user is inserted
--- Will be used in the trigger: trigger_create_default_user_role
-CREATE OR REPLACE FUNCTION create_default_user_role()
-RETURNS TRIGGER AS $$
-DECLARE
-    default_role_id INTEGER;
-BEGIN
-    -- Get the ID of the 'user' role
-    SELECT id INTO default_role_id 
-    FROM roles 
-    WHERE role_name = 'user';
-    
-    -- Insert the default role assignment
-    IF default_role_id IS NOT NULL THEN
-        INSERT INTO user_roles (user_id, role_id)
-        VALUES (NEW.id, default_role_id);
-    END IF;
-    
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
+-- newest-first session scan and range delete of insert_refresh_token.sql
+CREATE INDEX idx_user_refresh_tokens_user_created ON user_refresh_tokens (user_id, created_at, id);
 
+-- expired session batches of RefreshTokenReaper
+CREATE INDEX idx_user_refresh_tokens_created ON user_refresh_tokens (created_at);
 
--- Function to limit the amount of refresh_tokens per user (set to 2 but can be configured at a later stage)
--- Trigger: trigger_limit_user_refresh_tokens
-CREATE OR REPLACE FUNCTION limit_user_refresh_tokens()
+
+-- Function to assign the default 'user' role to every user inserted by a statement (set-based)
+-- Will be used in the trigger: trigger_create_default_user_roles
+CREATE OR REPLACE FUNCTION create_default_user_roles()
 RETURNS TRIGGER AS $$
-DECLARE
-    row_count INTEGER;
-    oldest_id INTEGER;
 BEGIN
-    -- Count existing rows for this user
-    SELECT COUNT(*) INTO row_count
-    FROM user_refresh_tokens 
-    WHERE user_id = NEW.user_id;
-    
-    -- If user now has more than 2 rows, delete the oldest one
-    IF row_count > 2 THEN
-        -- Find the oldest row for this user (assuming you have a timestamp or auto-increment id)
-        SELECT id INTO oldest_id
-        FROM user_refresh_tokens 
-        WHERE user_id = NEW.user_id
-        ORDER BY created_at ASC -- or ORDER BY id ASC if using auto-increment
-        LIMIT 1;
-        -- Delete the oldest row
-        DELETE FROM user_refresh_tokens 
-        WHERE id = oldest_id;
-    END IF;
-    
-    RETURN NEW;
+    INSERT INTO user_roles (user_id, role_id)
+    SELECT n.id, r.id
+    FROM new_users n
+    CROSS JOIN roles r
+    WHERE r.role_name = 'user';
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -137,14 +107,134 @@ ALTER SEQUENCE users_id_seq RESTART WITH 2;
 -- SET Triggers
 
 
--- Trigger that fires after each user insertion to create the default role
-CREATE TRIGGER trigger_create_default_user_role
+-- Trigger that fires once per user insert statement to create the default roles
+CREATE TRIGGER trigger_create_default_user_roles
     AFTER INSERT ON users
-    FOR EACH ROW
-    EXECUTE FUNCTION create_default_user_role();
+    REFERENCING NEW TABLE AS new_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION create_default_user_roles();
+
+
+
+-- User change notifications (LISTEN/NOTIFY user cache invalidation)
+
+
+-- Send one notification per username, or a single '*' (invalidate everything) for bulk changes
+CREATE OR REPLACE FUNCTION notify_user_changes(usernames TEXT[])
+RETURNS VOID AS $$
+DECLARE
+    changed_username TEXT;
+BEGIN
+    IF usernames IS NULL OR cardinality(usernames) = 0 THEN
+        RETURN;
+    END IF;
+
+    IF cardinality(usernames) > 500 THEN
+        PERFORM pg_notify('auth_user_changes', '*');
+        RETURN;
+    END IF;
+
+    FOREACH changed_username IN ARRAY usernames LOOP
+        PERFORM pg_notify('auth_user_changes', changed_username);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Only columns returned by get_user_by_username matter, so last_login_at updates do not invalidate anything
+CREATE OR REPLACE FUNCTION notify_users_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(
+        SELECT DISTINCT o.username
+        FROM old_users o
+        INNER JOIN new_users n ON o.id = n.id
+        WHERE (o.username, o.email, o.password_hash, o.verified, o.created_at)
+            IS DISTINCT FROM (n.username, n.email, n.password_hash, n.verified, n.created_at)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_users_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(SELECT DISTINCT username FROM old_users));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_user_roles_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(
+        SELECT DISTINCT u.username FROM new_user_roles nr INNER JOIN users u ON u.id = nr.user_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_user_roles_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM notify_user_changes(ARRAY(
+        SELECT DISTINCT u.username FROM old_user_roles o INNER JOIN users u ON u.id = o.user_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION notify_roles_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('auth_user_changes', '*');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- SET Triggers - statement level so bulk changes cost one trigger call (transition tables allow a single event each)
+
+
+CREATE TRIGGER trigger_notify_users_updated
+    AFTER UPDATE ON users
+    REFERENCING OLD TABLE AS old_users NEW TABLE AS new_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_users_updated();
+
+
+CREATE TRIGGER trigger_notify_users_deleted
+    AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_users_deleted();
+
+
+CREATE TRIGGER trigger_notify_user_roles_inserted
+    AFTER INSERT ON user_roles
+    REFERENCING NEW TABLE AS new_user_roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_roles_inserted();
+
+
+CREATE TRIGGER trigger_notify_user_roles_updated
+    AFTER UPDATE ON user_roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_roles_changed();
+
+
+CREATE TRIGGER trigger_notify_user_roles_deleted
+    AFTER DELETE ON user_roles
+    REFERENCING OLD TABLE AS old_user_roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_user_roles_deleted();
 
 
-CREATE TRIGGER trigger_limit_user_refresh_tokens
-    AFTER INSERT ON user_refresh_tokens
-    FOR EACH ROW
-    EXECUTE FUNCTION limit_user_refresh_tokens();
+CREATE TRIGGER trigger_notify_roles_changed
+    AFTER UPDATE OR DELETE ON roles
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_roles_changed();